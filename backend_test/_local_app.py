@@ -0,0 +1,75 @@
+# _local_app.py
+"""
+Shared set-up for the local tests (test_write_behind.py, test_history_pagination.py), which run
+the v2 backend in-process instead of against a deployed URL. Importing this module puts the app
+on sys.path and points it at a temporary SQLite database and upload directory, so it must be
+imported before any `backend` module (the settings are read from the environment on import).
+"""
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+from contextlib import closing
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.abspath(os.path.join(HERE, "..", "backend_v2_wRDS_S3_WIP", "beanstalk_files"))
+sys.path.insert(0, APP_DIR)
+
+WORKDIR = tempfile.mkdtemp(prefix="backend_test_")
+DATABASE_PATH = os.path.join(WORKDIR, "analyses.db")
+
+# Never a real database or bucket, whatever the shell or .env sets
+os.environ["DATABASE_URL"] = f"sqlite:///{DATABASE_PATH}"
+os.environ["S3_LOCAL_DIR"] = os.path.join(WORKDIR, "uploads")
+os.environ["DB_WRITE_BEHIND_ENABLED"] = "false"
+os.environ["STARTUP_WAIT_FOR_DEPENDENCIES"] = "true"
+os.environ.setdefault("OPENAI_API_KEY", "local-tests") # The client is created but never called
+
+from backend.db import database, models # noqa: E402 (needs the environment above)
+
+
+def run(coro):
+    """Runs a coroutine on a new event loop, closing the pooled connections afterwards."""
+    async def main():
+        database.init_engine()
+        try:
+            return await coro
+        finally:
+            await database.dispose_engine()
+    return asyncio.run(main())
+
+
+async def _create_tables():
+    async with database.engine.begin() as conn:
+        await conn.run_sync(models.Base.metadata.create_all)
+
+
+def create_tables() -> None:
+    run(_create_tables())
+
+
+def query(sql: str, params=()) -> list:
+    """Reads the test database directly, bypassing the app."""
+    with closing(sqlite3.connect(DATABASE_PATH)) as db:
+        return db.execute(sql, params).fetchall()
+
+
+def execute_many(sql: str, rows: list) -> None:
+    with closing(sqlite3.connect(DATABASE_PATH)) as db:
+        db.executemany(sql, rows)
+        db.commit()
+
+
+def report(tests) -> int:
+    """Runs test functions outside pytest, printing one status line each. Returns the failure count."""
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            status, message = "PASSED", ""
+        except Exception as e:
+            failures += 1
+            status, message = "FAILED", f"{type(e).__name__}: {e}"
+        print(f"Test: {test.__name__:<55} Status: {status:<8} {message}")
+    return failures
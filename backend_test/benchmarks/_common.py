@@ -0,0 +1,44 @@
+# _common.py
+"""
+Helpers shared by the benchmark scripts: the git commit recorded with --output results,
+.docx builders for synthetic articles, and the latency percentile.
+"""
+import io
+import math
+import os
+import subprocess
+from typing import Optional
+
+import docx
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=HERE, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def docx_bytes(document) -> bytes:
+    """Saves a python-docx Document to bytes."""
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def make_docx(text: str) -> bytes:
+    """A .docx with one paragraph per blank-line-separated block of `text`."""
+    document = docx.Document()
+    for paragraph in text.split("\n\n"):
+        document.add_paragraph(paragraph)
+    return docx_bytes(document)
+
+
+def percentile(sorted_values: list, q: float):
+    """Nearest-rank percentile (0 < q <= 1), as backend/core/model_router.py reports it."""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, math.ceil(q * len(sorted_values)) - 1))
+    return sorted_values[index]
@@ -0,0 +1,140 @@
+# bench_cold_start.py
+"""
+Cold start of the v2 backend: starts `uvicorn main:app` in a fresh process several times and
+measures, from process launch:
+
+    import     `import main` in a fresh interpreter (measured in a separate process)
+    first 200  the first request answered (GET /), i.e. time-to-first-request
+    ready      GET /ready returning 200 (database schema, OpenAI and S3 clients, job queue up)
+
+    python bench_cold_start.py --runs 5
+    DATABASE_URL=postgresql://... python bench_cold_start.py --wait-for-dependencies
+
+By default it runs against a temporary SQLite database with uploads stored locally and a
+dummy OpenAI key (no OpenAI call is made); variables already set in the environment are
+kept. --wait-for-dependencies sets STARTUP_WAIT_FOR_DEPENDENCIES=true, so the server only
+starts serving once start-up is complete (the behaviour before /ready existed).
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from _common import git_commit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.abspath(os.path.join(HERE, "..", "..", "backend_v2_wRDS_S3_WIP", "beanstalk_files"))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def import_seconds(env: dict) -> float:
+    """Seconds `import main` takes in a fresh interpreter."""
+    code = "import time; start = time.perf_counter(); import main; print(f'IMPORT_SECONDS={time.perf_counter() - start}')"
+    output = subprocess.run([sys.executable, "-c", code], cwd=APP_DIR, env=env, check=True, capture_output=True, text=True).stdout
+    return float(output.rsplit("IMPORT_SECONDS=", 1)[1])
+
+
+def wait_for(client: httpx.Client, url: str, deadline: float, poll: float):
+    """perf_counter() time at which `url` first answers 200, polling every `poll` seconds; None on timeout."""
+    while time.perf_counter() < deadline:
+        try:
+            if client.get(url).status_code == 200:
+                return time.perf_counter()
+        except httpx.TransportError:
+            pass # Not listening yet
+        time.sleep(poll)
+    return None
+
+
+def start_server(env: dict, timeout: float, poll: float) -> dict:
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    command = [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"]
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=APP_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = started + timeout
+        with httpx.Client(timeout=timeout) as client:
+            first = wait_for(client, f"{base}/", deadline, poll)
+            ready = wait_for(client, f"{base}/ready", deadline, poll) if first else None
+            report = client.get(f"{base}/ready").json() if ready else None
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    return {
+        "first_request_s": first - started if first else None,
+        "ready_s": ready - started if ready else None,
+        "dependencies": report["dependencies"] if report else None,
+    }
+
+
+def summarize(values: list) -> dict:
+    values = [v for v in values if v is not None]
+    if not values:
+        return {"median_s": None, "min_s": None, "max_s": None}
+    return {"median_s": round(statistics.median(values), 3), "min_s": round(min(values), 3), "max_s": round(max(values), 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds to wait for each server")
+    parser.add_argument("--poll", type=float, default=0.01, help="seconds between polls")
+    parser.add_argument("--wait-for-dependencies", action="store_true", help="set STARTUP_WAIT_FOR_DEPENDENCIES=true")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_cold_start_")
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(workdir, 'cold_start.db')}")
+    env.setdefault("S3_LOCAL_DIR", os.path.join(workdir, "uploads"))
+    env.setdefault("OPENAI_API_KEY", "cold-start-benchmark")
+    env["STARTUP_WAIT_FOR_DEPENDENCIES"] = "true" if args.wait_for_dependencies else "false"
+
+    import_times = [import_seconds(env) for _ in range(args.runs)]
+    runs = []
+    for i in range(args.runs):
+        run = start_server(env, args.timeout, args.poll)
+        runs.append(run)
+        first = f"{run['first_request_s']:.3f} s" if run["first_request_s"] else "timeout"
+        ready = f"{run['ready_s']:.3f} s" if run["ready_s"] else "not ready"
+        print(f"Run {i + 1}: first 200 after {first}, ready after {ready}")
+
+    results = {
+        "import": summarize(import_times),
+        "first_request": summarize([run["first_request_s"] for run in runs]),
+        "ready": summarize([run["ready_s"] for run in runs]),
+        "dependencies": runs[-1]["dependencies"],
+    }
+    print(f"\n{'seconds':<22}{'median':>10}{'min':>10}{'max':>10}")
+    for label, key in (("import main", "import"), ("first 200 (GET /)", "first_request"), ("ready (GET /ready)", "ready")):
+        cells = "".join(f"{results[key][stat] if results[key][stat] is not None else '-':>10}" for stat in ("median_s", "min_s", "max_s"))
+        print(f"{label:<22}{cells}")
+    if results["dependencies"]:
+        print("\nStart-up of each dependency (last run):")
+        for name, check in results["dependencies"].items():
+            print(f"  {name:<10}{check['status']:<10}{check.get('seconds', '')}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"git_commit": git_commit(), "settings": vars(args), "results": results}, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# bench_docx.py
+"""
+Compares .docx text extraction with python-docx (the previous approach, body paragraphs only)
+and the streaming lxml extractor in backend/core/docx_extractor.py.
+
+    python bench_docx.py                      # sample.docx + synthetic 1k/10k/50k-paragraph documents
+    python bench_docx.py --paragraphs 100000
+
+Reports wall time, peak Python heap (tracemalloc; libxml2's own C allocations are not
+included) and characters extracted. Synthetic
+documents contain tables, so python-docx extracts less text from them.
+"""
+import argparse
+import io
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "..", "backend_v2_wRDS_S3_WIP", "beanstalk_files"))
+
+import docx # noqa: E402
+
+from backend.core.docx_extractor import extract_docx_text # noqa: E402
+
+from _common import docx_bytes # noqa: E402
+
+SAMPLE_DOCX = os.path.join(HERE, "..", "sample.docx")
+
+
+def python_docx_text(contents: bytes) -> str:
+    doc = docx.Document(io.BytesIO(contents))
+    return "\n".join(para.text for para in doc.paragraphs)
+
+
+def streaming_text(contents: bytes) -> str:
+    return extract_docx_text(contents, max_decompressed_bytes=2**40)
+
+
+def synthetic_docx(paragraphs: int) -> bytes:
+    doc = docx.Document()
+    doc.sections[0].header.paragraphs[0].text = "Daily News Wire"
+    for i in range(paragraphs):
+        doc.add_paragraph(f"Paragraph {i}: French and German ministers met UN officials in Geneva to discuss trade and energy policy.")
+        if i % 100 == 99:
+            table = doc.add_table(rows=3, cols=3)
+            for row in table.rows:
+                for cell in row.cells:
+                    cell.text = f"Cell {i}"
+    return docx_bytes(doc)
+
+
+def measure(fn, contents: bytes, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        text = fn(contents)
+        timings.append((time.perf_counter() - start) * 1000)
+    tracemalloc.start()
+    fn(contents)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings), peak, len(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paragraphs", type=int, nargs="*", default=[1000, 10000, 50000], help="synthetic document sizes")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with open(SAMPLE_DOCX, "rb") as f:
+        documents = [("sample.docx", f.read())]
+    for count in args.paragraphs:
+        documents.append((f"synthetic {count} paragraphs", synthetic_docx(count)))
+
+    for name, contents in documents:
+        print(f"\n{name} ({len(contents) / 1024:.0f} KiB)")
+        for label, fn in (("python-docx", python_docx_text), ("streaming lxml", streaming_text)):
+            median_ms, peak, chars = measure(fn, contents, args.repeat)
+            print(f"  {label:<16} {median_ms:10.1f} ms   peak {peak / 2**20:7.1f} MiB   {chars:>10,} chars")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+# bench_entity_search.py
+"""
+"Which articles mention X?" on a synthetic analysis history in SQLite: scanning the JSON
+entity columns (what answering it without an index costs) versus the entity index
+(entity / record_entity) used by GET /api/v1/entities/search.
+
+    python bench_entity_search.py                      # 1,000,000 records
+    python bench_entity_search.py --records 100000 --db /tmp/history.db
+
+Entity names are drawn from a Zipf-like distribution, so the report covers a common
+entity (matches early in a newest-first scan) and rare ones (the scan reads every row).
+It also reports the throughput of backend/db/backfill_entities.py, which builds the index.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(HERE, "..", "..", "backend_v2_wRDS_S3_WIP", "beanstalk_files")
+sys.path.insert(0, APP_DIR)
+
+POOLS = {"nationalities": 200, "organizations": 5000, "people": 20000}
+PREFIXES = {"nationalities": "Nationality", "organizations": "Organization", "people": "Person"}
+PER_RECORD = {"nationalities": 2, "organizations": 3, "people": 4}
+
+
+def entity_names(field):
+    return [f"{PREFIXES[field]} {i}" for i in range(POOLS[field])]
+
+
+def generate(path, records, seed=7):
+    """Writes `records` completed analysis records with Zipf-distributed entities."""
+    rng = random.Random(seed)
+    names = {field: entity_names(field) for field in POOLS}
+    cum_weights = {}
+    for field, size in POOLS.items():
+        total, weights = 0.0, []
+        for rank in range(1, size + 1):
+            total += 1 / rank ** 1.1
+            weights.append(total)
+        cum_weights[field] = weights
+
+    conn = sqlite3.connect(path)
+    start = time.perf_counter()
+    batch = []
+    for i in range(records):
+        entities = [
+            json.dumps(sorted(set(rng.choices(names[field], cum_weights=cum_weights[field], k=PER_RECORD[field]))))
+            for field in ("nationalities", "organizations", "people")
+        ]
+        batch.append((f"article_{i}.txt", f"Summary of article {i}.", *entities))
+        if len(batch) == 10000:
+            _insert(conn, batch)
+            batch = []
+    _insert(conn, batch)
+    conn.commit()
+    conn.close()
+    print(f"Generated {records} records in {time.perf_counter() - start:.1f} s")
+
+
+def _insert(conn, rows):
+    conn.executemany(
+        "INSERT INTO analysis_records (original_filename, analysis_summary, analysis_nationalities,"
+        " analysis_organizations, analysis_people, status) VALUES (?, ?, ?, ?, ?, 'completed')",
+        rows,
+    )
+
+
+def scan_search(conn, field, name, limit):
+    """Newest-first JSON scan, stopping once `limit` matches are found."""
+    column = f"analysis_{field}"
+    return [row[0] for row in conn.execute(
+        f"SELECT id FROM analysis_records WHERE status = 'completed' AND EXISTS"
+        f" (SELECT 1 FROM json_each({column}) WHERE lower(json_each.value) = lower(?))"
+        f" ORDER BY id DESC LIMIT ?",
+        (name, limit),
+    )]
+
+
+def timed(fn, repeat):
+    timings, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=1_000_000)
+    parser.add_argument("--db", help="SQLite file to (re)create (default: a temporary file)")
+    parser.add_argument("--limit", type=int, default=50, help="page size, as in the search API")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=1000, help="backfill records per transaction")
+    args = parser.parse_args()
+
+    path = args.db or os.path.join(tempfile.mkdtemp(prefix="bench_entity_"), "history.db")
+    if os.path.exists(path):
+        os.remove(path)
+    # The app reads its database from the environment at import time
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(path)}"
+    os.environ["DB_STATEMENT_TIMEOUT_MS"] = "0"
+
+    from backend.db import crud, database # noqa: E402
+    from backend.db.backfill_entities import backfill # noqa: E402
+    database.init_engine()
+
+    async def create_tables():
+        async with database.engine.begin() as conn:
+            await conn.run_sync(database.Base.metadata.create_all)
+        await database.engine.dispose() # Each asyncio.run() gets a new event loop
+
+    asyncio.run(create_tables())
+    generate(path, args.records)
+
+    async def run_backfill():
+        start = time.perf_counter()
+        processed = await backfill(args.batch_size)
+        await database.engine.dispose()
+        return processed, time.perf_counter() - start
+
+    # Tests every entity kind: a head, a mid and a tail entity of the distribution
+    probes = [
+        ("organizations", "Organization 0"),
+        ("people", "Person 50"),
+        ("organizations", "Organization 4000"),
+        ("people", "Person 19990"),
+    ]
+
+    scan_conn = sqlite3.connect(path)
+    print(f"\nJSON scan (json_each over analysis_{{field}}), first {args.limit} matches, newest first:")
+    scan_results = {}
+    for field, name in probes:
+        ms, ids = timed(lambda: scan_search(scan_conn, field, name, args.limit), args.repeat)
+        scan_results[name] = ids
+        print(f"  {name:<20} {ms:10.1f} ms   ({len(ids)} matches)")
+
+    processed, elapsed = asyncio.run(run_backfill())
+    print(f"\nBackfill: {processed} records in {elapsed:.1f} s ({processed / elapsed:.0f} records/s)")
+    links = scan_conn.execute("SELECT count(*) FROM record_entity").fetchone()[0]
+    entities = scan_conn.execute("SELECT count(*) FROM entity").fetchone()[0]
+    print(f"Index: {entities} entities, {links} record_entity rows")
+    scan_conn.close()
+
+    async def index_search():
+        timings = {}
+        async with database.SessionLocal() as db:
+            for field, name in probes:
+                kind = dict((f, k) for k, f in crud.ENTITY_KINDS)[field]
+                search = lambda: crud.search_records_by_entity(db, name, kind=kind, limit=args.limit)
+                await search() # Warm the statement cache
+                samples, records = [], []
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    records = await search()
+                    samples.append((time.perf_counter() - start) * 1000)
+                timings[name] = (statistics.median(samples), [record.id for record in records])
+        await database.dispose_engine()
+        return timings
+
+    print(f"\nEntity index (crud.search_records_by_entity), first {args.limit} matches, newest first:")
+    for name, (ms, ids) in asyncio.run(index_search()).items():
+        same = "same ids as scan" if ids == scan_results[name] else "DIFFERENT ids from scan"
+        print(f"  {name:<20} {ms:10.1f} ms   ({len(ids)} matches, {same})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# bench_gazetteer.py
+"""
+Compares the gazetteer nationality matcher with the LLM prompt on sample_entities.txt.
+
+    python bench_gazetteer.py            # gazetteer only (no API key needed)
+    python bench_gazetteer.py --llm 5    # also time 5 real extract_nationalities calls
+
+Run from anywhere; it imports the v2 backend from this repository.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "..", "backend_v2_wRDS_S3_WIP", "beanstalk_files"))
+
+from backend.core import openai_utils # noqa: E402
+from backend.core.gazetteer import Gazetteer, GAZETTEER_PATH, nationality_gazetteer # noqa: E402
+
+SAMPLE_FILE = os.path.join(HERE, "..", "sample_entities.txt")
+
+
+def time_calls(fn, repeat):
+    """Per-call wall times in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(label, timings):
+    timings = sorted(timings)
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(f"{label:<32} median {statistics.median(timings):9.4f} ms   p95 {p95:9.4f} ms   (n={len(timings)})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=2000, help="gazetteer iterations per input")
+    parser.add_argument("--llm", type=int, default=0, metavar="N", help="also time N LLM extractions (needs OPENAI_API_KEY)")
+    args = parser.parse_args()
+
+    with open(SAMPLE_FILE, encoding="utf-8") as f:
+        sample = f.read()
+    # Same article repeated up to the default MAX_TEXT_LENGTH (20k chars)
+    long_article = ((sample + "\n\n") * (20000 // len(sample) + 1))[:20000]
+
+    start = time.perf_counter()
+    Gazetteer.from_tsv(GAZETTEER_PATH)
+    print(f"Gazetteer load + compile: {(time.perf_counter() - start) * 1000:.1f} ms ({len(nationality_gazetteer)} surface forms)")
+
+    result = nationality_gazetteer.match(sample)
+    print(f"Gazetteer result: {result.nationalities} (ambiguous: {sorted(result.ambiguous)})")
+    report(f"gazetteer, {len(sample)} chars", time_calls(lambda: nationality_gazetteer.match(sample), args.repeat))
+    report(f"gazetteer, {len(long_article)} chars", time_calls(lambda: nationality_gazetteer.match(long_article), args.repeat))
+
+    if args.llm:
+        if not openai_utils.get_client():
+            print("OPENAI_API_KEY not set, skipping the LLM comparison.")
+            return
+
+        async def run_llm():
+            timings, result = [], None
+            for _ in range(args.llm):
+                start = time.perf_counter()
+                result = await openai_utils.extract_nationalities(sample)
+                timings.append((time.perf_counter() - start) * 1000)
+            await openai_utils.close_client()
+            return timings, result
+
+        timings, llm_result = asyncio.run(run_llm())
+        print(f"LLM result: {llm_result}")
+        report(f"LLM, {len(sample)} chars", timings)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+# bench_load.py
+"""
+End-to-end load test of POST /analyze: keeps `--concurrency` requests in flight, mixing
+direct text, .txt uploads and .docx uploads, and reports throughput, latency percentiles
+(overall and per payload type), status codes and the median of each Server-Timing stage.
+
+    python bench_load.py --url http://127.0.0.1:8000 --concurrency 32 --requests 1000
+    python bench_load.py --duration 60 --mix text=2,txt=1,docx=1 --output results.json
+
+Every article is made unique, so the result cache and request coalescing don't hide the
+OpenAI calls (pass --repeat-content to measure them instead). Run the backend against
+openai_stub.py to test offline. --output writes the results, the settings used and the
+git commit as JSON, for comparing runs across commits.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+import httpx
+
+from _common import git_commit, make_docx, percentile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SAMPLE_TEXT = os.path.join(HERE, "..", "sample_entities.txt")
+
+DOCX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+def parse_mix(spec: str) -> dict:
+    """'text=2,txt=1,docx=1' -> {'text': 2.0, 'txt': 1.0, 'docx': 1.0}"""
+    mix = {}
+    for part in spec.split(","):
+        kind, _, weight = part.partition("=")
+        kind = kind.strip()
+        if kind not in ("text", "txt", "docx"):
+            raise argparse.ArgumentTypeError(f"Unknown payload type '{kind}' (expected text, txt or docx)")
+        mix[kind] = float(weight or 1)
+    return mix
+
+
+def make_article(base: str, chars: int, request_number: int, unique: bool) -> str:
+    text = (base + "\n\n") * (chars // (len(base) + 2) + 1)
+    text = text[:chars]
+    if unique:
+        text += f"\n\nReference {request_number}-{random.getrandbits(32)}."
+    return text
+
+
+def build_request(kind: str, text: str, number: int) -> dict:
+    """httpx.post keyword arguments for one /analyze request."""
+    if kind == "text":
+        return {"data": {"text_content": text}}
+    if kind == "txt":
+        return {"files": {"file_upload": (f"article_{number}.txt", text.encode("utf-8"), "text/plain")}}
+    return {"files": {"file_upload": (f"article_{number}.docx", make_docx(text), DOCX_CONTENT_TYPE)}}
+
+
+def parse_server_timing(header: str) -> dict:
+    """'openai_summary;dur=812.4, total;dur=934.5' -> {'openai_summary': 812.4, 'total': 934.5}"""
+    stages = {}
+    for entry in header.split(","):
+        name, *params = [part.strip() for part in entry.split(";")]
+        for param in params:
+            if param.startswith("dur="):
+                try:
+                    stages[name] = float(param[4:])
+                except ValueError:
+                    pass
+    return stages
+
+
+def latency_summary(latencies_ms: list) -> dict:
+    values = sorted(latencies_ms)
+    return {
+        "count": len(values),
+        "p50_ms": _round(percentile(values, 0.50)),
+        "p95_ms": _round(percentile(values, 0.95)),
+        "p99_ms": _round(percentile(values, 0.99)),
+        "max_ms": _round(values[-1] if values else None),
+    }
+
+
+def _round(value):
+    return round(value, 1) if value is not None else None
+
+
+async def run(args) -> dict:
+    base_text = open(SAMPLE_TEXT, encoding="utf-8").read().strip()
+    kinds = list(args.mix)
+    weights = [args.mix[kind] for kind in kinds]
+    results = [] # (kind, status or error name, latency ms, server timing)
+    counter = {"next": 0}
+    # Request-number limit or deadline of the running phase, and whether its results count
+    phase = {"end": args.warmup, "deadline": None, "measured": False}
+
+    def next_request():
+        number = counter["next"]
+        if phase["end"] is not None and number >= phase["end"]:
+            return None
+        if phase["deadline"] is not None and time.perf_counter() >= phase["deadline"]:
+            return None
+        counter["next"] += 1
+        kind = random.choices(kinds, weights)[0]
+        text = make_article(base_text, args.article_chars, number, not args.repeat_content)
+        return number, kind, build_request(kind, text, number)
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        async def worker():
+            while True:
+                request = next_request()
+                if request is None:
+                    return
+                number, kind, kwargs = request
+                start = time.perf_counter()
+                try:
+                    response = await client.post("/analyze", **kwargs)
+                    outcome = response.status_code
+                    timing = parse_server_timing(response.headers.get("server-timing", ""))
+                except httpx.HTTPError as e:
+                    outcome, timing = type(e).__name__, {}
+                if phase["measured"]:
+                    results.append((kind, outcome, (time.perf_counter() - start) * 1000, timing))
+
+        print(f"Load test: {args.url}/analyze, concurrency {args.concurrency}, "
+              f"{f'{args.duration:.0f} s' if args.duration else f'{args.requests} requests'} (+{args.warmup} warm-up)...")
+        if args.warmup:
+            await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        # The clock starts after the warm-up, so throughput covers the measured requests only
+        phase["measured"] = True
+        if args.duration:
+            phase["end"], phase["deadline"] = None, time.perf_counter() + args.duration
+        else:
+            phase["end"] = args.warmup + args.requests
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+        stub_stats = None
+        if args.stub_url:
+            try:
+                stub_stats = (await client.get(f"{args.stub_url.rstrip('/')}/stub/stats")).json()
+            except httpx.HTTPError as e:
+                print(f"Could not read stub stats: {e}")
+
+    measured = len(results)
+    ok = [r for r in results if r[1] == 200]
+    stage_values = defaultdict(list)
+    for _, _, _, timing in ok:
+        for stage, ms in timing.items():
+            stage_values[stage].append(ms)
+
+    return {
+        "measured_requests": measured,
+        "elapsed_seconds": round(elapsed, 2),
+        "throughput_rps": round(measured / elapsed, 2) if elapsed else None,
+        "error_rate": round(1 - len(ok) / measured, 4) if measured else None,
+        "status_codes": {str(code): count for code, count in Counter(r[1] for r in results).most_common()},
+        "latency": latency_summary([r[2] for r in ok]),
+        "latency_by_type": {kind: latency_summary([r[2] for r in ok if r[0] == kind]) for kind in kinds},
+        "server_timing_ms": {stage: latency_summary(values) for stage, values in sorted(stage_values.items())},
+        "stub_stats": stub_stats,
+    }
+
+
+def print_report(result: dict) -> None:
+    print(f"\n{result['measured_requests']} requests in {result['elapsed_seconds']} s: {result['throughput_rps']} req/s, "
+          f"error rate {result['error_rate']:.2%}")
+    print(f"Status codes: {result['status_codes']}")
+    print(f"\n{'latency (ms)':<30}{'count':>7}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+    rows = [("all (200 only)", result["latency"])] + list(result["latency_by_type"].items())
+    rows += [(f"  stage {stage}", summary) for stage, summary in result["server_timing_ms"].items()]
+    for label, summary in rows:
+        cells = "".join(f"{summary[key] if summary[key] is not None else '-':>10}" for key in ("p50_ms", "p95_ms", "p99_ms", "max_ms"))
+        print(f"{label:<30}{summary['count']:>7}{cells}")
+    if result["stub_stats"]:
+        print(f"\nStub: {result['stub_stats']['outcomes']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="backend base URL")
+    parser.add_argument("--concurrency", type=int, default=16, help="requests kept in flight")
+    parser.add_argument("--requests", type=int, default=200, help="measured requests (ignored with --duration)")
+    parser.add_argument("--duration", type=float, help="run for this many seconds instead of a fixed number of requests")
+    parser.add_argument("--warmup", type=int, default=10, help="requests sent first and not measured")
+    parser.add_argument("--mix", type=parse_mix, default="text=1,txt=1,docx=1", help="payload types and weights")
+    parser.add_argument("--article-chars", type=int, default=3000, help="article length")
+    parser.add_argument("--repeat-content", action="store_true", help="send the same article every time (cache hits)")
+    parser.add_argument("--timeout", type=float, default=180.0, help="client timeout per request, seconds")
+    parser.add_argument("--stub-url", help="openai_stub.py base URL, to include its request counts")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    result = asyncio.run(run(args))
+    print_report(result)
+
+    if args.output:
+        settings = {key: value for key, value in vars(args).items() if key != "output"}
+        report = {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": git_commit(),
+            "settings": settings,
+            "results": result,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# bench_metrics.py
+"""
+Cost of the Prometheus instrumentation in backend/core/metrics.py: each recording
+primitive, the recording one /analyze request does, recording from several threads at
+once (S3 uploads and docx parsing record from worker threads), and rendering /metrics.
+
+    python bench_metrics.py
+    python bench_metrics.py --threads 8 --series 500
+
+Run from anywhere; it imports the v2 backend from this repository.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+import timeit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "..", "backend_v2_wRDS_S3_WIP", "beanstalk_files"))
+
+from backend.core import metrics # noqa: E402
+
+
+def per_call_ns(stmt, number, repeat=5):
+    """Best-of-`repeat` time per call in nanoseconds."""
+    return min(timeit.repeat(stmt, number=number, repeat=repeat)) / number * 1e9
+
+
+def one_request():
+    """The recording done by one uploaded-file /analyze request in multi-call mode."""
+    with metrics.track_request("analyze"):
+        with metrics.stage_seconds.time("upload_read"):
+            pass
+        with metrics.stage_seconds.time("docx_parse"):
+            pass
+        with metrics.stage_seconds.time("analysis"):
+            for call in ("summary", "nationalities", "entities"):
+                metrics.openai_call_seconds.observe(0.8, call, "gpt-3.5-turbo")
+        with metrics.stage_seconds.time("s3_put"):
+            pass
+        with metrics.stage_seconds.time("db_commit"):
+            pass
+
+
+def threaded_observe_ns(threads, per_thread):
+    """Per-observation time with `threads` threads recording into the same histogram."""
+    barrier = threading.Barrier(threads + 1)
+
+    def work():
+        barrier.wait()
+        observe = metrics.stage_seconds.observe
+        for _ in range(per_thread):
+            observe(0.01, "s3_put")
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    return (time.perf_counter() - start) / (threads * per_thread) * 1e9
+
+
+async def endpoint_overhead_ns(number):
+    """Extra time per call of an async endpoint wrapped in @metrics.tracked."""
+    async def handler():
+        return None
+    tracked = metrics.tracked("bench")(handler)
+
+    async def run(func):
+        start = time.perf_counter()
+        for _ in range(number):
+            await func()
+        return time.perf_counter() - start
+
+    bare = min([await run(handler) for _ in range(5)])
+    wrapped = min([await run(tracked) for _ in range(5)])
+    return (wrapped - bare) / number * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=200_000, help="calls per timing")
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--series", type=int, default=100, help="extra label combinations when timing /metrics rendering")
+    args = parser.parse_args()
+
+    counter = metrics.openai_retries
+    histogram = metrics.stage_seconds
+    print("Per call (best of 5):")
+    rows = [
+        ("(empty call, for reference)", lambda: None),
+        ("Counter.inc", lambda: counter.inc("RateLimitError")),
+        ("Histogram.observe", lambda: histogram.observe(0.25, "analysis")),
+        ("with Histogram.time()", lambda: histogram.time("analysis").__enter__().__exit__(None, None, None)),
+        ("with track_request()", lambda: metrics.track_request("analyze").__enter__().__exit__(None, None, None)),
+    ]
+    for label, stmt in rows:
+        print(f"  {label:<28} {per_call_ns(stmt, args.number):8.0f} ns")
+    print(f"  {'@tracked endpoint':<28} {asyncio.run(endpoint_overhead_ns(args.number)):8.0f} ns (over a bare coroutine)")
+
+    request_us = per_call_ns(one_request, args.number // 10) / 1000
+    print(f"\nOne /analyze request (1 request tracker, 5 stage timers, 3 OpenAI observations): {request_us:.1f} us")
+    print(f"  = {request_us / 1000 / 1000 * 100:.5f} % of a 1 s request (three OpenAI calls take seconds)")
+
+    single = threaded_observe_ns(1, args.number)
+    contended = threaded_observe_ns(args.threads, args.number // args.threads)
+    print(f"\nHistogram.observe from 1 thread: {single:.0f} ns, from {args.threads} threads at once: {contended:.0f} ns per observation")
+
+    for i in range(args.series):
+        metrics.openai_call_seconds.observe(1.0, f"call_{i}", "gpt-3.5-turbo")
+    lines = metrics.render().count("\n")
+    start = time.perf_counter()
+    repeat = 50
+    for _ in range(repeat):
+        metrics.render()
+    print(f"\nGET /metrics rendering: {(time.perf_counter() - start) / repeat * 1000:.2f} ms for {lines} lines")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+# bench_request_path.py
+"""
+Micro-benchmarks of the CPU-bound helpers on the /analyze request path, over generated
+inputs from 1 KB to 10 MB:
+
+    read_uploaded_file[txt|docx]   file_processor.read_uploaded_file on an upload of N bytes of text
+    extract_docx_text              docx_extractor.extract_docx_text (the old read_docx) on the same .docx
+    parse_nationalities            openai_utils.parse_nationalities on an N-byte comma-separated completion
+    parse_entities                 openai_utils.parse_entities on N bytes of "Organizations:/People:" lines
+    AnalysisResponse(...)          schemas.AnalysisResponse built from fields totalling N bytes
+    AnalysisResponse.model_validate_json   the same, parsed from JSON (single-call mode)
+
+    python bench_request_path.py                                  # all cases, 1KB..10MB
+    python bench_request_path.py --only parse --sizes 1KB,1MB
+    python bench_request_path.py --save baseline.json             # store a baseline
+    python bench_request_path.py --compare baseline.json          # flag regressions against it
+
+Each case is timed in --repeat runs (with the garbage collector off), each calling the
+function often enough to take at least --min-time seconds. The best and the median run are
+reported ('±' is the median absolute deviation); --compare uses the best, which other load
+on the machine disturbs least. Memory is the peak Python heap of one call (tracemalloc),
+measured in a separate run. .docx uploads of DOCX_PROCESS_POOL_MIN_BYTES and more are
+parsed in the DOCX process pool, whose memory is not included.
+
+--compare exits with status 1 when a case is more than --threshold slower than the
+baseline (or the peak memory more than --memory-threshold larger). Compare runs from the
+same machine, since the timings are absolute; on a busy or shared machine raise --repeat.
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "..", "backend_v2_wRDS_S3_WIP", "beanstalk_files"))
+
+from fastapi import UploadFile # noqa: E402
+
+from backend.core import docx_extractor, file_processor, openai_utils # noqa: E402
+from backend.db import schemas # noqa: E402
+
+from _common import git_commit, make_docx # noqa: E402
+
+SAMPLE_TEXT = os.path.join(HERE, "..", "sample_entities.txt")
+
+NATIONALITIES = ["French", "German", "British", "American", "Canadian", "Japanese", "Chinese", "Indian", "Brazilian",
+                 "Mexican", "Italian", "Spanish", "Russian", "Ukrainian", "Polish", "Turkish", "Egyptian", "Kenyan",
+                 "Nigerian", "Australian", "Germany", "France", "Japan", "the British", "Americans"]
+ORGANIZATIONS = ["NATO", "United Nations", "European Union", "World Bank", "FBI", "Red Cross", "Reuters", "IMF",
+                 "Ministry of Defence", "Labour Party", "Amnesty International", "World Health Organization"]
+PEOPLE = ["Emmanuel Macron", "Olaf Scholz", "Rishi Sunak", "Joe Biden", "Jacinda Ardern", "Antonio Guterres",
+          "Ursula von der Leyen", "Justin Trudeau", "Narendra Modi", "Fumio Kishida"]
+
+
+# --- Inputs ---
+
+def parse_size(text: str) -> int:
+    units = {"KB": 1024, "MB": 1024 * 1024, "B": 1}
+    text = text.strip().upper()
+    for suffix, factor in units.items():
+        if text.endswith(suffix):
+            return int(float(text[:-len(suffix)]) * factor)
+    return int(text)
+
+
+def size_label(size: int) -> str:
+    if size >= 1024 * 1024 and size % (1024 * 1024) == 0:
+        return f"{size // (1024 * 1024)}MB"
+    if size >= 1024 and size % 1024 == 0:
+        return f"{size // 1024}KB"
+    return f"{size}B"
+
+
+def article_text(size: int) -> str:
+    base = open(SAMPLE_TEXT, encoding="utf-8").read().strip() + "\n\n"
+    return (base * (size // len(base) + 1))[:size]
+
+
+def name_list(size: int, names: list, rng: random.Random) -> str:
+    """A ', '-separated list of about `size` bytes; mostly repeats, as in real completions."""
+    pool = names + [f"{name} {i}" for i in range(max(1, size // 200)) for name in names[:2]]
+    items, length = [], 0
+    while length < size:
+        item = rng.choice(pool)
+        items.append(item)
+        length += len(item) + 2
+    return ", ".join(items)[:size].rstrip(", ")
+
+
+def spooled_upload(filename: str, contents: bytes) -> UploadFile:
+    """An UploadFile like the one the multipart parser produces (spooled to disk above 1 MB)."""
+    spooled = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    spooled.write(contents)
+    spooled.seek(0)
+    return UploadFile(file=spooled, filename=filename, size=len(contents))
+
+
+def build_cases(size: int, rng: random.Random, loop: asyncio.AbstractEventLoop) -> dict:
+    """name -> zero-argument function doing one call on an input of `size` bytes."""
+    text = article_text(size)
+    docx_contents = make_docx(text)
+    txt_upload = spooled_upload("article.txt", text.encode("utf-8"))
+    docx_upload = spooled_upload("article.docx", docx_contents)
+    nationalities = name_list(size, NATIONALITIES, rng)
+    entities = f"Organizations: {name_list(size // 2, ORGANIZATIONS, rng)}\nPeople: {name_list(size // 2, PEOPLE, rng)}"
+    fields = {
+        "filename": "article.docx",
+        "s3_object_key": "uploads/0123456789abcdef.docx",
+        "summary": text[:size // 4],
+        "nationalities": sorted(set(nationalities[:size // 4].split(", "))),
+        "organizations": sorted(set(name_list(size // 4, ORGANIZATIONS, rng).split(", "))),
+        "people": sorted(set(name_list(size // 4, PEOPLE, rng).split(", "))),
+    }
+    fields_json = json.dumps(fields)
+
+    return {
+        "read_uploaded_file[txt]": lambda: loop.run_until_complete(file_processor.read_uploaded_file(txt_upload)),
+        "read_uploaded_file[docx]": lambda: loop.run_until_complete(file_processor.read_uploaded_file(docx_upload)),
+        "extract_docx_text": lambda: docx_extractor.extract_docx_text(docx_contents),
+        "parse_nationalities": lambda: openai_utils.parse_nationalities(nationalities),
+        "parse_entities": lambda: openai_utils.parse_entities(entities),
+        "AnalysisResponse(...)": lambda: schemas.AnalysisResponse(**fields),
+        "AnalysisResponse.model_validate_json": lambda: schemas.AnalysisResponse.model_validate_json(fields_json),
+    }
+
+
+# --- Measurement ---
+
+def time_case(func, repeat: int, min_time: float) -> dict:
+    """Best, median and median absolute deviation of the per-call time, in seconds."""
+    func() # warm-up (imports, process pool start-up, caches)
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        if time.perf_counter() - start >= min_time:
+            break
+        number *= 2
+
+    runs = []
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                func()
+            runs.append((time.perf_counter() - start) / number)
+    finally:
+        gc.enable()
+    median = statistics.median(runs)
+    return {
+        "best_s": min(runs),
+        "median_s": median,
+        "mad_s": statistics.median(abs(run - median) for run in runs),
+        "calls": number * repeat,
+    }
+
+
+def peak_memory(func) -> int:
+    """Peak Python heap allocated during one call, in bytes."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def format_time(seconds: float) -> str:
+    if seconds >= 1:
+        return f"{seconds:.2f} s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f} ms"
+    return f"{seconds * 1e6:.1f} us"
+
+
+def format_bytes(size: float) -> str:
+    if size >= 1024 * 1024:
+        return f"{size / (1024 * 1024):.1f} MB"
+    return f"{size / 1024:.1f} KB"
+
+
+def run(args) -> dict:
+    rng = random.Random(args.seed)
+    loop = asyncio.new_event_loop()
+    results = {}
+    try:
+        for size in args.sizes:
+            label = size_label(size)
+            print(f"\n{label} inputs")
+            print(f"  {'case':<40}{'best':>12}{'median':>12}{'':>10}{'MB/s':>10}{'peak mem':>12}")
+            for name, func in build_cases(size, rng, loop).items():
+                if args.only and not any(pattern in name for pattern in args.only):
+                    continue
+                timing = time_case(func, args.repeat, args.min_time)
+                timing["peak_bytes"] = peak_memory(func)
+                results.setdefault(name, {})[label] = timing
+                spread = f"± {timing['mad_s'] / timing['median_s']:.1%}" if timing["median_s"] else ""
+                throughput = size / timing["best_s"] / (1024 * 1024)
+                print(f"  {name:<40}{format_time(timing['best_s']):>12}{format_time(timing['median_s']):>12}{spread:>10}"
+                      f"{throughput:>10.1f}{format_bytes(timing['peak_bytes']):>12}")
+    finally:
+        loop.close()
+        docx_extractor.shutdown_executor()
+    return results
+
+
+# --- Baselines ---
+
+def compare(results: dict, baseline: dict, threshold: float, memory_threshold: float) -> int:
+    """Prints each case against the baseline. Returns the number of regressions."""
+    print(f"\nCompared with the baseline from {baseline.get('timestamp')} (commit {(baseline.get('git_commit') or '?')[:10]}):")
+    regressions = 0
+    for name, by_size in results.items():
+        for label, current in by_size.items():
+            previous = baseline["results"].get(name, {}).get(label)
+            if previous is None:
+                continue
+            # Best runs are the least disturbed by other load on the machine, so they're compared
+            ratio = current["best_s"] / previous["best_s"] if previous["best_s"] else 1.0
+            slower = ratio > 1 + threshold
+            faster = ratio < 1 - threshold
+            memory_ratio = current["peak_bytes"] / previous["peak_bytes"] if previous["peak_bytes"] else 1.0
+            # Ignore a few KB of allocator noise on the small inputs
+            more_memory = memory_ratio > 1 + memory_threshold and current["peak_bytes"] - previous["peak_bytes"] > 16 * 1024
+
+            if slower or more_memory:
+                regressions += 1
+                status = "REGRESSION"
+            elif faster:
+                status = "faster"
+            else:
+                status = "ok"
+            print(f"  {status:<11}{name + ' ' + label:<48}{format_time(previous['best_s']):>11} -> {format_time(current['best_s']):<11}"
+                  f"({ratio - 1:+.1%})  mem {format_bytes(previous['peak_bytes'])} -> {format_bytes(current['peak_bytes'])} ({memory_ratio - 1:+.1%})")
+    print(f"\n{regressions} regression(s) (threshold {threshold:.0%} time, {memory_threshold:.0%} memory).")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=lambda value: [parse_size(size) for size in value.split(",")],
+                        default="1KB,10KB,100KB,1MB,10MB", help="input sizes (default 1KB,10KB,100KB,1MB,10MB)")
+    parser.add_argument("--only", type=lambda value: value.split(","), help="only cases whose name contains one of these")
+    parser.add_argument("--repeat", type=int, default=7, help="timed runs per case (default 7)")
+    parser.add_argument("--min-time", type=float, default=0.2, help="minimum seconds per timed run (default 0.2)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--save", help="write the results as a baseline JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to compare with")
+    parser.add_argument("--threshold", type=float, default=0.15, help="slowdown flagged as a regression (default 0.15 = 15%%)")
+    parser.add_argument("--memory-threshold", type=float, default=0.20, help="peak memory growth flagged as a regression (default 0.20)")
+    args = parser.parse_args()
+
+    print(f"Python {platform.python_version()} on {platform.machine()}, {args.repeat} runs of >= {args.min_time} s per case")
+    results = run(args)
+
+    if args.save:
+        report = {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "machine": platform.node(),
+            "results": results,
+        }
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline written to {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("machine") != platform.node():
+            print(f"\nNote: the baseline was recorded on '{baseline.get('machine')}', not this machine.")
+        if compare(results, baseline, args.threshold, args.memory_threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# bench_upload_memory.py
+"""
+Peak Python memory of reading one uploaded article, measured with tracemalloc:
+
+- baseline: the previous approach (read the whole upload into bytes, extract from the bytes,
+  keep the bytes for the S3 upload)
+- single-pass: file_processor.read_article_input (hash + extract from the spooled upload file,
+  which is also what gets streamed to S3)
+
+"peak" is the high-water mark while reading; "held" is what stays allocated for the rest of
+the request (analysis, S3 upload, DB write).
+
+    python bench_upload_memory.py --size-mb 20
+
+The upload is spooled exactly as Starlette's multipart parser does (1 MB in memory, then disk).
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "..", "backend_v2_wRDS_S3_WIP", "beanstalk_files"))
+
+from fastapi import UploadFile # noqa: E402
+from starlette.datastructures import Headers # noqa: E402
+
+from backend.core import file_processor # noqa: E402
+from backend.core.config import settings # noqa: E402
+
+from _common import make_docx # noqa: E402
+
+SPOOL_MAX_SIZE = 1024 * 1024 # starlette.formparsers.MultiPartParser.spool_max_size
+CONTENT_TYPES = {
+    ".txt": "text/plain",
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+}
+
+
+def make_txt(size_bytes: int) -> bytes:
+    paragraph = b"The French delegation met German and Japanese officials in Geneva to discuss trade. " * 10 + b"\n\n"
+    return (paragraph * (size_bytes // len(paragraph) + 1))[:size_bytes]
+
+
+def make_large_docx(size_bytes: int) -> bytes:
+    # Random-ish words compress poorly, so the .docx approaches the requested size
+    words = [os.urandom(6).hex() for _ in range(5000)]
+    lines = []
+    written, i = 0, 0
+    while written < size_bytes:
+        line = " ".join(words[(i + j) % len(words)] for j in range(60))
+        lines.append(line)
+        written += len(line) // 2 # ~2:1 compression for hex text
+        i += 61
+    return make_docx("\n\n".join(lines))
+
+
+def spooled_upload(filename: str, contents: bytes) -> UploadFile:
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    spool.write(contents)
+    spool.seek(0)
+    ext = os.path.splitext(filename)[1]
+    return UploadFile(file=spool, size=len(contents), filename=filename, headers=Headers({"content-type": CONTENT_TYPES[ext]}))
+
+
+async def baseline(upload: UploadFile):
+    contents = await upload.read()
+    return file_processor.extract_text(upload.filename, contents), contents
+
+
+async def single_pass(upload: UploadFile):
+    article = await file_processor.read_article_input(None, upload)
+    return article.text, article
+
+
+def measure(label: str, fn, filename: str, contents: bytes) -> None:
+    upload = spooled_upload(filename, contents)
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    result = None
+    try:
+        result = asyncio.run(fn(upload))
+        note = f"{len(result[0]):,} chars"
+    except Exception as e:
+        note = f"error: {getattr(e, 'detail', e)}"
+    elapsed = time.perf_counter() - start
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    upload.file.close()
+    print(f"{label:<28} peak {peak / 2**20:8.1f} MiB   held {held / 2**20:8.1f} MiB   {elapsed * 1000:8.1f} ms   ({note})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=float, default=20, help="approximate upload size")
+    args = parser.parse_args()
+    size = int(args.size_mb * 1024 * 1024)
+
+    # Measure reading and extraction, not the analysis length limits
+    settings.MAX_ANALYSIS_TEXT_LENGTH = sys.maxsize
+    settings.MAX_UPLOAD_BYTES = max(settings.MAX_UPLOAD_BYTES, 4 * size)
+
+    for filename, contents in (("article.txt", make_txt(size)), ("article.docx", make_large_docx(size))):
+        print(f"\n{filename}: {len(contents) / 2**20:.1f} MiB upload")
+        measure("baseline (read + extract)", baseline, filename, contents)
+        measure("single-pass", single_pass, filename, contents)
+
+
+if __name__ == "__main__":
+    main()
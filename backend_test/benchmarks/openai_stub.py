@@ -0,0 +1,171 @@
+# openai_stub.py
+"""
+Local stand-in for the OpenAI chat-completions API, for load tests and offline runs of the
+v2 backend. It answers POST /v1/chat/completions (plain, streamed and JSON-schema requests)
+with canned analysis output, after a latency drawn from a configurable distribution, and
+can inject 429s, 5xx errors and hung requests.
+
+    python openai_stub.py --port 8100 --latency lognormal:0.8,0.4 --rate-limit-rate 0.02 --error-rate 0.01
+
+Point the backend at it with:
+
+    OPENAI_BASE_URL=http://127.0.0.1:8100/v1 OPENAI_API_KEY=stub uvicorn main:app
+
+Latency specs (seconds): fixed:S, uniform:LO,HI, normal:MEAN,SD, lognormal:MEDIAN,SIGMA.
+GET /stub/stats returns request counts by outcome and model.
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+import uuid
+from collections import Counter
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+app = FastAPI(title="OpenAI stub")
+config = argparse.Namespace()
+stats = {"outcomes": Counter(), "models": Counter(), "started": time.time()}
+rng = random.Random()
+
+
+def parse_latency(spec: str):
+    """Returns a function drawing one latency in seconds from a spec such as 'lognormal:0.8,0.4'."""
+    kind, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(",")] if params else []
+    if kind == "fixed" and len(values) == 1:
+        return lambda: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda: rng.uniform(values[0], values[1])
+    if kind == "normal" and len(values) == 2:
+        return lambda: max(0.0, rng.gauss(values[0], values[1]))
+    if kind == "lognormal" and len(values) == 2:
+        return lambda: rng.lognormvariate(math.log(values[0]), values[1])
+    raise argparse.ArgumentTypeError(f"Invalid latency spec '{spec}' (e.g. fixed:0.5, uniform:0.2,1.5, normal:0.8,0.2, lognormal:0.8,0.4)")
+
+
+def completion_text(body: dict) -> str:
+    """Canned output in the format each of the backend's prompts asks for."""
+    prompt = body["messages"][-1]["content"]
+    if body.get("response_format"):
+        return json.dumps({
+            "summary": "Officials from several countries met to discuss trade and security.",
+            "nationalities": ["French", "German"],
+            "organizations": ["NATO", "United Nations"],
+            "people": ["Emmanuel Macron"],
+        })
+    if "Organizations:" in prompt:
+        return "Organizations: NATO, United Nations\nPeople: Emmanuel Macron, Olaf Scholz"
+    if "comma-separated" in prompt:
+        return "French, German, British"
+    return "Officials from several countries met to discuss trade and security. The talks ended without an agreement."
+
+
+def error_response(status: int, message: str, code: str, headers=None) -> JSONResponse:
+    return JSONResponse(status_code=status, content={"error": {"message": message, "type": code, "code": code}}, headers=headers)
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    stats["models"][body.get("model", "unknown")] += 1
+
+    # --- Injected failures ---
+    roll = rng.random()
+    if roll < config.rate_limit_rate:
+        stats["outcomes"]["rate_limited"] += 1
+        return error_response(429, "Rate limit reached (stub).", "rate_limit_exceeded", {"retry-after-ms": str(config.retry_after_ms)})
+    roll -= config.rate_limit_rate
+    if roll < config.error_rate:
+        stats["outcomes"]["server_error"] += 1
+        await asyncio.sleep(config.latency() / 4)
+        return error_response(500, "The server had an error while processing your request (stub).", "server_error")
+    roll -= config.error_rate
+    if roll < config.timeout_rate:
+        stats["outcomes"]["hung"] += 1
+        await asyncio.sleep(config.hang_seconds)
+
+    content = completion_text(body)
+    prompt_tokens = sum(len(message.get("content") or "") for message in body["messages"]) // 4 + 7
+    completion_tokens = len(content) // 4 + 1
+    usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+    completion_id = f"chatcmpl-stub-{uuid.uuid4().hex[:12]}"
+    created = int(time.time())
+    model = body.get("model", "stub")
+    # Time to first token, then the completion at tokens_per_second (if set)
+    first_token = config.latency()
+    per_token = 1 / config.tokens_per_second if config.tokens_per_second > 0 else 0.0
+    stats["outcomes"]["ok"] += 1
+
+    if body.get("stream"):
+        async def events():
+            await asyncio.sleep(first_token)
+            words = content.split(" ")
+            for i, word in enumerate(words):
+                delta = {"role": "assistant", "content": word if i == 0 else " " + word}
+                yield _chunk(completion_id, created, model, delta, None)
+                if per_token:
+                    await asyncio.sleep(per_token)
+            yield _chunk(completion_id, created, model, {}, "stop")
+            if (body.get("stream_options") or {}).get("include_usage"):
+                yield f"data: {json.dumps({'id': completion_id, 'object': 'chat.completion.chunk', 'created': created, 'model': model, 'choices': [], 'usage': usage})}\n\n"
+            yield "data: [DONE]\n\n"
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    await asyncio.sleep(first_token + per_token * completion_tokens)
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": created,
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": usage,
+    }
+
+
+def _chunk(completion_id: str, created: int, model: str, delta: dict, finish_reason) -> str:
+    chunk = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": created,
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    return f"data: {json.dumps(chunk)}\n\n"
+
+
+@app.get("/stub/stats")
+async def get_stats():
+    return {
+        "uptime_seconds": round(time.time() - stats["started"], 1),
+        "outcomes": dict(stats["outcomes"]),
+        "models": dict(stats["models"]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=parse_latency, default="lognormal:0.8,0.4", help="time to first token (default: lognormal:0.8,0.4)")
+    parser.add_argument("--tokens-per-second", type=float, default=0, help="completion generation speed; 0 = instant")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--retry-after-ms", type=int, default=500, help="retry-after-ms header of injected 429s")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 500")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="fraction of requests that hang for --hang-seconds first")
+    parser.add_argument("--hang-seconds", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, help="seed for latencies and injected failures")
+    args = parser.parse_args()
+
+    vars(config).update(vars(args))
+    if args.seed is not None:
+        rng.seed(args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning", access_log=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,8 @@ import time # For potential delays if needed
 # Use http or https depending on your Beanstalk setup
 BASE_URL = "http://ai-news-analyzer-env.example.us-east-1.elasticbeanstalk.com" # Make sure this is correct
 ANALYZE_ENDPOINT = f"{BASE_URL}/analyze"
+ANALYSES_ENDPOINT = f"{BASE_URL}/analyses"
+ENTITY_SEARCH_ENDPOINT = f"{BASE_URL}/entities/search"
 SAMPLE_ENTITIES_FILE = "sample_entities.txt" # New sample file
 
 # --- Helper Functions ---
@@ -167,6 +169,52 @@ def test_analyze_file_with_entities_and_s3():
     except Exception as e:
          print_status(test_name, False, f"An error occurred: {e}")
 
+def test_history_lists_saved_analysis():
+    """Saves an analysis, then checks it is listed by GET /analyses and GET /entities/search."""
+    test_name = "History Lists Saved Analysis"
+    payload = {
+        # Unique, so the analysis isn't served from the cache and a new record is saved
+        'text_content': f"Geneva - Greenpeace and the United Nations met Dr. Evelyn Reed (history check {time.time()})."
+    }
+
+    try:
+        response = requests.post(ANALYZE_ENDPOINT, data=payload)
+        success, result = check_extended_response(response, expect_s3_key=False)
+        if not success:
+            print_status(test_name, False, result)
+            return
+
+        # Records may be written shortly after the response, so allow a few attempts
+        record = None
+        for _ in range(5):
+            history = requests.get(ANALYSES_ENDPOINT, params={'limit': 20})
+            if history.status_code != 200:
+                print_status(test_name, False, f"GET /analyses returned {history.status_code}: {history.text}")
+                return
+            record = next((item for item in history.json().get("items", []) if item.get("analysis_summary") == result["summary"]), None)
+            if record:
+                break
+            time.sleep(1)
+        if not record:
+            print_status(test_name, False, "The saved analysis was not listed by GET /analyses.")
+            return
+
+        if result["organizations"]:
+            search = requests.get(ENTITY_SEARCH_ENDPOINT, params={'name': result["organizations"][0], 'limit': 20})
+            if search.status_code != 200:
+                print_status(test_name, False, f"GET /entities/search returned {search.status_code}: {search.text}")
+                return
+            if not any(item.get("id") == record["id"] for item in search.json().get("items", [])):
+                print_status(test_name, False, f"Record {record['id']} not found searching for '{result['organizations'][0]}'.")
+                return
+
+        print_status(test_name, True, f"Record ID: {record['id']}")
+
+    except requests.exceptions.RequestException as e:
+        print_status(test_name, False, f"Request failed: {e}")
+    except Exception as e:
+         print_status(test_name, False, f"An error occurred: {e}")
+
 # --- Run Tests ---
 if __name__ == "__main__":
     print(f"--- Testing Extended Backend Features at {BASE_URL} ---")
@@ -174,4 +222,5 @@ if __name__ == "__main__":
     # time.sleep(2)
     test_analyze_text_with_entities()
     test_analyze_file_with_entities_and_s3()
+    test_history_lists_saved_analysis()
     print("--- Extended Testing Complete ---")
\ No newline at end of file
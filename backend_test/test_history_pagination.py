@@ -0,0 +1,134 @@
+# test_history_pagination.py
+"""
+Local tests of the history API (GET /analyses) against a temporary SQLite database: the
+pagination cursor codec, 400 for malformed cursors, and keyset paging that returns every
+completed record exactly once, newest first, with ties on created_at broken by id.
+
+    python -m pytest test_history_pagination.py
+    python test_history_pagination.py
+"""
+import base64
+import json
+import sys
+import uuid
+from datetime import datetime, timedelta
+
+import _local_app
+from fastapi.testclient import TestClient
+
+import main
+from backend.api.v1.endpoints.history import _decode_cursor, _encode_cursor
+
+_local_app.create_tables()
+
+
+def insert_records(filename: str, timestamps: list, status: str = "completed") -> None:
+    """One analysis record per timestamp, stored in the format the app's SQLite variant uses."""
+    _local_app.execute_many(
+        "INSERT INTO analysis_records (original_filename, analysis_summary, analysis_nationalities, analysis_organizations,"
+        " analysis_people, status, created_at, updated_at) VALUES (?, 'Summary.', '[]', '[]', '[]', ?, ?, ?)",
+        [(filename, status, ts.strftime("%Y-%m-%d %H:%M:%S"), ts.strftime("%Y-%m-%d %H:%M:%S")) for ts in timestamps]
+    )
+
+
+def expected_ids(filename: str = None) -> list:
+    """Completed record ids in history order (created_at, then id, descending), read directly."""
+    sql = "SELECT id FROM analysis_records WHERE status = 'completed'"
+    params = ()
+    if filename is not None:
+        sql += " AND original_filename = ?"
+        params = (filename,)
+    return [row[0] for row in _local_app.query(sql + " ORDER BY created_at DESC, id DESC", params)]
+
+
+def walk(client: TestClient, limit: int, **filters) -> tuple:
+    """Follows next_cursor through every page. Returns (ids in order, page sizes)."""
+    ids, sizes, cursor = [], [], None
+    while True:
+        params = {"limit": limit, **filters, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/analyses", params=params)
+        assert response.status_code == 200, response.text
+        page = response.json()
+        ids += [item["id"] for item in page["items"]]
+        sizes.append(len(page["items"]))
+        cursor = page["next_cursor"]
+        if not cursor:
+            return ids, sizes
+        assert len(sizes) < 1000, "Pagination did not terminate"
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 5, 17, 9, 30, 15, 123456)
+    cursor = _encode_cursor(created_at, 42)
+    assert _decode_cursor(cursor) == (created_at, 42)
+    # URL-safe, without padding
+    assert "=" not in cursor and "+" not in cursor and "/" not in cursor
+
+
+def test_malformed_cursor_returns_400():
+    def encode(value) -> str:
+        return base64.urlsafe_b64encode(json.dumps(value).encode("utf-8")).decode("ascii").rstrip("=")
+
+    with TestClient(main.app) as client:
+        for cursor in ("not-a-cursor!", encode({"created_at": "2024-01-01"}), encode(["yesterday", 1]), encode(["2024-01-01T00:00:00", "x"])):
+            response = client.get("/analyses", params={"cursor": cursor})
+            assert response.status_code == 400, f"cursor {cursor!r}: {response.status_code} {response.text}"
+            assert response.json()["detail"] == "Invalid pagination cursor."
+
+
+def test_pages_follow_ties_in_id_order():
+    filename = f"ties_{uuid.uuid4().hex[:8]}.txt"
+    same_time = datetime(2024, 3, 1, 12, 0, 0)
+    insert_records(filename, [same_time] * 12)
+    insert_records(filename, [same_time] * 3, status="failed") # Not part of the history
+
+    with TestClient(main.app) as client:
+        ids, sizes = walk(client, limit=5, filename=filename)
+    assert ids == sorted(ids, reverse=True) and len(ids) == 12
+    assert ids == expected_ids(filename)
+    assert sizes == [5, 5, 2]
+
+
+def test_pages_cover_history_once_newest_first():
+    filename = f"history_{uuid.uuid4().hex[:8]}.txt"
+    start = datetime(2024, 1, 1, 8, 0, 0)
+    # Several records per second, inserted out of time order
+    timestamps = [start + timedelta(seconds=(i * 7) % 9) for i in range(40)]
+    insert_records(filename, timestamps)
+    insert_records(filename, timestamps[:4], status="queued")
+
+    with TestClient(main.app) as client:
+        filtered, _ = walk(client, limit=7, filename=filename)
+        everything, _ = walk(client, limit=6)
+        first_page = client.get("/analyses", params={"limit": 7, "filename": filename}).json()
+
+    assert filtered == expected_ids(filename) and len(filtered) == 40
+    assert everything == expected_ids() and len(set(everything)) == len(everything)
+    # The cursor is the (created_at, id) of the last item on the page
+    last = first_page["items"][-1]
+    assert _decode_cursor(first_page["next_cursor"]) == (datetime.fromisoformat(last["created_at"]), last["id"])
+
+
+def test_created_range_filters_pages():
+    filename = f"range_{uuid.uuid4().hex[:8]}.txt"
+    start = datetime(2024, 2, 1, 0, 0, 0)
+    insert_records(filename, [start + timedelta(hours=i) for i in range(24)])
+
+    with TestClient(main.app) as client:
+        ids, _ = walk(client, limit=4, filename=filename,
+                      created_from=(start + timedelta(hours=6)).isoformat(), created_to=(start + timedelta(hours=12)).isoformat())
+    # created_from is inclusive, created_to exclusive
+    assert ids == expected_ids(filename)[12:18]
+
+
+if __name__ == "__main__":
+    print("--- Testing the history API pagination (local SQLite) ---")
+    failures = _local_app.report([
+        test_cursor_round_trip,
+        test_malformed_cursor_returns_400,
+        test_pages_follow_ties_in_id_order,
+        test_pages_cover_history_once_newest_first,
+        test_created_range_filters_pages,
+    ])
+    print("--- History Pagination Testing Complete ---")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,161 @@
+# test_write_behind.py
+"""
+Local tests of the DB write-behind buffer (backend/db/write_behind.py) against a temporary
+SQLite database: bulk inserts with ids in enqueue order, the batch-size and interval triggers,
+draining on shutdown, and the S3 key filled in after a record's batch is written.
+
+    python -m pytest test_write_behind.py
+    python test_write_behind.py
+"""
+import asyncio
+import sys
+import time
+import uuid
+
+import _local_app
+from backend.core import archiver
+from backend.db import schemas
+from backend.db.write_behind import WriteBehindBuffer
+
+_local_app.create_tables()
+
+LONG_INTERVAL_MS = 60_000 # Longer than any test, so only the batch size or stop() flushes
+
+
+def make_records(count: int):
+    """Records with a filename unique to the calling test, so rows can be found again."""
+    tag = uuid.uuid4().hex[:8]
+    return tag, [
+        schemas.AnalysisRecordCreate(
+            original_filename=f"{tag}_{i}.txt",
+            analysis_summary=f"Summary {i} of {tag}",
+            analysis_nationalities=["French"],
+            analysis_organizations=["NATO"],
+            analysis_people=[],
+        )
+        for i in range(count)
+    ]
+
+
+def stored_rows(tag: str) -> dict:
+    """{id: (original_filename, analysis_summary, s3_object_key)} of the rows a test wrote."""
+    rows = _local_app.query(
+        "SELECT id, original_filename, analysis_summary, s3_object_key FROM analysis_records WHERE original_filename LIKE ?",
+        (f"{tag}_%",)
+    )
+    return {row[0]: row[1:] for row in rows}
+
+
+def test_full_batch_is_written_in_one_flush():
+    tag, records = make_records(5)
+
+    async def scenario():
+        buffer = WriteBehindBuffer(batch_size=5, flush_interval_ms=LONG_INTERVAL_MS, max_queue=100)
+        buffer.start()
+        futures = [await buffer.enqueue(record) for record in records]
+        # A full batch doesn't wait for the flush interval
+        ids = await asyncio.wait_for(asyncio.gather(*futures), timeout=10)
+        stats = buffer.stats()
+        await buffer.stop()
+        return ids, stats
+
+    ids, stats = _local_app.run(scenario())
+    assert stats["flushes"] == 1 and stats["records_written"] == 5 and stats["records_failed"] == 0
+    assert all(record_id is not None for record_id in ids)
+    assert ids == sorted(ids) and len(set(ids)) == 5
+    # Each future gets the id of its own row (INSERT ... RETURNING in parameter order)
+    rows = stored_rows(tag)
+    assert [rows[record_id][:2] for record_id in ids] == [(r.original_filename, r.analysis_summary) for r in records]
+
+
+def test_partial_batch_is_written_after_the_interval():
+    tag, records = make_records(1)
+
+    async def scenario():
+        buffer = WriteBehindBuffer(batch_size=100, flush_interval_ms=50, max_queue=100)
+        buffer.start()
+        start = time.monotonic()
+        record_id = await asyncio.wait_for(buffer.insert(records[0]), timeout=10)
+        elapsed = time.monotonic() - start
+        stats = buffer.stats()
+        await buffer.stop()
+        return record_id, elapsed, stats
+
+    record_id, elapsed, stats = _local_app.run(scenario())
+    assert record_id in stored_rows(tag)
+    assert stats["flushes"] == 1
+    assert elapsed >= 0.04, f"Flushed after {elapsed:.3f}s, before the 50 ms interval"
+
+
+def test_stop_writes_pending_records():
+    tag, records = make_records(7)
+
+    async def scenario():
+        buffer = WriteBehindBuffer(batch_size=3, flush_interval_ms=LONG_INTERVAL_MS, max_queue=100)
+        buffer.start()
+        futures = [await buffer.enqueue(record) for record in records]
+        await asyncio.sleep(0) # Let the flusher pick up its first batch
+        await buffer.stop()
+        return [future.done() for future in futures], [future.result() for future in futures if future.done()], buffer.stats()
+
+    done, ids, stats = _local_app.run(scenario())
+    assert all(done), "stop() returned with unresolved records"
+    assert None not in ids and len(set(ids)) == 7
+    assert set(ids) == set(stored_rows(tag))
+    assert stats["pending"] == 0 and stats["records_written"] == 7
+
+
+def test_stop_writes_records_queued_before_start():
+    tag, records = make_records(4)
+
+    async def scenario():
+        buffer = WriteBehindBuffer(batch_size=3, flush_interval_ms=LONG_INTERVAL_MS, max_queue=100)
+        futures = [await buffer.enqueue(record) for record in records]
+        await buffer.stop()
+        return [future.result() for future in futures]
+
+    ids = _local_app.run(scenario())
+    assert None not in ids
+    assert set(ids) == set(stored_rows(tag))
+
+
+def test_s3_key_is_recorded_after_the_flush():
+    tag, records = make_records(1)
+    key = f"uploads/{tag}.txt"
+
+    async def scenario():
+        buffer = WriteBehindBuffer(batch_size=100, flush_interval_ms=20, max_queue=100)
+        buffer.start()
+        upload_done = asyncio.Event()
+
+        async def upload():
+            await upload_done.wait()
+            return key
+
+        upload_task = asyncio.create_task(upload())
+        # As in S3_UPLOAD_MODE=background: the record is written without a key...
+        record_id = await buffer.insert(records[0])
+        archiver.record_key_when_done(upload_task, record_id)
+        key_before_upload = stored_rows(tag)[record_id][2]
+        # ...and the key is added once the upload finishes
+        upload_done.set()
+        await archiver.drain()
+        await buffer.stop()
+        return record_id, key_before_upload
+
+    record_id, key_before_upload = _local_app.run(scenario())
+    assert key_before_upload is None
+    assert stored_rows(tag)[record_id][2] == key
+
+
+if __name__ == "__main__":
+    print("--- Testing the DB write-behind buffer (local SQLite) ---")
+    failures = _local_app.report([
+        test_full_batch_is_written_in_one_flush,
+        test_partial_batch_is_written_after_the_interval,
+        test_stop_writes_pending_records,
+        test_stop_writes_records_queued_before_start,
+        test_s3_key_is_recorded_after_the_flush,
+    ])
+    print("--- Write-behind Testing Complete ---")
+    sys.exit(1 if failures else 0)
@@ -1,6 +1,7 @@
 # backend/main.py
 import os
 import io
+import asyncio
 # ADD 'Any' HERE
 from typing import Optional, Any
 # --- Keep other imports ---
@@ -9,6 +10,7 @@ from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 # from pydantic import BaseModel # Not strictly needed here
+import httpx
 import openai
 import docx
 
@@ -17,8 +19,16 @@ load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 if not OPENAI_API_KEY:
     print("Error: OPENAI_API_KEY not found in environment variables.")
+# Shared async client with a pooled HTTP transport, so concurrent requests
+# don't block the event loop and reuse keep-alive connections.
+client = None
 if OPENAI_API_KEY:
-     openai.api_key = OPENAI_API_KEY
+     client = openai.AsyncOpenAI(
+         api_key=OPENAI_API_KEY,
+         http_client=openai.DefaultAsyncHttpxClient(
+             limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+         ),
+     )
 else:
     print("Warning: OpenAI API Key not configured. API calls will fail.")
 
@@ -34,12 +44,12 @@ app.add_middleware(
 
 # --- Keep Helper Functions (get_openai_completion, summarize_text, extract_nationalities, read_docx) ---
 # ... (ensure these are still present and correct) ...
-def get_openai_completion(prompt_text, model="gpt-3.5-turbo"):
+async def get_openai_completion(prompt_text, model="gpt-3.5-turbo"):
     """Calls the OpenAI Chat Completion API."""
-    if not OPENAI_API_KEY:
+    if not client:
          raise HTTPException(status_code=500, detail="OpenAI API key not configured on the server.")
     try:
-        response = openai.chat.completions.create(
+        response = await client.chat.completions.create(
             model=model,
             messages=[
                 {"role": "system", "content": "You are a helpful assistant."},
@@ -71,7 +81,7 @@ def get_openai_completion(prompt_text, model="gpt-3.5-turbo"):
         traceback.print_exc() # Print stack trace for debugging
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {e}")
 
-def summarize_text(text):
+async def summarize_text(text):
     """Generates a summary using OpenAI."""
     prompt = f"""
     Please summarize the following news article in 2-4 concise sentences:
@@ -82,9 +92,9 @@ def summarize_text(text):
 
     Summary:
     """
-    return get_openai_completion(prompt)
+    return await get_openai_completion(prompt)
 
-def extract_nationalities(text):
+async def extract_nationalities(text):
     """Extracts nationalities/countries using OpenAI."""
     prompt = f"""
     Analyze the following news article and list all mentioned nationalities, countries, or peoples.
@@ -99,7 +109,7 @@ def extract_nationalities(text):
 
     Nationalities/Countries mentioned (comma-separated):
     """
-    result = get_openai_completion(prompt)
+    result = await get_openai_completion(prompt)
     # Added more robust check for non-error, non-"None" results
     if result and isinstance(result, str) and not result.startswith("Error:") and not result.startswith("OpenAI returned") and result.lower().strip() != "none":
         return [item.strip() for item in result.split(',') if item.strip()]
@@ -165,7 +175,8 @@ async def analyze_article(
                     raise HTTPException(status_code=400, detail=f"Could not decode .txt file '{filename}'. Ensure it's UTF-8 or Latin-1 encoded. Error: {e}")
         elif filename.lower().endswith(".docx"):
              try:
-                article_text = read_docx(contents)
+                # Parsing builds the whole document tree; keep it off the event loop
+                article_text = await asyncio.to_thread(read_docx, contents)
              except HTTPException as e:
                  # Add filename to the error detail if possible
                  e.detail = f"Error processing file '{filename}': {e.detail}"
@@ -196,10 +207,12 @@ async def analyze_article(
 
     # --- Processing ---
     print("Input text length:", len(article_text))
-    print("Calling OpenAI for summary...")
-    summary = summarize_text(article_text)
-    print("Calling OpenAI for nationalities...")
-    nationalities = extract_nationalities(article_text)
+    print("Calling OpenAI for summary and nationalities...")
+    # Both prompts are independent, so run them concurrently
+    summary, nationalities = await asyncio.gather(
+        summarize_text(article_text),
+        extract_nationalities(article_text),
+    )
     print("Analysis complete.")
 
     # --- Return Response ---
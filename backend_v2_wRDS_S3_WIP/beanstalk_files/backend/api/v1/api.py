@@ -1,8 +1,12 @@
 # backend/api/v1/api.py
 from fastapi import APIRouter
-from backend.api.v1.endpoints import analysis
+from backend.api.v1.endpoints import analysis, entities, history, jobs, system
 
 api_router = APIRouter()
 
 # Include endpoint routers here
-api_router.include_router(analysis.router, tags=["Analysis"])
\ No newline at end of file
+api_router.include_router(analysis.router, tags=["Analysis"])
+api_router.include_router(history.router, tags=["History"])
+api_router.include_router(entities.router, tags=["Entities"])
+api_router.include_router(jobs.router, tags=["Jobs"])
+api_router.include_router(system.router, tags=["System"])
\ No newline at end of file
@@ -1,107 +1,50 @@
 import os
+import json
+import asyncio
 from fastapi import APIRouter, File, UploadFile, Form, Depends, HTTPException, Body
-from sqlalchemy.orm import Session
-from typing import Optional, Annotated
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional, Annotated, List
 
-from backend.db import schemas, crud
-from backend.db.database import get_db, IS_DB_CONNECTED
-from backend.core import file_processor, analysis_service
+from backend.db import schemas, crud, write_behind
+from backend.db import database
+from backend.db.database import get_db
+from backend.core import file_processor, analysis_service, archiver, metrics, token_counter
 from backend.utils import s3_utils
 from backend.core.config import settings
 
 router = APIRouter()
 
-# Allowed file types
-ALLOWED_CONTENT_TYPES = ["text/plain", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"]
-ALLOWED_EXTENSIONS = [".txt", ".docx"]
+ZIP_CONTENT_TYPES = ["application/zip", "application/x-zip-compressed"]
 
 # Ensure the path here is "/analyze" to match the test script endpoint
 @router.post("/analyze", response_model=schemas.AnalysisResponse)
+@metrics.tracked("analyze")
 async def analyze_article(
     # Use Annotated for richer validation/metadata (FastAPI 0.95+)
     text_content: Annotated[Optional[str], Form()] = None,
     file_upload: Annotated[Optional[UploadFile], File()] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Analyzes news article text (either provided directly via 'text_content' form field
     or via 'file_upload' field for .txt or .docx files)
     to generate a summary and extract nationalities, organizations, and people.
 
-    - If a file is uploaded, it's stored in S3 (if configured).
+    - If a file is uploaded, it's stored in S3 (if configured), concurrently with the analysis.
+      With S3_UPLOAD_MODE=background the response doesn't wait for it and has no s3_object_key.
     - Analysis results are saved to the database (if configured).
     """
-    article_text: str = ""
-    original_filename: Optional[str] = None
-    s3_key: Optional[str] = None
-    file_bytes: Optional[bytes] = None 
-
     # --- Input Validation and Content Extraction ---
-    if file_upload:
-        # Basic validation
-        if not file_upload.filename:
-            raise HTTPException(status_code=400, detail="Uploaded file is missing a filename.")
-
-        # Check content type first
-        content_type_valid = file_upload.content_type in ALLOWED_CONTENT_TYPES
-        # Check extension as fallback or primary if content type is generic
-        file_ext = os.path.splitext(file_upload.filename)[1].lower()
-        extension_valid = file_ext in ALLOWED_EXTENSIONS
-
-        if not content_type_valid and not extension_valid:
-             raise HTTPException(status_code=400, detail=f"Invalid file content type '{file_upload.content_type}' or extension '{file_ext}'. Allowed types: .txt, .docx")
-
-        original_filename = file_upload.filename
-        print(f"Processing uploaded file: {original_filename}")
-
-        try:
-            # Read content using the file processor
-            # Need the bytes for S3 later
-            file_bytes = await file_upload.read() # Read once
-            await file_upload.seek(0) # Reset cursor in case processor needs to read again
-            article_text = await file_processor.read_uploaded_file(file_upload)
-
-        except HTTPException as e:
-            # Re-raise file processing errors (like bad format, decode errors)
-            raise e
-        except Exception as e:
-            print(f"Unexpected error reading file {original_filename}: {e}")
-            raise HTTPException(status_code=500, detail="Server error while reading the uploaded file.")
-
-        # --- S3 Upload Attempt ---
-        if s3_utils.s3_available and file_bytes:
-             # Determine content type for S3, prioritize official type if valid
-             s3_content_type = file_upload.content_type if content_type_valid else 'application/octet-stream'
-             if not content_type_valid and extension_valid: # Use extension to guess if needed
-                 if file_ext == '.txt': s3_content_type = 'text/plain'
-                 elif file_ext == '.docx': s3_content_type = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-
-             s3_key = s3_utils.upload_file_to_s3(
-                 file_content=file_bytes,
-                 original_filename=original_filename,
-                 content_type=s3_content_type
-             )
-             if s3_key:
-                 print(f"File successfully uploaded to S3 with key: {s3_key}")
-             else:
-                 print("S3 upload failed or was skipped.")
-                 # Decide if this failure should block the request or just be logged. Logging for now.
-
-    elif text_content:
-        print("Processing text content input.")
-        article_text = text_content
-    else:
-        raise HTTPException(status_code=400, detail="No input provided. Please provide 'text_content' or upload a 'file_upload'.")
-
-    # --- Final Content Checks ---
-    if not article_text or not article_text.strip():
-        input_source = f"file '{original_filename}'" if original_filename else "text_content"
-        raise HTTPException(status_code=400, detail=f"Input {input_source} is effectively empty.")
+    article = await file_processor.read_article_input(text_content, file_upload)
+    article_text = article.text
+    original_filename = article.filename
 
-    if len(article_text) > settings.MAX_TEXT_LENGTH:
-         raise HTTPException(status_code=413, detail=f"Input text exceeds maximum length of {settings.MAX_TEXT_LENGTH} characters.")
+    # --- S3 Upload (runs while the article is analyzed) ---
+    upload_task = archiver.start_article_upload(article, file_upload)
 
     # --- Perform Analysis ---
+    usage = token_counter.start_usage()
     try:
         print(f"Starting analysis for input length: {len(article_text)}")
         analysis_data = await analysis_service.perform_analysis(article_text)
@@ -116,33 +59,259 @@ async def analyze_article(
 
 
     # --- Database Saving ---
-    db_record_id: Optional[int] = None
-    if IS_DB_CONNECTED and db:
-        record_to_create = schemas.AnalysisRecordCreate(
-            original_filename=original_filename,
-            s3_object_key=s3_key,
-            analysis_summary=analysis_data.get('summary'),
-            analysis_nationalities=analysis_data.get('nationalities'),
-            analysis_organizations=analysis_data.get('organizations'),
-            analysis_people=analysis_data.get('people')
-        )
+    s3_key = await _save_with_upload(db, original_filename, upload_task, analysis_data, usage)
+
+    # --- Prepare and Return Response ---
+    return _build_response(original_filename, s3_key, analysis_data)
+
+
+@router.post("/analyze/stream")
+async def analyze_article_stream(
+    text_content: Annotated[Optional[str], Form()] = None,
+    file_upload: Annotated[Optional[UploadFile], File()] = None
+):
+    """
+    Streaming variant of /analyze using Server-Sent Events. Accepts the same inputs and uses
+    the same prompts, but sends results as they become available:
+
+    - `summary_delta`: {"text": "..."} for each chunk of summary tokens
+    - `summary`: {"summary": "..."} once the summary is complete
+    - `nationalities`: {"nationalities": [...]}
+    - `entities`: {"organizations": [...], "people": [...]}
+    - `error`: {"detail": "..."} if one part of the analysis failed
+    - `done`: the full AnalysisResponse, after which the stream ends
+    """
+    article = await file_processor.read_article_input(text_content, file_upload)
+
+    upload_task = archiver.start_article_upload(article, file_upload)
+
+    async def event_stream():
+        usage = token_counter.start_usage()
+        try:
+            # Counted from the start of the stream: the handler only reads the input
+            with metrics.track_request("analyze_stream"):
+                async for event, data in analysis_service.stream_analysis(article.text):
+                    if event == "summary_delta":
+                        payload = {"text": data}
+                    elif event == "summary":
+                        payload = {"summary": data}
+                    elif event == "nationalities":
+                        payload = {"nationalities": data}
+                    elif event == "error":
+                        payload = {"detail": data}
+                    elif event == "done":
+                        # Request-scoped sessions are closed once streaming starts, so use a fresh one
+                        if database.SessionLocal:
+                            async with database.SessionLocal() as db:
+                                s3_key = await _save_with_upload(db, article.filename, upload_task, data, usage)
+                        else:
+                            s3_key = await _save_with_upload(None, article.filename, upload_task, data, usage)
+                        payload = _build_response(article.filename, s3_key, data).model_dump()
+                    else:
+                        payload = data
+                    yield _format_sse(event, payload)
+        except HTTPException as e:
+            yield _format_sse("error", {"detail": e.detail})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        # Disable caching and proxy buffering so events reach the client immediately
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/analyze/estimate", response_model=schemas.TokenEstimate)
+async def estimate_article_tokens(
+    text_content: Annotated[Optional[str], Form()] = None,
+    file_upload: Annotated[Optional[UploadFile], File()] = None
+):
+    """
+    Dry run of /analyze: accepts the same inputs and returns the OpenAI calls the analysis
+    would make, with their prompt tokens and max_tokens, without calling the model or
+    storing anything. `within_limits` is false if /analyze would reject the article (413).
+    """
+    article = await file_processor.read_article_input(text_content, file_upload)
+    # Tokenizing a long article is CPU work; keep it off the event loop
+    estimate = await asyncio.to_thread(analysis_service.estimate_analysis, article.text)
+    estimate.filename = article.filename
+    return estimate
+
+
+def _format_sse(event: str, payload) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+@router.post("/analyze/batch", response_model=schemas.BatchAnalysisResponse)
+@metrics.tracked("analyze_batch")
+async def analyze_batch(
+    files: Annotated[List[UploadFile], File()]
+):
+    """
+    Analyzes many articles in one request. Accepts one or more 'files' parts, each either a
+    .txt/.docx article or a .zip archive of them.
+
+    - Entries are analyzed concurrently (up to BATCH_CONCURRENCY at a time).
+    - Each entry gets its own result or error; one bad file does not fail the batch.
+    - The batch is rejected with 413 if it exceeds BATCH_MAX_ITEMS or BATCH_MAX_BYTES;
+      single entries over BATCH_ITEM_MAX_BYTES are reported as item errors.
+    """
+    items = []  # (filename, content_type, bytes or HTTPException)
+    total_bytes = 0
+
+    for upload in files:
+        filename = upload.filename or "unnamed"
+        file_ext = os.path.splitext(filename)[1].lower()
+
+        if file_ext == ".zip" or upload.content_type in ZIP_CONTENT_TYPES:
+            remaining_items = settings.BATCH_MAX_ITEMS - len(items)
+            entries = await asyncio.to_thread(
+                file_processor.read_zip_archive,
+                upload.file,
+                filename,
+                remaining_items,
+                settings.BATCH_ITEM_MAX_BYTES,
+                settings.BATCH_MAX_BYTES - total_bytes,
+            )
+            for entry_name, contents in entries:
+                if isinstance(contents, bytes):
+                    total_bytes += len(contents)
+                items.append((entry_name, None, contents))
+            continue
+
+        if len(items) >= settings.BATCH_MAX_ITEMS:
+            raise HTTPException(status_code=413, detail=f"Batch contains more than {settings.BATCH_MAX_ITEMS} articles.")
+        if file_ext not in file_processor.ALLOWED_EXTENSIONS:
+            items.append((filename, None, HTTPException(status_code=400, detail=f"Invalid file type for '{filename}'. Allowed types: .txt, .docx, .zip")))
+            continue
+
+        contents = await upload.read(settings.BATCH_ITEM_MAX_BYTES + 1)
+        if len(contents) > settings.BATCH_ITEM_MAX_BYTES:
+            items.append((filename, None, HTTPException(status_code=413, detail=f"File '{filename}' exceeds the per-item limit of {settings.BATCH_ITEM_MAX_BYTES} bytes.")))
+            continue
+        total_bytes += len(contents)
+        if total_bytes > settings.BATCH_MAX_BYTES:
+            raise HTTPException(status_code=413, detail=f"Batch exceeds the maximum size of {settings.BATCH_MAX_BYTES} bytes.")
+        items.append((filename, upload.content_type, contents))
+
+    if not items:
+        raise HTTPException(status_code=400, detail="No articles found in the uploaded files.")
+
+    print(f"Processing batch of {len(items)} articles ({total_bytes} bytes).")
+    semaphore = asyncio.Semaphore(settings.BATCH_CONCURRENCY)
+
+    async def process_item(filename: str, content_type: Optional[str], contents) -> schemas.BatchItemResult:
+        if isinstance(contents, HTTPException):
+            return schemas.BatchItemResult(filename=filename, status_code=contents.status_code, error=contents.detail)
+        async with semaphore:
+            try:
+                return schemas.BatchItemResult(
+                    filename=filename,
+                    result=await _analyze_batch_item(filename, content_type, contents)
+                )
+            except HTTPException as e:
+                return schemas.BatchItemResult(filename=filename, status_code=e.status_code, error=e.detail)
+            except Exception as e:
+                print(f"Unexpected error analyzing batch item '{filename}': {e}")
+                return schemas.BatchItemResult(filename=filename, status_code=500, error="An unexpected error occurred during analysis.")
+
+    results = await asyncio.gather(*(process_item(*item) for item in items))
+    succeeded = sum(1 for r in results if r.error is None)
+    return schemas.BatchAnalysisResponse(
+        total=len(results),
+        succeeded=succeeded,
+        failed=len(results) - succeeded,
+        items=results
+    )
+
+
+async def _analyze_batch_item(filename: str, content_type: Optional[str], contents: bytes) -> schemas.AnalysisResponse:
+    """Extracts, archives, analyzes and stores a single article from a batch."""
+    article_text = await file_processor.extract_text_async(filename, contents)
+    if not article_text.strip():
+        raise HTTPException(status_code=400, detail=f"Input file '{filename}' is effectively empty.")
+    if len(article_text) > settings.MAX_ANALYSIS_TEXT_LENGTH:
+        raise HTTPException(status_code=413, detail=f"Input text exceeds maximum length of {settings.MAX_ANALYSIS_TEXT_LENGTH} characters.")
+
+    upload_task = None
+    if s3_utils.s3_available:
+        file_ext = os.path.splitext(filename)[1].lower()
+        sha256 = await asyncio.to_thread(s3_utils.sha256_of, contents)
+        upload_task = archiver.start_upload(contents, filename, file_processor.s3_content_type(content_type, file_ext), sha256)
+
+    usage = token_counter.start_usage() # Items run as separate tasks, so each counts its own
+    analysis_data = await analysis_service.perform_analysis(article_text)
+    # Items run concurrently and an AsyncSession can't, so each one uses its own
+    if database.SessionLocal:
+        async with database.SessionLocal() as db:
+            s3_key = await _save_with_upload(db, filename, upload_task, analysis_data, usage)
+    else:
+        s3_key = await _save_with_upload(None, filename, upload_task, analysis_data, usage)
+    return _build_response(filename, s3_key, analysis_data)
+
+
+async def _save_with_upload(db: Optional[AsyncSession], original_filename: Optional[str], upload_task: Optional[asyncio.Task], analysis_data: dict, usage: Optional[token_counter.TokenUsage] = None) -> Optional[str]:
+    """
+    Saves the analysis record together with the S3 key of its upload. In the default
+    "concurrent" S3_UPLOAD_MODE this waits for the upload to finish; in "background" mode the
+    record is saved without a key, which is filled in once the upload completes.
+    Returns the key to include in the response.
+    """
+    if upload_task and settings.S3_UPLOAD_MODE == "background":
+        record_id = await _save_analysis_record(db, original_filename, None, analysis_data, usage, wait_for_id=True)
+        archiver.record_key_when_done(upload_task, record_id)
+        return None
+
+    s3_key: Optional[str] = None
+    if upload_task:
+        # shield: a cancelled request must not cancel the upload itself
+        s3_key = await asyncio.shield(upload_task)
+    await _save_analysis_record(db, original_filename, s3_key, analysis_data, usage)
+    return s3_key
+
+
+async def _save_analysis_record(db: Optional[AsyncSession], original_filename: Optional[str], s3_key: Optional[str], analysis_data: dict, usage: Optional[token_counter.TokenUsage] = None, wait_for_id: bool = False) -> Optional[int]:
+    """
+    Saves analysis results to the database if configured. Returns the record ID or None.
+    With the write-behind buffer enabled, the record is queued for the next bulk insert and
+    the ID is only waited for (and returned) if `wait_for_id` is set.
+    """
+    record_to_create = schemas.AnalysisRecordCreate(
+        original_filename=original_filename,
+        s3_object_key=s3_key,
+        analysis_summary=analysis_data.get('summary'),
+        analysis_nationalities=analysis_data.get('nationalities'),
+        analysis_organizations=analysis_data.get('organizations'),
+        analysis_people=analysis_data.get('people'),
+        prompt_tokens=usage.prompt_tokens if usage else None,
+        completion_tokens=usage.completion_tokens if usage else None
+    )
+    if database.IS_DB_CONNECTED and write_behind.record_writer:
+        if wait_for_id:
+            with metrics.stage_seconds.time("db_commit"):
+                return await write_behind.record_writer.insert(record_to_create)
+        await write_behind.record_writer.enqueue(record_to_create)
+
+    elif database.IS_DB_CONNECTED and db:
         # crud.create_analysis_record handles commit/rollback internally
-        db_record = crud.create_analysis_record(db=db, record=record_to_create)
+        with metrics.stage_seconds.time("db_commit"):
+            db_record = await crud.create_analysis_record(db=db, record=record_to_create)
         if db_record:
-            db_record_id = db_record.id # Get the ID if save was successful
-        else:
-            print("Warning: Failed to save analysis results to database.")
-            # Decide if frontend needs to know about DB save failure
+            return db_record.id # Get the ID if save was successful
+        print("Warning: Failed to save analysis results to database.")
+        # Decide if frontend needs to know about DB save failure
 
-    elif IS_DB_CONNECTED and not db:
+    elif database.IS_DB_CONNECTED and not db:
         # This case means DB is configured, but get_db() failed for this request
         print("Warning: Database session not available for this request. Results not saved.")
     else:
         # DB not configured case - already logged at startup
         pass
+    return None
 
-    # --- Prepare and Return Response ---
-    response = schemas.AnalysisResponse(
+
+def _build_response(original_filename: Optional[str], s3_key: Optional[str], analysis_data: dict) -> schemas.AnalysisResponse:
+    return schemas.AnalysisResponse(
         filename=original_filename,
         s3_object_key=s3_key,
         summary=analysis_data.get('summary'),
@@ -150,6 +319,4 @@ async def analyze_article(
         organizations=analysis_data.get('organizations', []),
         people=analysis_data.get('people', [])
         # record_id=db_record_id # Optionally include record ID
-    )
-
-    return response
\ No newline at end of file
+    )
\ No newline at end of file
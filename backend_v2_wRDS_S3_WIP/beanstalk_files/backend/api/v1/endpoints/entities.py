@@ -0,0 +1,38 @@
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.db import schemas, crud
+from backend.db.database import get_db
+
+router = APIRouter()
+
+MAX_PAGE_SIZE = 200
+
+
+@router.get("/entities/search", response_model=schemas.AnalysisRecordPage)
+async def search_by_entity(
+    name: str = Query(..., min_length=1, max_length=crud.ENTITY_NAME_MAX_LENGTH, description="Entity name, e.g. 'NATO' (case-insensitive)"),
+    kind: Optional[Literal["nationality", "organization", "person"]] = Query(None, description="Only match entities of this kind"),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[int] = Query(None, description="next_cursor from the previous page"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Lists analyses that mention an entity, newest first. Served from the entity index
+    (record_entity), so the cost depends on how many analyses mention the entity, not on
+    the size of the history.
+    """
+    if not db:
+        raise HTTPException(status_code=503, detail="Entity search is not available (requires a configured database).")
+
+    records = await crud.search_records_by_entity(db, name, kind=kind, limit=limit + 1, before_id=cursor)
+    next_cursor = None
+    if len(records) > limit:
+        records = records[:limit]
+        next_cursor = str(records[-1].id)
+    return schemas.AnalysisRecordPage(
+        items=[schemas.AnalysisRecord.model_validate(record) for record in records],
+        next_cursor=next_cursor
+    )
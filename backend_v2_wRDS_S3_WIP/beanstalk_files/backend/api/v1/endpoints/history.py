@@ -0,0 +1,78 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.db import schemas, crud
+from backend.db.database import get_db
+
+router = APIRouter()
+
+MAX_PAGE_SIZE = 200
+
+
+@router.get("/analyses", response_model=schemas.AnalysisRecordPage)
+async def list_analyses(
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    filename: Optional[str] = Query(None, description="Only analyses of this original filename"),
+    created_from: Optional[datetime] = Query(None, description="Only analyses created at or after this time"),
+    created_to: Optional[datetime] = Query(None, description="Only analyses created before this time"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Lists stored analyses, newest first. Pages are fetched by keyset (the created_at and id of
+    the last item seen, carried in `next_cursor`) rather than by offset, so every page is
+    equally fast however far back it is.
+    """
+    if not db:
+        raise HTTPException(status_code=503, detail="Analysis history is not available (requires a configured database).")
+
+    records = await crud.list_analysis_records(
+        db,
+        # One extra row tells whether there is a next page
+        limit=limit + 1,
+        after=_decode_cursor(cursor) if cursor else None,
+        original_filename=filename,
+        created_from=created_from,
+        created_to=created_to,
+    )
+    next_cursor = None
+    if len(records) > limit:
+        records = records[:limit]
+        next_cursor = _encode_cursor(records[-1].created_at, records[-1].id)
+    return schemas.AnalysisRecordPage(
+        items=[schemas.AnalysisRecord.model_validate(record) for record in records],
+        next_cursor=next_cursor
+    )
+
+
+@router.get("/analyses/{record_id}", response_model=schemas.AnalysisRecord)
+async def get_analysis(record_id: int, db: AsyncSession = Depends(get_db)):
+    """
+    Returns one stored analysis by its record ID.
+    """
+    if not db:
+        raise HTTPException(status_code=503, detail="Analysis history is not available (requires a configured database).")
+
+    db_record = await crud.get_analysis_record(db, record_id)
+    if not db_record or db_record.status != crud.JOB_COMPLETED:
+        raise HTTPException(status_code=404, detail=f"Analysis {record_id} not found.")
+    return schemas.AnalysisRecord.model_validate(db_record)
+
+
+def _encode_cursor(created_at: datetime, record_id: int) -> str:
+    payload = json.dumps([created_at.isoformat(), record_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, record_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(record_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor.")
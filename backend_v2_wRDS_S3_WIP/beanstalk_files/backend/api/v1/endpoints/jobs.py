@@ -0,0 +1,73 @@
+from fastapi import APIRouter, File, UploadFile, Form, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional, Annotated
+
+from backend.db import schemas, crud
+from backend.db.database import get_db
+from backend.core import file_processor, archiver
+from backend.jobs import worker
+
+router = APIRouter()
+
+
+@router.post("/jobs", response_model=schemas.JobSubmitResponse, status_code=202)
+async def submit_analysis_job(
+    text_content: Annotated[Optional[str], Form()] = None,
+    file_upload: Annotated[Optional[UploadFile], File()] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Queues an article for analysis and returns a job ID immediately.
+    Accepts the same 'text_content' / 'file_upload' inputs as /analyze.
+    Poll GET /jobs/{job_id} for the status and result.
+    """
+    job_queue = worker.get_job_queue()
+    if not job_queue or not db:
+        raise HTTPException(status_code=503, detail="Asynchronous job processing is not available (requires a configured database and job queue; see /ready).")
+
+    article = await file_processor.read_article_input(text_content, file_upload)
+
+    # The job is queued without waiting for S3; the key is added to its record once uploaded
+    upload_task = archiver.start_article_upload(article, file_upload)
+
+    db_record = await crud.create_job_record(db, original_filename=article.filename, s3_object_key=None)
+    if not db_record:
+        raise HTTPException(status_code=500, detail="Could not create the analysis job.")
+    if upload_task:
+        archiver.record_key_when_done(upload_task, db_record.id)
+
+    await job_queue.publish({"record_id": db_record.id, "text": article.text, "filename": article.filename})
+    print(f"Queued analysis job {db_record.id}.")
+    return schemas.JobSubmitResponse(job_id=db_record.id, status=db_record.status)
+
+
+@router.get("/jobs/{job_id}", response_model=schemas.JobStatusResponse)
+async def get_analysis_job(job_id: int, db: AsyncSession = Depends(get_db)):
+    """
+    Returns the status of an analysis job and, once completed, its result.
+    """
+    if not db:
+        raise HTTPException(status_code=503, detail="Asynchronous job processing is not available (requires a configured database and job queue; see /ready).")
+
+    db_record = await crud.get_analysis_record(db, job_id)
+    if not db_record:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found.")
+
+    result = None
+    if db_record.status == crud.JOB_COMPLETED:
+        result = schemas.AnalysisResponse(
+            filename=db_record.original_filename,
+            s3_object_key=db_record.s3_object_key,
+            summary=db_record.analysis_summary,
+            nationalities=db_record.analysis_nationalities or [],
+            organizations=db_record.analysis_organizations or [],
+            people=db_record.analysis_people or []
+        )
+    return schemas.JobStatusResponse(
+        job_id=db_record.id,
+        status=db_record.status,
+        error=db_record.error_message,
+        result=result,
+        created_at=db_record.created_at,
+        updated_at=db_record.updated_at
+    )
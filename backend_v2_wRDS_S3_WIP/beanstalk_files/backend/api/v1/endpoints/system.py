@@ -0,0 +1,89 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import JSONResponse, Response
+
+from backend.core import metrics, readiness, token_counter
+from backend.core.config import settings
+from backend.core.model_router import model_router
+from backend.core.analysis_service import analysis_inflight
+from backend.core.rate_limiter import openai_limiter
+from backend.core.result_cache import analysis_cache
+from backend.db import database, write_behind
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_class=Response)
+async def get_metrics():
+    """
+    Prometheus metrics of this worker: per-stage and per-OpenAI-call latency histograms,
+    OpenAI errors and retries by type, in-flight analysis requests and token counters.
+    """
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@router.get("/ready")
+async def get_readiness():
+    """
+    Readiness probe: 200 once start-up has finished and every configured dependency
+    (database schema, OpenAI client, S3 client, job queue) came up, else 503. Reports
+    each dependency's state and start-up time; the database is also pinged on every call.
+    """
+    report = readiness.status()
+    db_check = report["dependencies"].get("database")
+    if db_check and db_check["status"] == readiness.READY:
+        try:
+            db_check["ping_ms"] = round(await database.ping(settings.READY_DB_PING_TIMEOUT) * 1000, 1)
+        except Exception as e:
+            db_check.update(status="unreachable", error=str(e) or type(e).__name__)
+            report["ready"] = False
+    return JSONResponse(content=report, status_code=200 if report["ready"] else 503)
+
+
+@router.get("/system/cache")
+async def get_cache_stats():
+    """
+    Hit/miss/eviction counters and current size of the analysis result cache,
+    plus request coalescing counters (this worker only).
+    """
+    return {**analysis_cache.stats(), "singleflight": analysis_inflight.stats()}
+
+
+@router.get("/system/rate-limit")
+async def get_rate_limit_stats():
+    """
+    Remaining OpenAI request/token budget shared by the workers on this host,
+    plus how often this worker had to wait for it.
+    """
+    return openai_limiter.stats()
+
+
+@router.get("/system/tokens")
+async def get_token_usage():
+    """
+    OpenAI prompt and completion tokens used by this worker, by model, as reported by the API,
+    and whether token counts come from tiktoken or the character estimate.
+    """
+    return token_counter.usage_stats()
+
+
+@router.get("/system/models")
+async def get_model_routing_stats():
+    """
+    The model routing table, and per route and model: calls, errors, fallbacks, tokens and
+    p50/p95 latency of recent calls (this worker only).
+    """
+    return model_router.stats()
+
+
+@router.get("/system/db-pool")
+async def get_db_pool_stats():
+    """
+    Database connection pool gauge for this worker: connections in use, idle and in
+    overflow, and utilization (in use / (pool size + max overflow)), plus the
+    write-behind buffer's queue depth and flush counters if it is enabled.
+    """
+    status = database.pool_status()
+    if status is None:
+        raise HTTPException(status_code=503, detail="Database is not configured.")
+    writer = write_behind.record_writer
+    return {**status, "write_behind": writer.stats() if writer else None}
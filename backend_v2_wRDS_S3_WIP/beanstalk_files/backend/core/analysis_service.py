@@ -1,57 +1,384 @@
-from typing import Dict, List, Optional
-from . import openai_utils
+import asyncio
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from . import metrics, openai_utils, token_counter
+from backend.core.chunking import split_text, merge_unique
 from fastapi import HTTPException
 from backend.core.config import settings
+from backend.db import schemas
+from backend.core.gazetteer import nationality_gazetteer
+from backend.core.model_router import model_router
+from backend.core.result_cache import analysis_cache, make_cache_key, copy_result
+from backend.core.singleflight import SingleFlight
+
+# Identical articles analyzed at the same time share one set of OpenAI calls
+analysis_inflight = SingleFlight()
 
 async def perform_analysis(text: str) -> dict:
     """
     Performs summary, nationality, and entity extraction on the input text.
     Returns a dictionary containing the analysis results.
     """
+    with metrics.stage_seconds.time("analysis"):
+        if not text or not text.strip():
+             raise ValueError("Input text for analysis cannot be empty.")
+
+        if len(text) > settings.MAX_ANALYSIS_TEXT_LENGTH:
+             # This check should also ideally happen before calling
+             raise HTTPException(
+                 status_code=413,
+                 detail=f"Input text is too long ({len(text)} chars). Maximum allowed is {settings.MAX_ANALYSIS_TEXT_LENGTH}."
+            )
+
+        cache_key = analysis_cache_key(text)
+        if settings.CACHE_ENABLED:
+            cached = analysis_cache.get(cache_key)
+            if cached is not None:
+                print("Analysis Service: Cache hit, skipping OpenAI calls.")
+                return cached
+
+        text_tokens = count_article_tokens(text)
+        check_token_limits(text, text_tokens)
+        # Every concurrent caller gets its own copy of the shared result
+        result = await analysis_inflight.do(cache_key, lambda: _run_analysis(text, cache_key, text_tokens))
+        return copy_result(result)
+
+
+async def _run_analysis(text: str, cache_key: str, text_tokens: int) -> dict:
+    """Runs the configured analysis mode and caches the result if it is complete."""
+    analysis_results = {}
+    errors = []
+
+    if needs_chunking(text, text_tokens):
+        await _analyze_chunked(text, text_tokens, analysis_results, errors)
+    elif settings.ANALYSIS_MODE == "single":
+        await _analyze_single_call(text, analysis_results, errors)
+    else:
+        await _analyze_multi_call(text, analysis_results, errors)
+
+    # Optionally include errors in the result if needed
+    # analysis_results['errors'] = errors
+    if errors:
+        print(f"Analysis completed with errors: {errors}")
+    elif settings.CACHE_ENABLED:
+        # Only complete results are cached; partial failures are retried next time
+        analysis_cache.put(cache_key, analysis_results)
+
+    print("Analysis Service: Analysis complete.")
+    return analysis_results
+
+
+def analysis_cache_key(text: str, mode: Optional[str] = None) -> str:
+    """Cache key for an article under the given (default: configured) mode, model and prompts."""
+    if (mode or settings.ANALYSIS_MODE) == "single":
+        model = f"single:{settings.OPENAI_STRUCTURED_MODEL}"
+    else:
+        model = f"multi:{settings.OPENAI_MODEL}:{settings.NATIONALITY_EXTRACTOR}"
+    if model_router.routes:
+        model += f":routes-{model_router.fingerprint()}"
+    return make_cache_key(text, model, openai_utils.PROMPT_VERSION)
+
+
+async def stream_analysis(text: str) -> AsyncIterator[Tuple[str, object]]:
+    """
+    Streaming variant of perform_analysis using the same three prompts. Yields (event, data) pairs:
+    'summary_delta' (str) while the summary is generated, 'summary' (str), 'nationalities' (list)
+    and 'entities' ({'organizations', 'people'}) as each part completes, an 'error' (str) per failed
+    part, and finally 'done' with the complete analysis dict.
+    """
     if not text or not text.strip():
          raise ValueError("Input text for analysis cannot be empty.")
 
-    if len(text) > settings.MAX_TEXT_LENGTH:
-         # This check should also ideally happen before calling
-         raise HTTPException(
-             status_code=413,
-             detail=f"Input text is too long ({len(text)} chars). Maximum allowed is {settings.MAX_TEXT_LENGTH}."
-        )
+    text_tokens = count_article_tokens(text)
+    if needs_chunking(text, text_tokens):
+        # Long articles go through the chunked pipeline; there is no single summary to stream
+        for event in _result_events(await perform_analysis(text)):
+            yield event
+        return
 
-    analysis_results = {}
+    # Streamed results always come from the three-call prompts, so use that cache key
+    cache_key = analysis_cache_key(text, mode="multi")
+    if settings.CACHE_ENABLED:
+        cached = analysis_cache.get(cache_key)
+        if cached is not None:
+            print("Analysis Service: Cache hit, skipping OpenAI calls.")
+            for event in _result_events(cached):
+                yield event
+            return
+    check_token_limits(text, text_tokens, mode="multi")
+
+    events: "asyncio.Queue[Tuple[str, object]]" = asyncio.Queue()
+    analysis_results = {'summary': None, 'nationalities': [], 'organizations': [], 'people': []}
     errors = []
 
+    async def produce_summary():
+        parts = []
+        try:
+            async for delta in openai_utils.stream_summary(text):
+                parts.append(delta)
+                await events.put(("summary_delta", delta))
+            analysis_results['summary'] = "".join(parts).strip()
+            if not analysis_results['summary']:
+                errors.append("Summary generation failed.")
+            await events.put(("summary", analysis_results['summary']))
+        except Exception as e:
+            print(f"Analysis Service Error (Streaming summary): {e}")
+            errors.append("Summary generation failed.")
+            await events.put(("error", "Summary generation failed."))
+
+    async def produce_nationalities():
+        try:
+            analysis_results['nationalities'] = await extract_nationalities(text)
+            await events.put(("nationalities", analysis_results['nationalities']))
+        except Exception as e:
+            print(f"Analysis Service Error (Nationalities): {e}")
+            errors.append("Nationality extraction failed.")
+            await events.put(("error", "Nationality extraction failed."))
+
+    async def produce_entities():
+        try:
+            entities = await openai_utils.extract_entities(text)
+            analysis_results['organizations'] = entities.get("organizations", [])
+            analysis_results['people'] = entities.get("people", [])
+            await events.put(("entities", entities))
+        except Exception as e:
+            print(f"Analysis Service Error (Entities): {e}")
+            errors.append("Entity extraction failed.")
+            await events.put(("error", "Entity extraction failed."))
+
+    producers = [asyncio.create_task(p()) for p in (produce_summary, produce_nationalities, produce_entities)]
+    # Sentinel once every producer has finished
+    all_done = asyncio.gather(*producers)
+    all_done.add_done_callback(lambda _: events.put_nowait(("_finished", None)))
     try:
-        print("Analysis Service: Generating summary...")
-        analysis_results['summary'] =openai_utils.summarize_text(text)
+        while True:
+            event, data = await events.get()
+            if event == "_finished":
+                break
+            yield event, data
+    finally:
+        # Client went away (or the consumer stopped early): don't leave calls running
+        for task in producers:
+            task.cancel()
+
+    if errors:
+        print(f"Streaming analysis completed with errors: {errors}")
+    elif settings.CACHE_ENABLED:
+        analysis_cache.put(cache_key, analysis_results)
+    yield "done", copy_result(analysis_results)
+
+
+async def extract_nationalities(text: str) -> List[str]:
+    """Nationalities via the LLM prompt, the bundled gazetteer, or both (NATIONALITY_EXTRACTOR)."""
+    if settings.NATIONALITY_EXTRACTOR not in ("gazetteer", "hybrid"):
+        return await openai_utils.extract_nationalities(text)
+
+    matches = nationality_gazetteer.match(text)
+    if settings.NATIONALITY_EXTRACTOR == "gazetteer" or not matches.ambiguous:
+        # Unconfirmed ambiguous matches are dropped when there is no LLM to ask
+        return matches.nationalities
+    print(f"Analysis Service: Confirming ambiguous nationality matches with the LLM: {sorted(matches.ambiguous)}")
+    confirmed = await openai_utils.confirm_nationalities(matches.ambiguous)
+    return sorted(set(matches.nationalities) | set(confirmed))
+
+
+# --- Token Limits and Estimates ---
+
+def count_article_tokens(text: str) -> int:
+    return token_counter.count_tokens(text, settings.OPENAI_MODEL)
+
+
+def needs_chunking(text: str, text_tokens: int) -> bool:
+    return len(text) > settings.MAX_TEXT_LENGTH or text_tokens > settings.MAX_INPUT_TOKENS
+
+
+def chunk_size_chars(text: str, text_tokens: int) -> int:
+    """Chunk length in characters, so token-dense text (e.g. CJK) also fits MAX_INPUT_TOKENS."""
+    size = min(settings.CHUNK_SIZE_CHARS, settings.MAX_TEXT_LENGTH)
+    if text_tokens > 0:
+        # 10% headroom: density varies within an article
+        size = min(size, int(len(text) * settings.MAX_INPUT_TOKENS / text_tokens * 0.9))
+    return max(1, size)
+
+
+def plan_calls(text: str, text_tokens: int, mode: Optional[str] = None) -> Tuple[List[schemas.TokenEstimateCall], int]:
+    """The OpenAI calls an analysis of `text` will make, and the number of chunks it is split into."""
+    if not needs_chunking(text, text_tokens):
+        return _plan_article_calls(text, text_tokens, mode), 1
+
+    chunks = split_text(text, chunk_size_chars(text, text_tokens))
+    calls = []
+    for chunk in chunks:
+        calls.extend(_plan_article_calls(chunk, count_article_tokens(chunk), mode))
+    if len(chunks) > 1:
+        # The combining prompt holds every section summary, each at most OPENAI_MAX_TOKENS_SUMMARY
+        combine = openai_utils.estimate_call("summary_combine", openai_utils.build_combine_prompt([""] * len(chunks)), settings.OPENAI_MAX_TOKENS_SUMMARY, "summary")
+        combine.prompt_tokens += len(chunks) * settings.OPENAI_MAX_TOKENS_SUMMARY
+        calls.append(combine)
+    return calls, len(chunks)
+
+
+def _plan_article_calls(text: str, text_tokens: int, mode: Optional[str] = None) -> List[schemas.TokenEstimateCall]:
+    if (mode or settings.ANALYSIS_MODE) == "single":
+        return [openai_utils.estimate_article_call("structured", text_tokens)]
+
+    calls = [openai_utils.estimate_article_call("summary", text_tokens)]
+    if settings.NATIONALITY_EXTRACTOR not in ("gazetteer", "hybrid"):
+        calls.append(openai_utils.estimate_article_call("nationalities", text_tokens))
+    elif settings.NATIONALITY_EXTRACTOR == "hybrid":
+        ambiguous = nationality_gazetteer.match(text).ambiguous
+        if ambiguous:
+            calls.append(openai_utils.estimate_call("nationality_confirmation", openai_utils.build_confirm_prompt(ambiguous), settings.OPENAI_MAX_TOKENS_EXTRACTION, "extraction"))
+    calls.append(openai_utils.estimate_article_call("entities", text_tokens))
+    return calls
+
+
+def check_token_limits(text: str, text_tokens: int, mode: Optional[str] = None) -> None:
+    """
+    Pre-flight check before any OpenAI call: raises 413 if the article is over MAX_INPUT_TOKENS
+    and can't be chunked, or if the planned calls could use more than REQUEST_TOKEN_BUDGET.
+    """
+    if text_tokens > settings.MAX_INPUT_TOKENS and not settings.CHUNKING_ENABLED:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Input text is too long ({text_tokens} tokens). Maximum allowed is {settings.MAX_INPUT_TOKENS}."
+        )
+    if settings.REQUEST_TOKEN_BUDGET > 0:
+        calls, _ = plan_calls(text, text_tokens, mode)
+        max_total = sum(call.prompt_tokens + call.max_completion_tokens for call in calls)
+        if max_total > settings.REQUEST_TOKEN_BUDGET:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Analyzing this article could use up to {max_total} tokens, over the per-request budget of {settings.REQUEST_TOKEN_BUDGET}."
+            )
+
+
+def estimate_analysis(text: str) -> schemas.TokenEstimate:
+    """Token estimate of perform_analysis(text), without calling the model."""
+    text_tokens = count_article_tokens(text)
+    calls, chunks = plan_calls(text, text_tokens)
+    cached = settings.CACHE_ENABLED and analysis_cache.contains(analysis_cache_key(text))
+    prompt_tokens = sum(call.prompt_tokens for call in calls)
+    max_completion_tokens = sum(call.max_completion_tokens for call in calls)
+    budget = settings.REQUEST_TOKEN_BUDGET or None
+    too_long = text_tokens > settings.MAX_INPUT_TOKENS and not settings.CHUNKING_ENABLED
+    return schemas.TokenEstimate(
+        characters=len(text),
+        article_tokens=text_tokens,
+        tokenizer=token_counter.tokenizer_name(settings.OPENAI_MODEL),
+        chunks=chunks,
+        cached=cached,
+        calls=calls,
+        prompt_tokens=prompt_tokens,
+        max_completion_tokens=max_completion_tokens,
+        max_total_tokens=prompt_tokens + max_completion_tokens,
+        token_budget=budget,
+        within_limits=not too_long and (budget is None or prompt_tokens + max_completion_tokens <= budget),
+    )
+
+
+def _result_events(result: dict) -> List[Tuple[str, object]]:
+    """stream_analysis events for a result that is already complete (e.g. from the cache)."""
+    return [
+        ("summary_delta", result.get('summary') or ""),
+        ("summary", result.get('summary')),
+        ("nationalities", result.get('nationalities', [])),
+        ("entities", {"organizations": result.get('organizations', []), "people": result.get('people', [])}),
+        ("done", result),
+    ]
+
+
+async def _analyze_chunked(text: str, text_tokens: int, analysis_results: dict, errors: List[str]) -> None:
+    """
+    Map-reduce analysis for articles longer than MAX_TEXT_LENGTH or MAX_INPUT_TOKENS: each chunk
+    runs the configured analysis mode (at most CHUNK_MAX_FANOUT chunks at a time), entity lists
+    are merged and deduplicated, and the per-chunk summaries are condensed into one final summary.
+    """
+    chunks = split_text(text, chunk_size_chars(text, text_tokens))
+    print(f"Analysis Service: Long input ({len(text)} chars), analyzing {len(chunks)} chunks...")
+    semaphore = asyncio.Semaphore(settings.CHUNK_MAX_FANOUT)
+
+    async def analyze_chunk(chunk: str) -> Tuple[dict, List[str]]:
+        chunk_results, chunk_errors = {}, []
+        async with semaphore:
+            if settings.ANALYSIS_MODE == "single":
+                await _analyze_single_call(chunk, chunk_results, chunk_errors)
+            else:
+                await _analyze_multi_call(chunk, chunk_results, chunk_errors)
+        return chunk_results, chunk_errors
+
+    chunk_outputs = await asyncio.gather(*(analyze_chunk(chunk) for chunk in chunks))
+    for _, chunk_errors in chunk_outputs:
+        errors.extend(chunk_errors)
+
+    analysis_results['nationalities'] = merge_unique(r.get('nationalities', []) for r, _ in chunk_outputs)
+    analysis_results['organizations'] = merge_unique(r.get('organizations', []) for r, _ in chunk_outputs)
+    analysis_results['people'] = merge_unique(r.get('people', []) for r, _ in chunk_outputs)
+
+    partial_summaries = [r['summary'] for r, _ in chunk_outputs if r.get('summary')]
+    if not partial_summaries:
+        analysis_results['summary'] = None
+        return
+    try:
+        analysis_results['summary'] = await openai_utils.combine_summaries(partial_summaries)
+        if analysis_results['summary'] == openai_utils.SUMMARY_UNAVAILABLE:
+            errors.append("Summary generation failed.")
     except Exception as e:
-        print(f"Analysis Service Error (Summary): {e}")
+        print(f"Analysis Service Error (Summary reduce): {e}")
         errors.append("Summary generation failed.")
         analysis_results['summary'] = None
 
+
+async def _analyze_single_call(text: str, analysis_results: dict, errors: List[str]) -> None:
+    """Fills analysis_results from one structured-output call returning all four fields."""
     try:
-        print("Analysis Service: Extracting nationalities...")
-        analysis_results['nationalities'] =openai_utils.extract_nationalities(text)
+        print("Analysis Service: Running single-call structured analysis...")
+        analysis = await openai_utils.analyze_text_structured(text)
+        analysis_results['summary'] = analysis.summary
+        analysis_results['nationalities'] = analysis.nationalities
+        analysis_results['organizations'] = analysis.organizations
+        analysis_results['people'] = analysis.people
     except Exception as e:
-        print(f"Analysis Service Error (Nationalities): {e}")
+        print(f"Analysis Service Error (Structured analysis): {e}")
+        errors.append("Structured analysis failed.")
+        analysis_results['summary'] = None
+        analysis_results['nationalities'] = []
+        analysis_results['organizations'] = []
+        analysis_results['people'] = []
+
+
+async def _analyze_multi_call(text: str, analysis_results: dict, errors: List[str]) -> None:
+    """Fills analysis_results from the three separate summary/nationality/entity prompts."""
+    # The three prompts are independent, so run them concurrently on the async client.
+    # Latency is roughly that of the slowest call instead of the sum of all three.
+    print("Analysis Service: Generating summary, extracting nationalities and entities...")
+    summary, nationalities, entities = await asyncio.gather(
+        openai_utils.summarize_text(text),
+        extract_nationalities(text),
+        openai_utils.extract_entities(text),
+        return_exceptions=True,
+    )
+
+    if isinstance(summary, BaseException):
+        print(f"Analysis Service Error (Summary): {summary}")
+        errors.append("Summary generation failed.")
+        analysis_results['summary'] = None
+    else:
+        if summary == openai_utils.SUMMARY_UNAVAILABLE:
+            errors.append("Summary generation failed.")
+        analysis_results['summary'] = summary
+
+    if isinstance(nationalities, BaseException):
+        print(f"Analysis Service Error (Nationalities): {nationalities}")
         errors.append("Nationality extraction failed.")
         analysis_results['nationalities'] = []
+    else:
+        analysis_results['nationalities'] = nationalities
 
-    try:
-        print("Analysis Service: Extracting entities...")
-        entities = openai_utils.extract_entities(text)
-        analysis_results['organizations'] = entities.get("organizations", [])
-        analysis_results['people'] = entities.get("people", [])
-    except Exception as e:
-        print(f"Analysis Service Error (Entities): {e}")
+    if isinstance(entities, BaseException):
+        print(f"Analysis Service Error (Entities): {entities}")
         errors.append("Entity extraction failed.")
         analysis_results['organizations'] = []
         analysis_results['people'] = []
-
-    # Optionally include errors in the result if needed
-    # analysis_results['errors'] = errors
-    if errors:
-        print(f"Analysis completed with errors: {errors}")
-
-    print("Analysis Service: Analysis complete.")
-    return analysis_results
\ No newline at end of file
+    else:
+        analysis_results['organizations'] = entities.get("organizations", [])
+        analysis_results['people'] = entities.get("people", [])
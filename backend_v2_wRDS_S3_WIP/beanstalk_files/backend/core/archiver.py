@@ -0,0 +1,93 @@
+# backend/core/archiver.py
+import asyncio
+import io
+from typing import Dict, Optional, Set
+
+from fastapi import UploadFile
+
+from backend.core.file_processor import ArticleInput
+from backend.db import crud, database
+from backend.utils import s3_utils
+
+# Uploads still running, so shutdown can wait for them
+_pending: Set[asyncio.Task] = set()
+# Object key -> running upload, so identical files arriving together are uploaded once
+_inflight: Dict[str, asyncio.Task] = {}
+
+
+def start_article_upload(article: ArticleInput, file_upload: Optional[UploadFile]) -> Optional[asyncio.Task]:
+    """
+    Starts archiving the uploaded article file to S3 without waiting for it. Returns the
+    upload task (its result is the object key, or None on failure), or None when there is
+    nothing to upload.
+
+    FastAPI closes form uploads as soon as the endpoint returns, so the task takes over
+    the spooled file and closes it itself once the upload has finished.
+    """
+    if not s3_utils.s3_available or not article.file:
+        return None
+    if file_upload is not None and file_upload.file is article.file:
+        file_upload.file = io.BytesIO()
+    return start_upload(article.file, article.filename, article.content_type, article.sha256)
+
+
+def start_upload(content, filename: str, content_type: Optional[str], sha256: Optional[str] = None) -> asyncio.Task:
+    """
+    Uploads bytes or a file object on the S3 upload executor; file objects are closed afterwards.
+    With the content hash given, a file already being uploaded joins that upload instead.
+    """
+    key = s3_utils.content_object_key(sha256, filename) if sha256 else None
+    running = _inflight.get(key) if key else None
+    if running is not None:
+        if hasattr(content, "close"):
+            content.close()
+        return running
+
+    async def run() -> Optional[str]:
+        try:
+            s3_key = await s3_utils.upload_file_to_s3_async(content, filename, content_type, sha256)
+        finally:
+            if hasattr(content, "close"):
+                content.close()
+            if key:
+                _inflight.pop(key, None)
+        if s3_key:
+            print(f"File successfully uploaded to S3 with key: {s3_key}")
+        else:
+            print("S3 upload failed or was skipped.")
+        return s3_key
+
+    task = asyncio.create_task(run())
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
+    if key:
+        _inflight[key] = task
+    return task
+
+
+def record_key_when_done(task: asyncio.Task, record_id: Optional[int]) -> None:
+    """Writes the upload's object key to the analysis record once the upload has finished."""
+    if record_id is None:
+        return
+
+    async def run() -> None:
+        try:
+            s3_key = await task
+        except Exception as e:
+            print(f"S3 upload for record {record_id} failed: {e}")
+            return
+        if not s3_key or not database.SessionLocal:
+            return
+        async with database.SessionLocal() as db:
+            await crud.set_s3_object_key(db, record_id, s3_key)
+
+    follow_up = asyncio.create_task(run())
+    _pending.add(follow_up)
+    follow_up.add_done_callback(_pending.discard)
+
+
+async def drain() -> None:
+    """Waits for in-flight uploads and key updates (called on app shutdown)."""
+    if _pending:
+        print(f"Waiting for {len(_pending)} pending S3 upload(s)...")
+        await asyncio.gather(*list(_pending), return_exceptions=True)
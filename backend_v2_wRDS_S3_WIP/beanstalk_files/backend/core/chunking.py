@@ -0,0 +1,76 @@
+# backend/core/chunking.py
+import re
+from typing import Iterable, List
+
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def split_text(text: str, chunk_size: int) -> List[str]:
+    """
+    Splits text into chunks of at most `chunk_size` characters, preferring paragraph
+    boundaries, then sentence boundaries, then whitespace. Whitespace at the split
+    points is not preserved.
+    """
+    if len(text) <= chunk_size:
+        return [text]
+
+    pieces: List[str] = []
+    for paragraph in _PARAGRAPH_RE.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) <= chunk_size:
+            pieces.append(paragraph)
+            continue
+        for sentence in _SENTENCE_RE.split(paragraph):
+            if len(sentence) <= chunk_size:
+                pieces.append(sentence)
+            else:
+                pieces.extend(_split_on_whitespace(sentence, chunk_size))
+
+    return _pack(pieces, chunk_size)
+
+
+def _split_on_whitespace(text: str, chunk_size: int) -> List[str]:
+    """Last resort for a single overlong sentence: cut at the last space before the limit."""
+    parts = []
+    while len(text) > chunk_size:
+        cut = text.rfind(" ", 0, chunk_size)
+        if cut <= 0:
+            cut = chunk_size
+        parts.append(text[:cut])
+        text = text[cut:].lstrip()
+    if text:
+        parts.append(text)
+    return parts
+
+
+def _pack(pieces: Iterable[str], chunk_size: int) -> List[str]:
+    """Greedily joins consecutive pieces into chunks no longer than chunk_size."""
+    chunks: List[str] = []
+    current: List[str] = []
+    current_len = 0
+    for piece in pieces:
+        added_len = len(piece) + (2 if current else 0)
+        if current and current_len + added_len > chunk_size:
+            chunks.append("\n\n".join(current))
+            current, current_len = [], 0
+            added_len = len(piece)
+        current.append(piece)
+        current_len += added_len
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def merge_unique(lists: Iterable[List[str]]) -> List[str]:
+    """Merges entity lists, dropping case/whitespace duplicates (first spelling wins), sorted."""
+    seen = {}
+    for items in lists:
+        for item in items:
+            cleaned = " ".join(item.split())
+            key = cleaned.casefold()
+            if cleaned and key not in seen:
+                seen[key] = cleaned
+    return sorted(seen.values())
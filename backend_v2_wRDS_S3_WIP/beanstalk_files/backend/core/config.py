@@ -1,5 +1,6 @@
 # backend/core/config.py
 import os
+import tempfile
 from dotenv import load_dotenv
 from typing import Optional
 
@@ -12,6 +13,36 @@ class Settings:
     # OpenAI
     OPENAI_API_KEY: Optional[str] = os.getenv("OPENAI_API_KEY") 
     OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+    # Model used by the single-call "analyze" mode; it must support JSON-schema structured outputs
+    OPENAI_STRUCTURED_MODEL: str = os.getenv("OPENAI_STRUCTURED_MODEL", "gpt-4o-mini")
+    OPENAI_TIMEOUT: float = float(os.getenv("OPENAI_TIMEOUT", 60))
+    # OpenAI-compatible API to call instead of api.openai.com (e.g. backend_test/benchmarks/openai_stub.py)
+    OPENAI_BASE_URL: Optional[str] = os.getenv("OPENAI_BASE_URL") or None
+    # Model tried when a call times out or gets a 5xx (instead of retrying the same model); unset = none
+    OPENAI_FALLBACK_MODEL: Optional[str] = os.getenv("OPENAI_FALLBACK_MODEL") or None
+    # JSON table routing calls to models by task and prompt size (see model_routes.example.json); unset = OPENAI_MODEL
+    MODEL_ROUTES_PATH: Optional[str] = os.getenv("MODEL_ROUTES_PATH") or None
+    # Shared HTTP connection pool for the async client (per worker process)
+    OPENAI_MAX_CONNECTIONS: int = int(os.getenv("OPENAI_MAX_CONNECTIONS", 100))
+    OPENAI_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", 20))
+    # Client-side rate limit shared by all worker processes on the host (0 disables a bucket).
+    # Set these to (a little below) the account's limits for the configured models.
+    OPENAI_RPM_LIMIT: int = int(os.getenv("OPENAI_RPM_LIMIT", 500))
+    OPENAI_TPM_LIMIT: int = int(os.getenv("OPENAI_TPM_LIMIT", 200000))
+    OPENAI_RATE_LIMIT_STATE_PATH: str = os.getenv("OPENAI_RATE_LIMIT_STATE_PATH", os.path.join(tempfile.gettempdir(), "ai_news_openai_rate_limit"))
+    OPENAI_RATE_LIMIT_MAX_WAIT_SECONDS: float = float(os.getenv("OPENAI_RATE_LIMIT_MAX_WAIT_SECONDS", 120))
+    # Completion tokens reserved per call until the actual usage is known
+    OPENAI_COMPLETION_TOKEN_ESTIMATE: int = int(os.getenv("OPENAI_COMPLETION_TOKEN_ESTIMATE", 300))
+    # Completion length limit (max_tokens) of each call, by prompt
+    OPENAI_MAX_TOKENS_SUMMARY: int = int(os.getenv("OPENAI_MAX_TOKENS_SUMMARY", 300))
+    OPENAI_MAX_TOKENS_EXTRACTION: int = int(os.getenv("OPENAI_MAX_TOKENS_EXTRACTION", 500))
+    OPENAI_MAX_TOKENS_STRUCTURED: int = int(os.getenv("OPENAI_MAX_TOKENS_STRUCTURED", 1000))
+    # Token counting: "tiktoken" (exact, if installed and its encodings can be loaded) or "estimate"
+    TOKENIZER: str = os.getenv("TOKENIZER", "tiktoken").lower()
+    # Retries for 429s, 5xx and connection errors (jittered exponential backoff, honoring Retry-After)
+    OPENAI_MAX_RETRIES: int = int(os.getenv("OPENAI_MAX_RETRIES", 5))
+    OPENAI_RETRY_BASE_DELAY: float = float(os.getenv("OPENAI_RETRY_BASE_DELAY", 1.0))
+    OPENAI_RETRY_MAX_DELAY: float = float(os.getenv("OPENAI_RETRY_MAX_DELAY", 60))
 
     # AWS Credentials (Use IAM Role/Instance Profile in production on EB/EC2)
     AWS_ACCESS_KEY_ID: Optional[str] = os.getenv("AWS_ACCESS_KEY_ID")   
@@ -20,6 +51,17 @@ class Settings:
 
     # S3
     S3_BUCKET_NAME: Optional[str] = os.getenv("S3_BUCKET_NAME") 
+    S3_ENDPOINT_URL: Optional[str] = os.getenv("S3_ENDPOINT_URL") # S3-compatible stand-in (MinIO, moto server, LocalStack)
+    S3_LOCAL_DIR: Optional[str] = os.getenv("S3_LOCAL_DIR") # Store "uploads" in this directory instead of S3 (local dev/tests)
+    # "concurrent": upload while the article is analyzed, key returned in the response;
+    # "background": upload after the response, key written to the record when done
+    S3_UPLOAD_MODE: str = os.getenv("S3_UPLOAD_MODE", "concurrent").lower()
+    S3_UPLOAD_WORKERS: int = int(os.getenv("S3_UPLOAD_WORKERS", 8)) # Uploads in flight per worker process
+    S3_MAX_POOL_CONNECTIONS: int = int(os.getenv("S3_MAX_POOL_CONNECTIONS", 32))
+    S3_MULTIPART_THRESHOLD_BYTES: int = int(os.getenv("S3_MULTIPART_THRESHOLD_BYTES", 8 * 1024 * 1024))
+    S3_MULTIPART_CHUNK_BYTES: int = int(os.getenv("S3_MULTIPART_CHUNK_BYTES", 8 * 1024 * 1024))
+    S3_MULTIPART_CONCURRENCY: int = int(os.getenv("S3_MULTIPART_CONCURRENCY", 4)) # Parts uploaded in parallel per file
+    S3_KNOWN_KEYS_MAX: int = int(os.getenv("S3_KNOWN_KEYS_MAX", 100000)) # Object keys remembered as stored, to skip the HEAD check
 
     # RDS Database
     DB_TYPE: Optional[str] = os.getenv("DB_TYPE") 
@@ -34,29 +76,115 @@ class Settings:
     SQLALCHEMY_DATABASE_URL: Optional[str] = None 
     if all([DB_TYPE, DB_DRIVER, DB_USERNAME, DB_PASSWORD, DB_HOST, DB_PORT, DB_NAME]):
         SQLALCHEMY_DATABASE_URL = f"{DB_TYPE}+{DB_DRIVER}://{DB_USERNAME}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-        print(f"Database URL configured: {DB_TYPE}://{DB_USERNAME}:***@{DB_HOST}:{DB_PORT}/{DB_NAME}")
-    else:
-        print("Warning: Database environment variables not fully configured.")
+    # A full SQLAlchemy URL overrides the DB_* parts (e.g. sqlite:///./local.db for local runs).
+    # Sync driver names are mapped to their asyncio counterparts (asyncpg, aiosqlite, aiomysql).
+    DATABASE_URL: Optional[str] = os.getenv("DATABASE_URL")
+    if DATABASE_URL:
+        SQLALCHEMY_DATABASE_URL = DATABASE_URL
+
+    # Connection pool (per worker process)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", 10))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", 10))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", 10)) # Seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", 1800)) # Reconnect before RDS/proxies drop idle connections
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+    DB_STATEMENT_TIMEOUT_MS: int = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 15000)) # 0 = no limit (PostgreSQL/MySQL)
+
+    # Write-behind buffer: analysis records are collected and bulk-inserted instead of one commit each
+    DB_WRITE_BEHIND_ENABLED: bool = os.getenv("DB_WRITE_BEHIND_ENABLED", "false").lower() in ("1", "true", "yes")
+    DB_WRITE_BEHIND_BATCH_SIZE: int = int(os.getenv("DB_WRITE_BEHIND_BATCH_SIZE", 100)) # Flush after this many records...
+    DB_WRITE_BEHIND_FLUSH_MS: int = int(os.getenv("DB_WRITE_BEHIND_FLUSH_MS", 200)) # ...or this long after the first one
+    DB_WRITE_BEHIND_MAX_QUEUE: int = int(os.getenv("DB_WRITE_BEHIND_MAX_QUEUE", 5000)) # Callers wait when this many are pending
+
+    # Analysis mode: "multi" = three separate prompts (summary, nationalities, entities),
+    # "single" = one JSON-schema-constrained call returning all four fields
+    ANALYSIS_MODE: str = os.getenv("ANALYSIS_MODE", "multi").lower()
+    # Nationality extraction in the multi-call mode: "llm" = prompt only, "gazetteer" = bundled
+    # country/demonym table only (no OpenAI call), "hybrid" = table, plus a short LLM call for
+    # ambiguous matches only
+    NATIONALITY_EXTRACTOR: str = os.getenv("NATIONALITY_EXTRACTOR", "llm").lower()
+
+    # In-memory analysis result cache (per worker process)
+    CACHE_ENABLED: bool = os.getenv("CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+    CACHE_MAX_ENTRIES: int = int(os.getenv("CACHE_MAX_ENTRIES", 10000))
+    CACHE_MAX_BYTES: int = int(os.getenv("CACHE_MAX_BYTES", 64 * 1024 * 1024))
+    CACHE_TTL_SECONDS: float = float(os.getenv("CACHE_TTL_SECONDS", 24 * 3600))
+
+    # Asynchronous job queue (/jobs)
+    JOB_QUEUE_BACKEND: str = os.getenv("JOB_QUEUE_BACKEND", "memory").lower() # memory | sqlite | rabbitmq
+    JOB_QUEUE_SQLITE_PATH: str = os.getenv("JOB_QUEUE_SQLITE_PATH", "job_queue.sqlite3")
+    RABBITMQ_URL: Optional[str] = os.getenv("RABBITMQ_URL")
+    JOB_QUEUE_NAME: str = os.getenv("JOB_QUEUE_NAME", "analysis_jobs")
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", 4)) # 0 = submit only, don't consume in this process (sqlite/rabbitmq queues only)
+    JOB_PREFETCH: int = int(os.getenv("JOB_PREFETCH", 8))
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", 3))
+    JOB_VISIBILITY_TIMEOUT_SECONDS: float = float(os.getenv("JOB_VISIBILITY_TIMEOUT_SECONDS", 600))
+
+    # Upload limits, enforced while the request body is received (413 once exceeded).
+    # Uploads larger than 1 MB are spooled to a temp file by the multipart parser.
+    MAX_UPLOAD_BYTES: int = int(os.getenv("MAX_UPLOAD_BYTES", 25 * 1024 * 1024))
+
+    # .docx text extraction
+    DOCX_MAX_DECOMPRESSED_BYTES: int = int(os.getenv("DOCX_MAX_DECOMPRESSED_BYTES", 50 * 1024 * 1024)) # Zip bomb guard
+    DOCX_PROCESS_WORKERS: int = int(os.getenv("DOCX_PROCESS_WORKERS", 2)) # 0 = parse in a thread instead
+    DOCX_PROCESS_POOL_MIN_BYTES: int = int(os.getenv("DOCX_PROCESS_POOL_MIN_BYTES", 512 * 1024)) # Smaller files use a thread
 
     # Text Processing Limits
     MAX_TEXT_LENGTH: int = int(os.getenv("MAX_TEXT_LENGTH", 20000))
+    # Article tokens sent in one call; longer (or token-dense, e.g. CJK) articles are chunked
+    MAX_INPUT_TOKENS: int = int(os.getenv("MAX_INPUT_TOKENS", 6000))
+    # Most tokens (prompts + max_tokens of every call) one analysis may use; 0 = no limit
+    REQUEST_TOKEN_BUDGET: int = int(os.getenv("REQUEST_TOKEN_BUDGET", 0))
+
+    # Map-reduce analysis for articles longer than MAX_TEXT_LENGTH
+    CHUNKING_ENABLED: bool = os.getenv("CHUNKING_ENABLED", "true").lower() in ("1", "true", "yes")
+    CHUNK_SIZE_CHARS: int = int(os.getenv("CHUNK_SIZE_CHARS", 8000))
+    CHUNK_MAX_FANOUT: int = int(os.getenv("CHUNK_MAX_FANOUT", 8)) # Chunks analyzed in parallel
+    MAX_CHUNKED_TEXT_LENGTH: int = int(os.getenv("MAX_CHUNKED_TEXT_LENGTH", 200000))
+    # Longest input accepted by the endpoints
+    MAX_ANALYSIS_TEXT_LENGTH: int = MAX_CHUNKED_TEXT_LENGTH if CHUNKING_ENABLED else MAX_TEXT_LENGTH
+
+    # Batch ingestion (/analyze/batch)
+    BATCH_MAX_ITEMS: int = int(os.getenv("BATCH_MAX_ITEMS", 500))
+    BATCH_MAX_BYTES: int = int(os.getenv("BATCH_MAX_BYTES", 100 * 1024 * 1024))
+    BATCH_ITEM_MAX_BYTES: int = int(os.getenv("BATCH_ITEM_MAX_BYTES", 5 * 1024 * 1024))
+    BATCH_CONCURRENCY: int = int(os.getenv("BATCH_CONCURRENCY", 8))
+
+    # Per-request stage timings in a Server-Timing response header
+    SERVER_TIMING_ENABLED: bool = os.getenv("SERVER_TIMING_ENABLED", "true").lower() in ("1", "true", "yes")
+    # Sampling wall-clock profiler for a fraction of requests (off: not even installed)
+    PROFILING_ENABLED: bool = os.getenv("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+    PROFILE_SAMPLE_RATE: float = float(os.getenv("PROFILE_SAMPLE_RATE", 0.01)) # Fraction of matching requests profiled
+    PROFILE_PATHS: str = os.getenv("PROFILE_PATHS", "/analyze") # Comma-separated path prefixes
+    PROFILE_INTERVAL_MS: float = float(os.getenv("PROFILE_INTERVAL_MS", 5)) # Time between stack samples
+    PROFILE_MIN_DURATION_MS: float = float(os.getenv("PROFILE_MIN_DURATION_MS", 0)) # Faster requests are not saved
+    PROFILE_DIR: str = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "ai_news_profiles"))
+
+    # Start-up: by default the server accepts requests at once and connects its dependencies
+    # in the background (GET /ready reports when done); true = wait for them before serving
+    STARTUP_WAIT_FOR_DEPENDENCIES: bool = os.getenv("STARTUP_WAIT_FOR_DEPENDENCIES", "false").lower() in ("1", "true", "yes")
+    READY_DB_PING_TIMEOUT: float = float(os.getenv("READY_DB_PING_TIMEOUT", 2)) # Seconds allowed for /ready's SELECT 1
 
 
 settings = Settings()
 
 # --- Simple Checks ---
-if not settings.OPENAI_API_KEY:
-    print("CRITICAL: OPENAI_API_KEY not found in environment variables. OpenAI calls will fail.")
-
-if settings.SQLALCHEMY_DATABASE_URL:
-     print("Database connection string is configured.")
-else:
-     print("Database connection string is NOT configured. Results will not be saved to DB.")
-
-# Check S3 essential config
-s3_configured = bool(settings.AWS_REGION and settings.S3_BUCKET_NAME)
-# Credential check is handled within s3_utils initialization
-if s3_configured:
-    print("S3 Region and Bucket Name are configured.")
-else:
-    print("S3 Region and/or Bucket Name are NOT configured. S3 uploads will be skipped.")
\ No newline at end of file
+def log_settings() -> None:
+    """Prints what is (not) configured. Called on app startup rather than at import."""
+    if not settings.OPENAI_API_KEY:
+        print("CRITICAL: OPENAI_API_KEY not found in environment variables. OpenAI calls will fail.")
+
+    if settings.DATABASE_URL:
+        print("Database URL configured from DATABASE_URL.")
+    elif settings.SQLALCHEMY_DATABASE_URL:
+        print(f"Database URL configured: {settings.DB_TYPE}://{settings.DB_USERNAME}:***@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}")
+    else:
+        print("Database connection string is NOT configured. Results will not be saved to DB.")
+
+    # Credential check is handled when s3_utils creates its client
+    if settings.S3_LOCAL_DIR:
+        print(f"S3_LOCAL_DIR set: uploads are stored under '{settings.S3_LOCAL_DIR}' instead of S3.")
+    elif settings.AWS_REGION and settings.S3_BUCKET_NAME:
+        print("S3 Region and Bucket Name are configured.")
+    else:
+        print("S3 Region and/or Bucket Name are NOT configured. S3 uploads will be skipped.")
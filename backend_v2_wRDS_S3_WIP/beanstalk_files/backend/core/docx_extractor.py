@@ -0,0 +1,232 @@
+# backend/core/docx_extractor.py
+import asyncio
+import io
+import multiprocessing
+import posixpath
+import re
+import zipfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import BinaryIO, List, Optional, Union
+
+from lxml import etree
+
+from backend.core.config import settings
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+MC_NS = "http://schemas.openxmlformats.org/markup-compatibility/2006"
+REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+OFFICE_DOCUMENT_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+
+_W = "{%s}" % W_NS
+_P, _T, _TAB, _BR, _CR, _HYPHEN = _W + "p", _W + "t", _W + "tab", _W + "br", _W + "cr", _W + "noBreakHyphen"
+_TBL, _TR, _TC = _W + "tbl", _W + "tr", _W + "tc"
+_FALLBACK = "{%s}Fallback" % MC_NS
+
+# Secondary parts, read after the main document
+_EXTRA_PART_RE = re.compile(r"^word/(footnotes|endnotes|header\d*|footer\d*)\.xml$")
+
+# Raised by zipfile while reading one entry: bad CRC or corrupt data, truncation, an encrypted
+# (password-protected) entry, an unsupported compression method
+_ENTRY_READ_ERRORS = (zipfile.BadZipFile, zlib.error, EOFError, OSError, RuntimeError, NotImplementedError)
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+class DocxExtractionError(Exception):
+    """The file is not a readable .docx document."""
+
+
+class DocxTooLargeError(DocxExtractionError):
+    """The document decompresses to more than the configured limit (possible zip bomb)."""
+
+
+class _BoundedReader(io.RawIOBase):
+    """Readable wrapper that fails once more than `budget[0]` bytes were read across all parts."""
+
+    def __init__(self, stream: BinaryIO, budget: List[int]):
+        self._stream = stream
+        self._budget = budget
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self._stream.read(len(buffer))
+        self._budget[0] -= len(data)
+        if self._budget[0] < 0:
+            raise DocxTooLargeError("Document content exceeds the maximum decompressed size.")
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def extract_docx_text(source: Union[bytes, BinaryIO], max_decompressed_bytes: Optional[int] = None) -> str:
+    """
+    Extracts the text of a .docx file: body paragraphs, tables (one line per row, cells
+    separated by tabs) and text boxes, followed by footnotes, endnotes, headers and footers.
+
+    Each XML part is stream-parsed with lxml iterparse and elements are discarded as soon as
+    their text is taken, so memory stays flat for large documents. No more than
+    `max_decompressed_bytes` are ever inflated, whatever the zip headers claim.
+    """
+    if max_decompressed_bytes is None:
+        max_decompressed_bytes = settings.DOCX_MAX_DECOMPRESSED_BYTES
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+
+    try:
+        zf = zipfile.ZipFile(source)
+    except zipfile.BadZipFile as e:
+        raise DocxExtractionError(f"Not a valid .docx (zip) file: {e}")
+
+    with zf:
+        names = set(zf.namelist())
+        main_part = _main_document_part(zf, names)
+        if main_part not in names:
+            raise DocxExtractionError("The file has no Word document part.")
+        parts = [main_part] + sorted(name for name in names if _EXTRA_PART_RE.match(name))
+
+        # Cheap early reject based on the declared sizes; _BoundedReader enforces the real ones
+        declared = sum(zf.getinfo(name).file_size for name in parts)
+        if declared > max_decompressed_bytes:
+            raise DocxTooLargeError("Document content exceeds the maximum decompressed size.")
+
+        budget = [max_decompressed_bytes]
+        sections: List[str] = []
+        seen = set()
+        for name in parts:
+            try:
+                with zf.open(name) as raw:
+                    text = _parse_part(io.BufferedReader(_BoundedReader(raw, budget)))
+            except etree.XMLSyntaxError as e:
+                raise DocxExtractionError(f"Malformed XML in '{name}': {e}")
+            except _ENTRY_READ_ERRORS as e:
+                raise DocxExtractionError(f"Could not read '{name}': {e}")
+            # Sections often repeat the same header/footer
+            if text and text not in seen:
+                seen.add(text)
+                sections.append(text)
+        return "\n".join(sections)
+
+
+def _main_document_part(zf: zipfile.ZipFile, names: set) -> str:
+    """Path of the main document part from _rels/.rels (almost always word/document.xml)."""
+    if "_rels/.rels" in names and zf.getinfo("_rels/.rels").file_size < 1024 * 1024:
+        try:
+            rels = etree.fromstring(zf.read("_rels/.rels"), parser=etree.XMLParser(resolve_entities=False, no_network=True))
+            for rel in rels.iter("{%s}Relationship" % REL_NS):
+                if rel.get("Type") == OFFICE_DOCUMENT_REL and rel.get("Target"):
+                    return posixpath.normpath(rel.get("Target").lstrip("/"))
+        except (etree.XMLSyntaxError,) + _ENTRY_READ_ERRORS:
+            pass # Fall back to the usual path; reading it reports the problem
+    return "word/document.xml"
+
+
+def _parse_part(stream: BinaryIO) -> str:
+    """Text of one WordprocessingML part, one line per paragraph or table row."""
+    lines: List[str] = []
+    # Open containers: paragraphs collect runs; table cells collect paragraphs; rows collect cells
+    paragraph_stack: List[List[str]] = []
+    cell_stack: List[List[str]] = []
+    row_stack: List[List[str]] = []
+    fallback_depth = 0
+
+    for event, elem in etree.iterparse(stream, events=("start", "end"), resolve_entities=False, no_network=True, huge_tree=False):
+        tag = elem.tag
+        if event == "start":
+            if tag == _FALLBACK:
+                fallback_depth += 1 # Legacy duplicate of the mc:Choice content
+            elif fallback_depth:
+                pass
+            elif tag == _P:
+                paragraph_stack.append([])
+            elif tag == _TC:
+                cell_stack.append([])
+            elif tag == _TR:
+                row_stack.append([])
+            continue
+
+        if tag == _FALLBACK:
+            fallback_depth -= 1
+            elem.clear()
+            continue
+        if fallback_depth:
+            continue
+
+        if tag == _T:
+            if paragraph_stack and elem.text:
+                paragraph_stack[-1].append(elem.text)
+        elif tag == _TAB:
+            if paragraph_stack:
+                paragraph_stack[-1].append("\t")
+        elif tag in (_BR, _CR):
+            if paragraph_stack:
+                paragraph_stack[-1].append("\n")
+        elif tag == _HYPHEN:
+            if paragraph_stack:
+                paragraph_stack[-1].append("-")
+        elif tag == _P:
+            text = "".join(paragraph_stack.pop()) if paragraph_stack else ""
+            (cell_stack[-1] if cell_stack else lines).append(text)
+            elem.clear()
+        elif tag == _TC:
+            cell = " ".join(p for p in cell_stack.pop() if p.strip()) if cell_stack else ""
+            if row_stack:
+                row_stack[-1].append(cell)
+            elem.clear()
+        elif tag == _TR:
+            row = "\t".join(row_stack.pop()) if row_stack else ""
+            (cell_stack[-1] if cell_stack else lines).append(row)
+            elem.clear()
+        elif tag == _TBL:
+            elem.clear()
+
+        # Drop already-processed siblings so the tree never grows with the document
+        if tag in (_P, _TBL) and elem.getparent() is not None:
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+
+    return "\n".join(lines).strip()
+
+
+# --- Process Pool ---
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn: forking a process that runs an event loop and client threads is unsafe
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.DOCX_PROCESS_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+def use_process_pool(size: int) -> bool:
+    """
+    Whether a document of `size` bytes should be parsed in the process pool. Small documents,
+    where pickling and IPC would dominate, and DOCX_PROCESS_WORKERS=0 deployments use a thread.
+    """
+    return settings.DOCX_PROCESS_WORKERS > 0 and size >= settings.DOCX_PROCESS_POOL_MIN_BYTES
+
+
+async def extract_docx_text_in_process(contents: bytes) -> str:
+    """Runs extract_docx_text in the process pool, so large documents don't hold this process's GIL."""
+    global _executor
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(_get_executor(), extract_docx_text, contents, settings.DOCX_MAX_DECOMPRESSED_BYTES)
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for memory); start a fresh pool next time, use a thread now
+        print("Warning: DOCX process pool broke; falling back to a thread for this document.")
+        _executor = None
+        return await asyncio.to_thread(extract_docx_text, contents)
+
+
+def shutdown_executor() -> None:
+    """Stops the DOCX worker processes (called on app shutdown)."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
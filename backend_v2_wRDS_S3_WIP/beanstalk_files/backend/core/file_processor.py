@@ -1,12 +1,154 @@
 # backend/core/file_processor.py
-import io
-import docx # python-docx
+import asyncio
+import hashlib
+import os
+import zipfile
+from dataclasses import dataclass
+from typing import BinaryIO, List, Optional, Tuple, Union
 from fastapi import HTTPException, UploadFile
+from backend.core.config import settings
+from backend.core import docx_extractor, metrics
+
+# Allowed file types
+ALLOWED_CONTENT_TYPES = ["text/plain", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"]
+ALLOWED_EXTENSIONS = [".txt", ".docx"]
+
+# Read size when hashing uploads
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass
+class ArticleInput:
+    """
+    Validated article text plus the original upload (if any) for archival. `file` is the
+    upload's own spooled file, rewound, so it can be streamed to S3 without another copy.
+    """
+    text: str
+    filename: Optional[str] = None
+    file: Optional[BinaryIO] = None
+    size: int = 0
+    sha256: Optional[str] = None
+    content_type: Optional[str] = None
+
+
+async def read_article_input(text_content: Optional[str], file_upload: Optional[UploadFile]) -> ArticleInput:
+    """
+    Validates the 'text_content' / 'file_upload' form inputs shared by the analysis endpoints
+    and returns the article text. Raises HTTPException (400/413) for invalid input.
+    """
+    article = ArticleInput(text="")
+
+    if file_upload:
+        # Basic validation
+        if not file_upload.filename:
+            raise HTTPException(status_code=400, detail="Uploaded file is missing a filename.")
+
+        # Check content type first
+        content_type_valid = file_upload.content_type in ALLOWED_CONTENT_TYPES
+        # Check extension as fallback or primary if content type is generic
+        file_ext = os.path.splitext(file_upload.filename)[1].lower()
+        extension_valid = file_ext in ALLOWED_EXTENSIONS
+
+        if not content_type_valid and not extension_valid:
+             raise HTTPException(status_code=400, detail=f"Invalid file content type '{file_upload.content_type}' or extension '{file_ext}'. Allowed types: .txt, .docx")
+
+        article.filename = file_upload.filename
+        article.content_type = s3_content_type(file_upload.content_type, file_ext)
+        print(f"Processing uploaded file: {article.filename}")
+
+        try:
+            # The multipart parser already spooled the upload (to disk if large). Hash and measure
+            # it in one chunked pass, then extract from the same file; no full copy in memory.
+            article.file = file_upload.file
+            with metrics.stage_seconds.time("upload_read"):
+                article.size, article.sha256 = await asyncio.to_thread(hash_file, article.file, settings.MAX_UPLOAD_BYTES)
+            if article.size > settings.MAX_UPLOAD_BYTES:
+                raise HTTPException(status_code=413, detail=f"Uploaded file exceeds the maximum size of {settings.MAX_UPLOAD_BYTES} bytes.")
+            article.text = await extract_text_async(article.filename, article.file)
+            article.file.seek(0)
+        except HTTPException as e:
+            # Re-raise file processing errors (like bad format, decode errors)
+            raise e
+        except Exception as e:
+            print(f"Unexpected error reading file {article.filename}: {e}")
+            raise HTTPException(status_code=500, detail="Server error while reading the uploaded file.")
+
+    elif text_content:
+        print("Processing text content input.")
+        article.text = text_content
+    else:
+        raise HTTPException(status_code=400, detail="No input provided. Please provide 'text_content' or upload a 'file_upload'.")
+
+    # --- Final Content Checks ---
+    if not article.text or not article.text.strip():
+        input_source = f"file '{article.filename}'" if article.filename else "text_content"
+        raise HTTPException(status_code=400, detail=f"Input {input_source} is effectively empty.")
+
+    if len(article.text) > settings.MAX_ANALYSIS_TEXT_LENGTH:
+         raise HTTPException(status_code=413, detail=f"Input text exceeds maximum length of {settings.MAX_ANALYSIS_TEXT_LENGTH} characters.")
+
+    return article
+
+
+def s3_content_type(content_type: Optional[str], file_ext: str) -> str:
+    """Content type to store in S3: the declared one if allowed, else guessed from the extension."""
+    if content_type in ALLOWED_CONTENT_TYPES:
+        return content_type
+    if file_ext == '.txt':
+        return 'text/plain'
+    if file_ext == '.docx':
+        return 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+    return 'application/octet-stream'
+
+
+def hash_file(file: BinaryIO, max_bytes: int) -> Tuple[int, str]:
+    """
+    Returns (size, sha256 hex digest) of a file, read in chunks from the start. Stops early
+    once it is larger than max_bytes (the size returned is then max_bytes + 1). Rewinds the file.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    file.seek(0)
+    while size <= max_bytes:
+        chunk = file.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        size += len(chunk)
+        digest.update(chunk)
+    file.seek(0)
+    return min(size, max_bytes + 1), digest.hexdigest()
+
 
 async def read_uploaded_file(file: UploadFile) -> str:
     """Reads content from UploadFile (txt or docx)."""
-    filename = file.filename
-    contents = await file.read()
+    await file.seek(0)
+    return await extract_text_async(file.filename, file.file)
+
+
+async def extract_text_async(filename: str, contents: Union[bytes, BinaryIO]) -> str:
+    """extract_text off the event loop. Large .docx files are parsed in the DOCX process pool."""
+    is_docx = filename.lower().endswith(".docx")
+    with metrics.stage_seconds.time("docx_parse" if is_docx else "txt_decode"):
+        if is_docx and docx_extractor.use_process_pool(_content_size(contents)):
+            if not isinstance(contents, (bytes, bytearray)):
+                # Worker processes need the bytes; the upload file can't be shared with them
+                contents = await asyncio.to_thread(contents.read)
+            try:
+                return await docx_extractor.extract_docx_text_in_process(contents)
+            except docx_extractor.DocxExtractionError as e:
+                raise _docx_error(filename, e)
+        # Small documents are parsed straight from the (spooled) file, without a bytes copy
+        return await asyncio.to_thread(extract_text, filename, contents)
+
+
+def extract_text(filename: str, contents: Union[bytes, BinaryIO]) -> str:
+    """Extracts article text from raw .txt or .docx bytes, or from a file positioned at its start."""
+    if not isinstance(contents, (bytes, bytearray)):
+        # File-like: .docx is parsed straight from the file (the zip reader seeks as needed)
+        if not filename.lower().endswith(".docx"):
+            contents = contents.read()
+        elif _is_empty_file(contents):
+            contents = b""
 
     if not contents:
         raise HTTPException(status_code=400, detail=f"Uploaded file '{filename}' appears to be empty.")
@@ -27,20 +169,95 @@ async def read_uploaded_file(file: UploadFile) -> str:
                 )
     elif filename.lower().endswith(".docx"):
         try:
-            doc_stream = io.BytesIO(contents)
-            doc = docx.Document(doc_stream)
-            full_text = [para.text for para in doc.paragraphs]
-            return '\n'.join(full_text)
-        except Exception as e:
-            # Catch potential errors from python-docx (e.g., bad zip file)
-            print(f"Error reading docx file '{filename}': {e}")
-            raise HTTPException(
-                status_code=400,
-                detail=f"Could not parse the .docx file '{filename}'. It might be corrupted or not a valid Word document. Error: {e}"
-            )
+            return docx_extractor.extract_docx_text(contents)
+        except docx_extractor.DocxExtractionError as e:
+            raise _docx_error(filename, e)
     else:
         # This case might be redundant if validated earlier, but good defensively
         raise HTTPException(
             status_code=400,
             detail=f"Invalid file type for '{filename}'. Only .txt and .docx are supported."
-        )
\ No newline at end of file
+        )
+
+
+def _docx_error(filename: str, e: docx_extractor.DocxExtractionError) -> HTTPException:
+    print(f"Error reading docx file '{filename}': {e}")
+    if isinstance(e, docx_extractor.DocxTooLargeError):
+        return HTTPException(status_code=413, detail=f"The .docx file '{filename}' expands to more than {settings.DOCX_MAX_DECOMPRESSED_BYTES} bytes of document content.")
+    return HTTPException(
+        status_code=400,
+        detail=f"Could not parse the .docx file '{filename}'. It might be corrupted or not a valid Word document. Error: {e}"
+    )
+
+
+def _content_size(contents: Union[bytes, BinaryIO]) -> int:
+    if isinstance(contents, (bytes, bytearray)):
+        return len(contents)
+    position = contents.tell()
+    size = contents.seek(0, os.SEEK_END)
+    contents.seek(position)
+    return size
+
+
+def _is_empty_file(file: BinaryIO) -> bool:
+    position = file.tell()
+    empty = not file.read(1)
+    file.seek(position)
+    return empty
+
+
+def read_zip_archive(
+    archive: BinaryIO,
+    archive_name: str,
+    max_items: int,
+    max_item_bytes: int,
+    max_total_bytes: int,
+) -> List[Tuple[str, Union[bytes, HTTPException]]]:
+    """
+    Expands a ZIP of .txt/.docx articles into (entry name, bytes) pairs.
+    Problems with a single entry (unsupported type, too large, unreadable) are returned in
+    place of its bytes so the rest of the batch can still be processed. Problems with the archive
+    as a whole (corrupt, too many entries, too much data) raise an HTTPException.
+    """
+    try:
+        zf = zipfile.ZipFile(archive)
+    except zipfile.BadZipFile as e:
+        raise HTTPException(status_code=400, detail=f"Could not open ZIP archive '{archive_name}': {e}")
+
+    entries: List[Tuple[str, Union[bytes, HTTPException]]] = []
+    total_bytes = 0
+    with zf:
+        for info in zf.infolist():
+            name = info.filename
+            base_name = os.path.basename(name)
+            # Skip directories and OS metadata (e.g. __MACOSX/, .DS_Store)
+            if info.is_dir() or not base_name or base_name.startswith(".") or name.startswith("__MACOSX/"):
+                continue
+            if len(entries) >= max_items:
+                raise HTTPException(status_code=413, detail=f"Archive '{archive_name}' contains more than {max_items} articles.")
+
+            if not base_name.lower().endswith(tuple(ALLOWED_EXTENSIONS)):
+                entries.append((name, HTTPException(status_code=400, detail=f"Invalid file type for '{name}'. Only .txt and .docx are supported.")))
+                continue
+            if info.file_size > max_item_bytes:
+                entries.append((name, HTTPException(status_code=413, detail=f"File '{name}' exceeds the per-item limit of {max_item_bytes} bytes.")))
+                continue
+
+            # Header sizes can lie, so never decompress more than the limit allows
+            try:
+                with zf.open(info) as entry:
+                    contents = entry.read(max_item_bytes + 1)
+            except Exception as e:
+                # Bad CRC, truncated or corrupt data, encrypted entries, unsupported compression
+                entries.append((name, HTTPException(status_code=400, detail=f"Could not read '{name}' from the archive: {e}")))
+                continue
+            if len(contents) > max_item_bytes:
+                entries.append((name, HTTPException(status_code=413, detail=f"File '{name}' exceeds the per-item limit of {max_item_bytes} bytes.")))
+                continue
+
+            total_bytes += len(contents)
+            if total_bytes > max_total_bytes:
+                raise HTTPException(status_code=413, detail=f"Archive '{archive_name}' expands to more than {max_total_bytes} bytes.")
+            entries.append((name, contents))
+
+    return entries
@@ -0,0 +1,158 @@
+# backend/core/gazetteer.py
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+# Bundled country / demonym / alias table
+GAZETTEER_PATH = os.path.join(os.path.dirname(__file__), "data", "nationalities.tsv")
+
+# Context kept around ambiguous matches, for the LLM to decide on
+SNIPPET_CHARS = 80
+MAX_SNIPPETS_PER_TERM = 3
+
+# Demonyms whose plural is not formed by appending "s" (French, Swiss, Japanese, Frenchmen...)
+_NO_PLURAL_SUFFIXES = ("s", "sh", "ch", "ese", "men", "ic", "y")
+
+
+@dataclass
+class GazetteerMatch:
+    """Result of scanning one text."""
+    nationalities: List[str] = field(default_factory=list) # canonical names, sorted
+    # Canonical name -> context snippets, for matches only an LLM can confirm (e.g. "Jordan", "Georgia")
+    ambiguous: Dict[str, List[str]] = field(default_factory=dict)
+
+
+@dataclass
+class _Term:
+    canonical: Optional[str] # None: a phrase that must never match (e.g. "Latin American")
+    countries: FrozenSet[str]
+    ambiguous: bool
+
+
+class Gazetteer:
+    """
+    Closed-vocabulary matcher for countries, demonyms and aliases.
+
+    All surface forms are compiled into one trie-shaped regex, so an article is scanned in
+    a single pass by the C regex engine, preferring the longest form at each position
+    ("Papua New Guinea" over "Guinea"). Matching is case-sensitive, which keeps out most
+    common-noun collisions (turkey, china, polish).
+
+    Ambiguous forms are reported as confident only when the same country is also
+    mentioned unambiguously ("Jordan" together with "Jordanian"); the rest are returned
+    with context for the caller to resolve.
+    """
+
+    def __init__(self, rows: Iterable[Tuple[str, List[str], List[str], List[str]]]):
+        self._terms: Dict[str, _Term] = {}
+        for country, demonyms, aliases, ambiguous in rows:
+            ambiguous_forms = set(ambiguous)
+            if country == "-":
+                for phrase in aliases:
+                    self._add(phrase, _Term(None, frozenset(), False))
+                    if not phrase.endswith(_NO_PLURAL_SUFFIXES):
+                        self._add(phrase + "s", _Term(None, frozenset(), False))
+                continue
+            for name in [country] + aliases:
+                self._add(name, _Term(country, frozenset([country]), name in ambiguous_forms))
+            if demonyms:
+                canonical_demonym = demonyms[0]
+                for demonym in demonyms:
+                    self._add(demonym, _Term(canonical_demonym, frozenset([country]), demonym in ambiguous_forms))
+                for demonym in demonyms:
+                    if not demonym.endswith(_NO_PLURAL_SUFFIXES) and demonym + "s" not in self._terms:
+                        self._add(demonym + "s", _Term(canonical_demonym, frozenset([country]), demonym in ambiguous_forms))
+
+        # No leading \b: a pattern that starts with the trie's literals lets the regex engine
+        # skip ahead to candidate first characters. The left boundary is checked in match().
+        self._pattern = re.compile(r"(?:" + _trie_regex(self._terms) + r")(?!\w)")
+
+    def _add(self, surface: str, term: _Term) -> None:
+        existing = self._terms.get(surface)
+        if existing is None:
+            self._terms[surface] = term
+            return
+        # Shared forms (e.g. "Congolese", "Dominican") confirm either country
+        self._terms[surface] = _Term(
+            existing.canonical,
+            existing.countries | term.countries,
+            existing.ambiguous or term.ambiguous,
+        )
+
+    @classmethod
+    def from_tsv(cls, path: str) -> "Gazetteer":
+        rows = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.rstrip("\n")
+                if not line.strip() or line.startswith("#") or line.startswith("country\t"):
+                    continue
+                columns = (line.split("\t") + ["", "", ""])[:4]
+                country, demonyms, aliases, ambiguous = (c.strip() for c in columns)
+                rows.append((country, _split(demonyms), _split(aliases), _split(ambiguous)))
+        return cls(rows)
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def match(self, text: str) -> GazetteerMatch:
+        """Scans the text once and returns the canonical names it mentions."""
+        confident = set()
+        confirmed_countries = set()
+        pending: Dict[str, Tuple[FrozenSet[str], List[str]]] = {}
+
+        for m in self._pattern.finditer(text):
+            start = m.start()
+            if start and (text[start - 1].isalnum() or text[start - 1] == "_"):
+                continue # Inside a longer word
+            term = self._terms[m.group()]
+            if term.canonical is None:
+                continue
+            if not term.ambiguous:
+                confident.add(term.canonical)
+                confirmed_countries |= term.countries
+                continue
+            countries, snippets = pending.setdefault(term.canonical, (term.countries, []))
+            if len(snippets) < MAX_SNIPPETS_PER_TERM:
+                snippets.append(" ".join(text[max(0, start - SNIPPET_CHARS):m.end() + SNIPPET_CHARS].split()))
+
+        result = GazetteerMatch()
+        for canonical, (countries, snippets) in pending.items():
+            if canonical in confident:
+                continue
+            if countries & confirmed_countries:
+                confident.add(canonical)
+            else:
+                result.ambiguous[canonical] = snippets
+        result.nationalities = sorted(confident)
+        return result
+
+
+def _split(value: str) -> List[str]:
+    return [item.strip() for item in value.split("|") if item.strip()]
+
+
+def _trie_regex(terms: Iterable[str]) -> str:
+    """Alternation of the terms factored into a trie, so shared prefixes are matched once."""
+    trie: dict = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[""] = {}
+    return _node_regex(trie)
+
+
+def _node_regex(node: dict) -> str:
+    branches = [re.escape(char) + _node_regex(child) for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ""
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    if "" in node:
+        # Greedy optional: try the longer term first, fall back to the one ending here
+        body = "(?:" + body + ")?"
+    return body
+
+
+nationality_gazetteer = Gazetteer.from_tsv(GAZETTEER_PATH)
@@ -0,0 +1,284 @@
+# backend/core/metrics.py
+import bisect
+import functools
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from backend.core import request_timing, token_counter
+
+# Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds: from local stages (file reads, parsing, DB commits) up to slow LLM calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+_registry: List["_Metric"] = []
+# Functions returning (name, type, help, [(labels, value)]) computed at scrape time
+_collectors: List[Callable[[], Iterable[Tuple[str, str, str, List[Tuple[dict, float]]]]]] = []
+
+
+class _Metric(ABC):
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        # Upload and docx threads record too; one uncontended lock per update is cheap
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    @abstractmethod
+    def _samples(self) -> Iterable[Tuple[str, Tuple[str, ...], float]]:
+        """(sample name, label values, value) of each exposed sample."""
+
+    def _labelnames_for(self, sample_name: str) -> Tuple[str, ...]:
+        return self.labelnames
+
+
+class Counter(_Metric):
+    """Monotonic count per label combination: counter.inc("RateLimitError")."""
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def _samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            yield self.name, labels, value
+
+
+class Gauge(_Metric):
+    """Current value per label combination; track() counts the work inside a `with` block."""
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def dec(self, *labelvalues: str, amount: float = 1.0) -> None:
+        self.inc(*labelvalues, amount=-amount)
+
+    def track(self, *labelvalues: str) -> "_GaugeTracker":
+        return _GaugeTracker(self, labelvalues)
+
+    def _samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            yield self.name, labels, value
+
+
+class _GaugeTracker:
+    __slots__ = ("gauge", "labelvalues")
+
+    def __init__(self, gauge: Gauge, labelvalues: Tuple[str, ...]):
+        self.gauge = gauge
+        self.labelvalues = labelvalues
+
+    def __enter__(self):
+        self.gauge.inc(*self.labelvalues)
+        return self
+
+    def __exit__(self, *exc):
+        self.gauge.dec(*self.labelvalues)
+        return False
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values (seconds) per label combination. Each observation is one
+    bisect and two additions; buckets are only made cumulative when scraped.
+
+    With `timing_prefix`, observations are also added to the current request's Server-Timing
+    header, named by the prefix and the first label value.
+    """
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS, timing_prefix: Optional[str] = None):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.timing_prefix = timing_prefix
+        # Label values -> per-bucket counts, the +Inf count, then the sum
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[bisect.bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+        if self.timing_prefix is not None:
+            request_timing.record(self.timing_prefix + labelvalues[0], value)
+
+    def time(self, *labelvalues: str) -> "_Timer":
+        """Observes the duration of a `with` block (also when it raises)."""
+        return _Timer(self, labelvalues)
+
+    def _samples(self):
+        with self._lock:
+            series = [(labels, list(values)) for labels, values in self._series.items()]
+        for labels, values in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                yield f"{self.name}_bucket", labels + (_format_value(bound),), cumulative
+            cumulative += values[len(self.buckets)]
+            yield f"{self.name}_bucket", labels + ("+Inf",), cumulative
+            yield f"{self.name}_count", labels, cumulative
+            yield f"{self.name}_sum", labels, values[-1]
+
+    def _labelnames_for(self, sample_name: str) -> Tuple[str, ...]:
+        return self.labelnames + ("le",) if sample_name.endswith("_bucket") else self.labelnames
+
+
+class _Timer:
+    __slots__ = ("histogram", "labelvalues", "start")
+
+    def __init__(self, histogram: Histogram, labelvalues: Tuple[str, ...]):
+        self.histogram = histogram
+        self.labelvalues = labelvalues
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labelvalues)
+        return False
+
+
+def register_collector(collector: Callable[[], Iterable[Tuple[str, str, str, List[Tuple[dict, float]]]]]) -> None:
+    """Adds metrics read from existing state when scraped, at no cost on the request path."""
+    _collectors.append(collector)
+
+
+# --- Exposition ---
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    return str(value) if isinstance(value, int) else repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def render() -> str:
+    """Every metric of this worker process in the Prometheus text format."""
+    lines = []
+    for metric in _registry:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        for sample_name, labelvalues, value in metric._samples():
+            lines.append(f"{sample_name}{_format_labels(metric._labelnames_for(sample_name), labelvalues)} {_format_value(value)}")
+    for collector in _collectors:
+        for name, metric_type, documentation, samples in collector():
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(list(labels), list(labels.values()))} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# --- Analysis Pipeline Metrics ---
+
+in_flight_requests = Gauge(
+    "analyze_requests_in_flight",
+    "Analysis requests being processed, by endpoint.",
+    ["endpoint"],
+)
+request_seconds = Histogram(
+    "analyze_request_duration_seconds",
+    "Time to handle an analysis request (a streamed request until its stream ends), by endpoint.",
+    ["endpoint"],
+)
+stage_seconds = Histogram(
+    "analyze_stage_duration_seconds",
+    "Time spent in each stage of an analysis: upload_read, txt_decode, docx_parse, analysis, s3_put, db_commit.",
+    ["stage"],
+    timing_prefix="",
+)
+openai_call_seconds = Histogram(
+    "openai_call_duration_seconds",
+    "Time of each successful OpenAI call, including rate-limit waits, retries and fallbacks, by call and model used.",
+    ["call", "model"],
+    timing_prefix="openai_",
+)
+openai_errors = Counter(
+    "openai_errors_total",
+    "OpenAI calls that failed (after retries and fallbacks), by call and error type.",
+    ["call", "error"],
+)
+openai_retries = Counter(
+    "openai_retries_total",
+    "Failed OpenAI attempts that were retried or fell back to another model, by error type.",
+    ["error"],
+)
+
+
+class _RequestTracker:
+    __slots__ = ("endpoint", "start")
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        in_flight_requests.inc(self.endpoint)
+        return self
+
+    def __exit__(self, *exc):
+        in_flight_requests.dec(self.endpoint)
+        request_seconds.observe(time.perf_counter() - self.start, self.endpoint)
+        return False
+
+
+def track_request(endpoint: str) -> _RequestTracker:
+    """Counts a request as in flight, and observes its duration, for the `with` block."""
+    return _RequestTracker(endpoint)
+
+
+def tracked(endpoint: str):
+    """Decorator form of track_request for async endpoint functions."""
+    def decorator(func):
+        @functools.wraps(func) # Keeps the signature FastAPI reads parameters from
+        async def wrapper(*args, **kwargs):
+            with _RequestTracker(endpoint):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _token_metrics():
+    models = token_counter.usage_stats()["models"]
+    yield (
+        "openai_prompt_tokens_total", "counter", "Prompt tokens used, as reported by the OpenAI API, by model.",
+        [({"model": model}, usage["prompt_tokens"]) for model, usage in models.items()],
+    )
+    yield (
+        "openai_completion_tokens_total", "counter", "Completion tokens used, as reported by the OpenAI API, by model.",
+        [({"model": model}, usage["completion_tokens"]) for model, usage in models.items()],
+    )
+
+
+register_collector(_token_metrics)
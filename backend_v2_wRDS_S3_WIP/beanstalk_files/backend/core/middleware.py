@@ -0,0 +1,157 @@
+# backend/core/middleware.py
+import random
+import time
+from typing import Dict, Optional, Sequence
+
+from fastapi import HTTPException
+from starlette.datastructures import MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from backend.core import profiler, request_timing
+
+
+class BodySizeLimitMiddleware:
+    """
+    Rejects request bodies larger than a limit with 413, while they are being received:
+    a too-large Content-Length is refused before reading anything, and chunked or
+    mislabeled bodies are cut off as soon as the running total passes the limit, so an
+    oversized upload is never fully read or spooled.
+
+    `path_limits` overrides the default for path prefixes (e.g. the batch endpoint).
+    """
+
+    def __init__(self, app: ASGIApp, max_bytes: int, path_limits: Optional[Dict[str, int]] = None):
+        self.app = app
+        self.max_bytes = max_bytes
+        # Longest prefix first
+        self.path_limits = sorted((path_limits or {}).items(), key=lambda item: len(item[0]), reverse=True)
+
+    def _limit_for(self, path: str) -> int:
+        for prefix, limit in self.path_limits:
+            if path.startswith(prefix):
+                return limit
+        return self.max_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limit = self._limit_for(scope["path"])
+        too_large = HTTPException(status_code=413, detail=f"Request body exceeds the maximum size of {limit} bytes.")
+
+        for name, value in scope.get("headers", []):
+            if name == b"content-length":
+                try:
+                    if int(value) > limit:
+                        await self._reject(scope, receive, send, too_large)
+                        return
+                except ValueError:
+                    pass
+                break
+
+        received = 0
+        response_started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Raised inside the form parser; FastAPI passes HTTPExceptions through unchanged
+                    raise too_large
+            return message
+
+        async def tracking_send(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except HTTPException as e:
+            # Body read outside the app's exception handlers (e.g. by another middleware)
+            if e is not too_large or response_started:
+                raise
+            await self._reject(scope, receive, send, e)
+
+    async def _reject(self, scope: Scope, receive: Receive, send: Send, exc: HTTPException) -> None:
+        print(f"Rejected request to {scope['path']}: {exc.detail}")
+        response = JSONResponse(status_code=exc.status_code, content={"detail": exc.detail}, headers={"Connection": "close"})
+        await response(scope, receive, send)
+
+
+class ServerTimingMiddleware:
+    """
+    Returns the stage timings of each request in a Server-Timing header, which browser
+    devtools show in the request's Timing tab: request_body (until the body was received),
+    the stages recorded by the metrics histograms (upload_read, docx_parse, analysis,
+    openai_<call>, db_commit, ...) and total (until the response headers were sent).
+    Streamed responses send their headers first, so they only carry the stages before that.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings, token = request_timing.start()
+        body_received = False
+
+        async def timed_receive() -> Message:
+            nonlocal body_received
+            message = await receive()
+            if not body_received and message["type"] == "http.request" and not message.get("more_body", False):
+                body_received = True
+                timings.add("request_body", time.perf_counter() - timings.start)
+            return message
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", timings.header_value())
+                # Lets cross-origin pages read the timings too (the API allows any origin)
+                headers.append("Timing-Allow-Origin", "*")
+            await send(message)
+
+        try:
+            await self.app(scope, timed_receive, send_with_timing)
+        finally:
+            request_timing.reset(token)
+
+
+class ProfilingMiddleware:
+    """
+    Profiles a random `sample_rate` fraction of the requests to `path_prefixes` with the
+    sampling wall-clock profiler (backend/core/profiler.py) and saves each profile to
+    PROFILE_DIR. Profiled responses carry an X-Profile-Id header naming the file.
+    Only added to the app when PROFILING_ENABLED is set.
+    """
+
+    def __init__(self, app: ASGIApp, sample_rate: float, path_prefixes: Sequence[str]):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.path_prefixes = tuple(path_prefixes)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefixes) or random.random() >= self.sample_rate:
+            await self.app(scope, receive, send)
+            return
+
+        profile, token = profiler.start_profile(f"{scope['method']} {scope['path']}")
+
+        async def send_with_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("X-Profile-Id", profile.id)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profiler.stop_profile(profile, token)
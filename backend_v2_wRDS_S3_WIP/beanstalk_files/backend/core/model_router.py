@@ -0,0 +1,144 @@
+# backend/core/model_router.py
+import hashlib
+import json
+import math
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional
+
+from backend.core.config import settings
+
+# Kinds of OpenAI call the analysis makes
+TASKS = ("summary", "extraction", "structured")
+
+# Latencies kept per route and model for the percentiles in stats()
+LATENCY_SAMPLES = 1000
+
+
+@dataclass(frozen=True)
+class Route:
+    name: str
+    task: str # One of TASKS, or "*" for any
+    model: str
+    fallback: Optional[str] = None # Used when the model times out or returns a 5xx
+    min_input_tokens: int = 0
+    max_input_tokens: Optional[int] = None
+    timeout: Optional[float] = None # Seconds; OPENAI_TIMEOUT if unset
+
+    def matches(self, task: str, input_tokens: int) -> bool:
+        return (self.task in ("*", task)
+                and input_tokens >= self.min_input_tokens
+                and (self.max_input_tokens is None or input_tokens <= self.max_input_tokens))
+
+
+class _RouteStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.fallbacks = 0 # Calls that failed over to this route's fallback model
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_SAMPLES)
+
+
+class ModelRouter:
+    """
+    Picks the model of each OpenAI call from an ordered table of routes: the first route
+    whose task and prompt-size range (in tokens) match wins. Calls no route matches use
+    OPENAI_MODEL (OPENAI_STRUCTURED_MODEL for structured calls) with OPENAI_FALLBACK_MODEL.
+
+    Latency, errors, fallbacks and tokens are tracked per route and model, so the table
+    can be tuned from GET /system/models.
+    """
+
+    def __init__(self, routes: List[Route]):
+        self.routes = routes
+        self._stats: Dict[str, _RouteStats] = {}
+
+    @classmethod
+    def from_file(cls, path: str) -> "ModelRouter":
+        """
+        Loads a JSON table: {"routes": [{"task": "extraction", "max_input_tokens": 1500,
+        "model": "gpt-4o-mini", "fallback": "gpt-3.5-turbo", "timeout": 20}, ...]}.
+        """
+        with open(path, encoding="utf-8") as f:
+            table = json.load(f)
+        routes = []
+        for i, entry in enumerate(table.get("routes", [])):
+            task = entry.get("task", "*")
+            if task != "*" and task not in TASKS:
+                raise ValueError(f"Route {i}: unknown task '{task}' (expected one of {', '.join(TASKS)} or *)")
+            routes.append(Route(
+                name=entry.get("name") or f"{task}-{i}",
+                task=task,
+                model=entry["model"],
+                fallback=entry.get("fallback"),
+                min_input_tokens=int(entry.get("min_input_tokens", 0)),
+                max_input_tokens=int(entry["max_input_tokens"]) if entry.get("max_input_tokens") is not None else None,
+                timeout=float(entry["timeout"]) if entry.get("timeout") is not None else None,
+            ))
+        return cls(routes)
+
+    def choose(self, task: str, input_tokens: int) -> Route:
+        for route in self.routes:
+            if route.matches(task, input_tokens):
+                return route
+        return Route(
+            name="default",
+            task=task,
+            model=settings.OPENAI_STRUCTURED_MODEL if task == "structured" else settings.OPENAI_MODEL,
+            fallback=settings.OPENAI_FALLBACK_MODEL,
+        )
+
+    def fingerprint(self) -> str:
+        """Changes whenever the table changes; part of the result cache key."""
+        return hashlib.sha256(repr(self.routes).encode("utf-8")).hexdigest()[:12]
+
+    # --- Stats ---
+
+    def _entry(self, route: Route, model: str) -> _RouteStats:
+        return self._stats.setdefault(f"{route.name}:{model}", _RouteStats())
+
+    def record_success(self, route: Route, model: str, seconds: float, prompt_tokens: int, completion_tokens: int) -> None:
+        entry = self._entry(route, model)
+        entry.calls += 1
+        entry.latencies.append(seconds)
+        entry.prompt_tokens += prompt_tokens
+        entry.completion_tokens += completion_tokens
+
+    def record_error(self, route: Route, model: str) -> None:
+        self._entry(route, model).errors += 1
+
+    def record_fallback(self, route: Route, model: str) -> None:
+        self._entry(route, model).fallbacks += 1
+
+    def stats(self) -> dict:
+        result = {}
+        for key, entry in self._stats.items():
+            latencies = sorted(entry.latencies)
+            result[key] = {
+                "calls": entry.calls,
+                "errors": entry.errors,
+                "fallbacks": entry.fallbacks,
+                "prompt_tokens": entry.prompt_tokens,
+                "completion_tokens": entry.completion_tokens,
+                "latency_p50_ms": _percentile_ms(latencies, 0.50),
+                "latency_p95_ms": _percentile_ms(latencies, 0.95),
+            }
+        return {"routes": [route.__dict__ for route in self.routes], "stats": result}
+
+
+def _percentile_ms(sorted_seconds: List[float], q: float) -> Optional[float]:
+    if not sorted_seconds:
+        return None
+    index = min(len(sorted_seconds) - 1, math.ceil(q * len(sorted_seconds)) - 1)
+    return round(sorted_seconds[index] * 1000, 1)
+
+
+model_router = ModelRouter([])
+if settings.MODEL_ROUTES_PATH:
+    try:
+        model_router = ModelRouter.from_file(settings.MODEL_ROUTES_PATH)
+        print(f"Loaded {len(model_router.routes)} model routes from {settings.MODEL_ROUTES_PATH}.")
+    except Exception as e:
+        print(f"CRITICAL: Could not load model routes from {settings.MODEL_ROUTES_PATH}: {e}. Using OPENAI_MODEL for every call.")
@@ -1,32 +1,203 @@
+import asyncio
+import functools
+import random
+import threading
+import time
+import httpx
 import openai
 from fastapi import HTTPException
-from typing import List, Dict
+from pydantic import ValidationError
+from typing import AsyncIterator, List, Dict, Optional
 from backend.core.config import settings
+from backend.core import metrics, token_counter
+from backend.core.model_router import Route, model_router
+from backend.core.rate_limiter import openai_limiter
+from backend.db import schemas
 
-# Initialize OpenAI client 
+# Bump whenever a prompt or the structured-output schema changes, so cached
+# results produced by the old prompts are no longer served.
+PROMPT_VERSION = "2025-05-v1"
+
+# Async OpenAI client, created on first use (get_client)
+# A single client (and its pooled HTTP transport) is shared by every request in this
+# worker, so concurrent calls reuse keep-alive connections instead of opening new ones.
+# It is not built at import: that takes ~100 ms (SSL context, HTTP transport).
 client = None
-if settings.OPENAI_API_KEY:
+_client_lock = threading.Lock()
+
+
+def get_client() -> Optional[openai.AsyncOpenAI]:
+    """The shared OpenAI client, created on first use. None without an API key or if creation failed."""
+    global client
+    if client is None and settings.OPENAI_API_KEY:
+        with _client_lock:
+            if client is None:
+                client = _create_client()
+    return client
+
+
+def _create_client() -> Optional[openai.AsyncOpenAI]:
     try:
-        client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
+        new_client = openai.AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            base_url=settings.OPENAI_BASE_URL,
+            timeout=settings.OPENAI_TIMEOUT,
+            # Retries are done by _create_completion so they go through the shared rate limiter
+            max_retries=0,
+            http_client=openai.DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=settings.OPENAI_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+                ),
+            ),
+        )
     except Exception as e:
         print(f"Error initializing OpenAI client: {e}")
-else:
-    print("OpenAI API Key not found, client not initialized.")
+        return None
+    if settings.OPENAI_BASE_URL:
+        print(f"OpenAI client using the API at {settings.OPENAI_BASE_URL}.")
+    return new_client
+
+
+async def close_client() -> None:
+    """Closes the shared OpenAI HTTP connection pool (called on app shutdown)."""
+    if client:
+        await client.close()
+
+
+SYSTEM_PROMPT = "You are a helpful assistant specialized in analyzing news articles."
+
+
+def count_prompt_tokens(prompt_text: str) -> int:
+    """Prompt tokens of a call; routing and rate limiting use the same count."""
+    return token_counter.count_chat_tokens(SYSTEM_PROMPT, prompt_text, settings.OPENAI_MODEL)
+
+
+def estimate_tokens(prompt_tokens: int, max_tokens: int) -> int:
+    """Tokens reserved from the rate limiter for a call: the prompt plus the expected completion."""
+    return prompt_tokens + min(max_tokens, settings.OPENAI_COMPLETION_TOKEN_ESTIMATE)
+
+
+# Errors after which a route's fallback model is tried instead of retrying the same model
+FALLBACK_ERRORS = (openai.APITimeoutError, openai.InternalServerError)
+
+
+async def _create_completion(estimated_tokens: int, fail_fast: bool = False, **kwargs):
+    """
+    client.chat.completions.create behind the shared rate limiter. Rate limits, 5xx and
+    connection errors are retried with jittered exponential backoff (or the server's
+    Retry-After); other errors, and the last failed attempt, are raised to the caller.
+    With `fail_fast`, timeouts and 5xx are raised at once (the caller has a fallback model).
+    """
+    attempt = 0
+    while True:
+        await openai_limiter.acquire(estimated_tokens)
+        try:
+            return await get_client().chat.completions.create(**kwargs)
+        except (openai.RateLimitError, openai.InternalServerError, openai.APIConnectionError) as e:
+            # The failed call used no tokens
+            openai_limiter.record_usage(estimated_tokens, 0)
+            if fail_fast and isinstance(e, FALLBACK_ERRORS):
+                raise
+            # insufficient_quota is a billing problem, waiting won't fix it
+            if attempt >= settings.OPENAI_MAX_RETRIES or getattr(e, "code", None) == "insufficient_quota":
+                raise
+            retry_after = _retry_after_seconds(e)
+            if retry_after is not None:
+                delay = min(settings.OPENAI_RETRY_MAX_DELAY, retry_after) + random.uniform(0, settings.OPENAI_RETRY_BASE_DELAY / 4)
+            else:
+                delay = min(settings.OPENAI_RETRY_MAX_DELAY, settings.OPENAI_RETRY_BASE_DELAY * 2 ** attempt) * random.uniform(0.5, 1.0)
+            if isinstance(e, openai.RateLimitError):
+                # Hold back every worker on this host, not just this call
+                openai_limiter.pause(delay)
+            attempt += 1
+            metrics.openai_retries.inc(type(e).__name__)
+            print(f"OpenAI call failed ({type(e).__name__}), retry {attempt}/{settings.OPENAI_MAX_RETRIES} in {delay:.1f}s.")
+            await asyncio.sleep(delay)
+
+
+async def _routed_completion(route: Route, estimated_tokens: int, **kwargs):
+    """
+    Calls the route's model, or its fallback model if that times out or returns a 5xx.
+    Returns (response, model used). Errors are counted per route and model.
+    """
+    try:
+        response = await _create_completion(
+            estimated_tokens,
+            fail_fast=route.fallback is not None,
+            model=route.model,
+            timeout=route.timeout if route.timeout is not None else openai.NOT_GIVEN,
+            **kwargs
+        )
+        return response, route.model
+    except FALLBACK_ERRORS as e:
+        model_router.record_error(route, route.model)
+        if not route.fallback:
+            raise
+        print(f"OpenAI model {route.model} failed ({type(e).__name__}), falling back to {route.fallback} (route '{route.name}').")
+        model_router.record_fallback(route, route.model)
+        metrics.openai_retries.inc(type(e).__name__)
+    except Exception:
+        model_router.record_error(route, route.model)
+        raise
+
+    try:
+        return await _create_completion(estimated_tokens, model=route.fallback, **kwargs), route.fallback
+    except Exception:
+        model_router.record_error(route, route.fallback)
+        raise
+
+
+def _retry_after_seconds(e: Exception) -> Optional[float]:
+    """Delay requested by the server via the retry-after-ms / retry-after headers, if any."""
+    response = getattr(e, "response", None)
+    if response is None:
+        return None
+    try:
+        if response.headers.get("retry-after-ms"):
+            return float(response.headers["retry-after-ms"]) / 1000.0
+        if response.headers.get("retry-after"):
+            return float(response.headers["retry-after"])
+    except ValueError:
+        pass # HTTP-date form or garbage: fall back to exponential backoff
+    return None
 
 
-def get_openai_completion(prompt_text: str, model: str = settings.OPENAI_MODEL) -> str:
-    """Calls the OpenAI Chat Completion API."""
-    if not client:
+async def get_openai_completion(prompt_text: str, max_tokens: int, task: str = "summary", response_format: Optional[dict] = None, call: Optional[str] = None) -> str:
+    """
+    Calls the OpenAI Chat Completion API, with the completion limited to `max_tokens`. The
+    model is chosen by the model router from `task` ('summary', 'extraction' or 'structured')
+    and the prompt size. Pass `response_format` to request structured (JSON) output.
+    `call` names the prompt in metrics (default: `task`).
+    """
+    call = call or task
+    if not get_client():
          raise HTTPException(status_code=500, detail="OpenAI client is not configured or initialized on the server.")
 
+    prompt_tokens = count_prompt_tokens(prompt_text)
+    route = model_router.choose(task, prompt_tokens)
+    estimated_tokens = estimate_tokens(prompt_tokens, max_tokens)
+    start = time.perf_counter()
     try:
-        response = client.chat.completions.create(
-            model=model,
+        response, model = await _routed_completion(
+            route,
+            estimated_tokens,
             messages=[
-                {"role": "system", "content": "You are a helpful assistant specialized in analyzing news articles."},
+                {"role": "system", "content": SYSTEM_PROMPT},
                 {"role": "user", "content": prompt_text}
-            ]
+            ],
+            max_tokens=max_tokens,
+            response_format=response_format if response_format else openai.NOT_GIVEN
         )
+        elapsed = time.perf_counter() - start
+        metrics.openai_call_seconds.observe(elapsed, call, model)
+        if response.usage:
+            print(f"OpenAI usage ({model}): prompt_tokens={response.usage.prompt_tokens}, completion_tokens={response.usage.completion_tokens}")
+            openai_limiter.record_usage(estimated_tokens, response.usage.total_tokens)
+            token_counter.record_usage(model, response.usage.prompt_tokens, response.usage.completion_tokens)
+            model_router.record_success(route, model, elapsed, response.usage.prompt_tokens, response.usage.completion_tokens)
+        else:
+            model_router.record_success(route, model, elapsed, 0, 0)
         if response.choices and len(response.choices) > 0:
             message = response.choices[0].message
             if message and message.content:
@@ -41,29 +212,83 @@ def get_openai_completion(prompt_text: str, model: str = settings.OPENAI_MODEL)
         finish_reason = response.choices[0].finish_reason if response.choices else "unknown"
         return f"Error: Could not extract valid content from OpenAI. Finish reason: {finish_reason}"
 
-    except openai.APIError as e:
-         print(f"OpenAI API returned an API Error: {e}")
-         raise HTTPException(status_code=e.status_code or 500, detail=f"OpenAI API Error: {e.body.get('message', str(e)) if e.body else str(e)}")
-    except openai.APIConnectionError as e:
-        print(f"Failed to connect to OpenAI API: {e}")
-        raise HTTPException(status_code=503, detail=f"OpenAI Connection Error: Failed to connect.")
-    except openai.RateLimitError as e:
+    except Exception as e:
+        metrics.openai_errors.inc(call, type(e).__name__)
+        raise _to_http_exception(e)
+
+
+async def stream_openai_completion(prompt_text: str, max_tokens: int, task: str = "summary", call: Optional[str] = None) -> AsyncIterator[str]:
+    """Calls the OpenAI Chat Completion API with streaming and yields content deltas as they arrive."""
+    call = call or task
+    if not get_client():
+         raise HTTPException(status_code=500, detail="OpenAI client is not configured or initialized on the server.")
+
+    prompt_tokens = count_prompt_tokens(prompt_text)
+    route = model_router.choose(task, prompt_tokens)
+    estimated_tokens = estimate_tokens(prompt_tokens, max_tokens)
+    start = time.perf_counter()
+    usage = None
+    try:
+        # Only opening the stream is retried (or falls back); once deltas were yielded a retry would duplicate them
+        stream, model = await _routed_completion(
+            route,
+            estimated_tokens,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt_text}
+            ],
+            max_tokens=max_tokens,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        async for chunk in stream:
+            if chunk.usage:
+                usage = chunk.usage
+                print(f"OpenAI usage ({model}, streamed): prompt_tokens={chunk.usage.prompt_tokens}, completion_tokens={chunk.usage.completion_tokens}")
+                openai_limiter.record_usage(estimated_tokens, chunk.usage.total_tokens)
+                token_counter.record_usage(model, chunk.usage.prompt_tokens, chunk.usage.completion_tokens)
+            if chunk.choices and chunk.choices[0].delta and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+        elapsed = time.perf_counter() - start
+        metrics.openai_call_seconds.observe(elapsed, call, model)
+        model_router.record_success(route, model, elapsed, usage.prompt_tokens if usage else 0, usage.completion_tokens if usage else 0)
+    except Exception as e:
+        metrics.openai_errors.inc(call, type(e).__name__)
+        raise _to_http_exception(e)
+
+
+def _to_http_exception(e: Exception) -> HTTPException:
+    """Maps OpenAI client errors to the HTTPException returned to our callers."""
+    if isinstance(e, HTTPException):
+        return e
+    # Subclasses first: RateLimitError, AuthenticationError and APIConnectionError are all APIErrors
+    if isinstance(e, openai.RateLimitError):
         print(f"OpenAI API request exceeded rate limit: {e}")
-        raise HTTPException(status_code=429, detail=f"OpenAI Rate Limit Exceeded: {e.body.get('message', 'Please try again later.') if e.body else 'Please try again later.'}")
-    except openai.AuthenticationError as e:
+        return HTTPException(status_code=429, detail=f"OpenAI Rate Limit Exceeded: {e.body.get('message', 'Please try again later.') if isinstance(e.body, dict) else 'Please try again later.'}")
+    if isinstance(e, openai.AuthenticationError):
         print(f"OpenAI Authentication Error: {e}")
         # Sensitive details not revealed in error message!
-        raise HTTPException(status_code=401, detail="OpenAI Authentication Error: Invalid API Key or credentials.")
-    except Exception as e:
-        print(f"An unexpected error occurred during OpenAI call: {e}")
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"An unexpected server error occurred during OpenAI call.")
+        return HTTPException(status_code=401, detail="OpenAI Authentication Error: Invalid API Key or credentials.")
+    if isinstance(e, openai.APIConnectionError):
+        print(f"Failed to connect to OpenAI API: {e}")
+        return HTTPException(status_code=503, detail=f"OpenAI Connection Error: Failed to connect.")
+    if isinstance(e, openai.APIError):
+         print(f"OpenAI API returned an API Error: {e}")
+         return HTTPException(status_code=getattr(e, "status_code", None) or 500, detail=f"OpenAI API Error: {e.body.get('message', str(e)) if isinstance(e.body, dict) else str(e)}")
+    print(f"An unexpected error occurred during OpenAI call: {e}")
+    import traceback
+    traceback.print_exc()
+    return HTTPException(status_code=500, detail=f"An unexpected server error occurred during OpenAI call.")
 
 
-def summarize_text(text: str) -> str:
-    """Generates a summary using OpenAI."""
-    prompt = f"""
+# Returned in place of a summary when the completion had no usable content. The analysis
+# service treats it as a failed call, so it is never cached.
+SUMMARY_UNAVAILABLE = "Could not generate summary due to an issue."
+
+
+def build_summary_prompt(text: str) -> str:
+    """Prompt shared by summarize_text and the streaming summary."""
+    return f"""
     Please summarize the following news article in 2-4 concise sentences. Focus on the main events and key entities involved.
 
     Article:
@@ -73,16 +298,56 @@ def summarize_text(text: str) -> str:
 
     Concise Summary:
     """
-    summary = get_openai_completion(prompt)
+
+
+async def summarize_text(text: str) -> str:
+    """Generates a summary using OpenAI."""
+    summary = await get_openai_completion(build_summary_prompt(text), settings.OPENAI_MAX_TOKENS_SUMMARY, call="summary")
     # Basic check if the result looks like an error message itself
     if summary.startswith("Error:") or summary.startswith("OpenAI returned"):
          print(f"Warning: Summary generation might have failed. Result: {summary}")
-         return "Could not generate summary due to an issue."
+         return SUMMARY_UNAVAILABLE
     return summary
 
-def extract_nationalities(text: str) -> List[str]:
-    """Extracts nationalities/countries using OpenAI."""
-    prompt = f"""
+def build_combine_prompt(summaries: List[str]) -> str:
+    sections = "\n".join(f"{i}. {summary}" for i, summary in enumerate(summaries, start=1))
+    return f"""
+    The following are summaries of consecutive sections of one long news article, in order.
+    Combine them into a single summary of the whole article in 2-4 concise sentences. Focus on the main events and key entities involved.
+
+    Section summaries:
+    \"\"\"
+    {sections}
+    \"\"\"
+
+    Concise Summary:
+    """
+
+
+async def combine_summaries(summaries: List[str]) -> str:
+    """Condenses the summaries of consecutive sections of one long article into a single summary."""
+    if len(summaries) == 1:
+        return summaries[0]
+    summary = await get_openai_completion(build_combine_prompt(summaries), settings.OPENAI_MAX_TOKENS_SUMMARY, call="summary_combine")
+    if summary.startswith("Error:") or summary.startswith("OpenAI returned"):
+         print(f"Warning: Summary reduction might have failed. Result: {summary}")
+         return SUMMARY_UNAVAILABLE
+    return summary
+
+async def stream_summary(text: str) -> AsyncIterator[str]:
+    """Streams the summary tokens for the same prompt as summarize_text."""
+    async for delta in stream_openai_completion(build_summary_prompt(text), settings.OPENAI_MAX_TOKENS_SUMMARY, call="summary"):
+        yield delta
+
+def _require_content(result: str, what: str) -> None:
+    """Raises 502 when a completion has no usable content, rather than reading it as "none found"."""
+    if not result or result.startswith("Error:"):
+        print(f"Warning: OpenAI returned no usable {what} response: {result}")
+        raise HTTPException(status_code=502, detail=f"OpenAI returned no usable {what} response.")
+
+
+def build_nationalities_prompt(text: str) -> str:
+    return f"""
     Analyze the following news article. List all explicitly mentioned nationalities (e.g., French, Canadian), countries (e.g., Germany, Japan), or demonyms referring to peoples of specific nations (e.g., the British, Americans).
     Provide the output ONLY as a comma-separated list.
     If no relevant terms are found, respond ONLY with the word "None". Do not add explanations.
@@ -94,7 +359,17 @@ def extract_nationalities(text: str) -> List[str]:
 
     Nationalities/Countries mentioned (comma-separated list or None):
     """
-    result = get_openai_completion(prompt)
+
+
+async def extract_nationalities(text: str) -> List[str]:
+    """Extracts nationalities/countries using OpenAI."""
+    result = await get_openai_completion(build_nationalities_prompt(text), settings.OPENAI_MAX_TOKENS_EXTRACTION, task="extraction", call="nationalities")
+    _require_content(result, "nationalities")
+    return parse_nationalities(result)
+
+
+def parse_nationalities(result: str) -> List[str]:
+    """Parses the comma-separated (or "None") nationalities completion into a unique, sorted list."""
     if result and isinstance(result, str) and not result.startswith("Error:"):
         result_lower = result.strip().lower()
         if result_lower == "none" or not result.strip():
@@ -105,9 +380,37 @@ def extract_nationalities(text: str) -> List[str]:
         print(f"Warning/Error extracting nationalities: {result}")
         return []
 
-def extract_entities(text: str) -> Dict[str, List[str]]:
-    """Extracts Organizations and People using OpenAI."""
-    prompt = f"""
+def build_confirm_prompt(candidates: Dict[str, List[str]]) -> str:
+    excerpts = "\n".join(
+        f"- {name}: " + " | ".join(f'"...{snippet}..."' for snippet in snippets)
+        for name, snippets in candidates.items()
+    )
+    return f"""
+    Each line below gives a term found in a news article, followed by the excerpts it appeared in.
+    For each term, decide whether it refers to a country, a nationality, or the people of a nation (rather than, e.g., a person's name, a US state, a language or a region).
+    Provide the output ONLY as a comma-separated list of the terms that do, spelled exactly as given.
+    If none do, respond ONLY with the word "None". Do not add explanations.
+
+    Terms:
+    {excerpts}
+
+    Terms referring to countries/nationalities (comma-separated list or None):
+    """
+
+
+async def confirm_nationalities(candidates: Dict[str, List[str]]) -> List[str]:
+    """
+    Asks which ambiguous gazetteer matches (e.g. "Jordan", "Georgia") refer to a country or
+    nationality, given the snippets they appeared in. Returns the confirmed names.
+    """
+    result = await get_openai_completion(build_confirm_prompt(candidates), settings.OPENAI_MAX_TOKENS_EXTRACTION, task="extraction", call="nationality_confirmation")
+    if not result or result.startswith("Error:") or result.strip().lower() == "none":
+        return []
+    # Only accept names we asked about
+    return sorted(item.strip() for item in result.split(',') if item.strip() in candidates)
+
+def build_entities_prompt(text: str) -> str:
+    return f"""
     Analyze the news article below. Identify and extract:
     1.  Organizations: Companies, political parties, NGOs, government bodies, agencies (e.g., UN, NATO, FBI), specific military units if named.
     2.  People: Distinct individuals mentioned by full name or clearly identifiable name (e.g., President Biden, Ms. Ardern). Avoid generic titles without names.
@@ -123,7 +426,17 @@ def extract_entities(text: str) -> Dict[str, List[str]]:
     Organizations: [Comma-separated list of organizations or None]
     People: [Comma-separated list of people or None]
     """
-    result = get_openai_completion(prompt)
+
+
+async def extract_entities(text: str) -> Dict[str, List[str]]:
+    """Extracts Organizations and People using OpenAI."""
+    result = await get_openai_completion(build_entities_prompt(text), settings.OPENAI_MAX_TOKENS_EXTRACTION, task="extraction", call="entities")
+    _require_content(result, "entities")
+    return parse_entities(result)
+
+
+def parse_entities(result: str) -> Dict[str, List[str]]:
+    """Parses the "Organizations: ..." / "People: ..." lines of the entities completion."""
     entities = {"organizations": [], "people": []}
 
     if result and isinstance(result, str) and not result.startswith("Error:"):
@@ -149,4 +462,106 @@ def extract_entities(text: str) -> Dict[str, List[str]]:
     else:
         print(f"Warning/Error extracting entities: {result}")
 
-    return entities
\ No newline at end of file
+    return entities
+
+# JSON schema for the single-call analysis mode. Field names match schemas.AnalysisResponse.
+ANALYSIS_JSON_SCHEMA = {
+    "name": "article_analysis",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "summary": {"type": "string", "description": "2-4 concise sentences summarizing the article."},
+            "nationalities": {"type": "array", "items": {"type": "string"}},
+            "organizations": {"type": "array", "items": {"type": "string"}},
+            "people": {"type": "array", "items": {"type": "string"}},
+        },
+        "required": ["summary", "nationalities", "organizations", "people"],
+        "additionalProperties": False,
+    },
+}
+
+def build_structured_prompt(text: str) -> str:
+    return f"""
+    Analyze the following news article and return:
+    - summary: a 2-4 sentence concise summary focusing on the main events and key entities involved.
+    - nationalities: all explicitly mentioned nationalities (e.g., French, Canadian), countries (e.g., Germany, Japan), or demonyms referring to peoples of specific nations (e.g., the British, Americans).
+    - organizations: companies, political parties, NGOs, government bodies, agencies (e.g., UN, NATO, FBI), specific military units if named.
+    - people: distinct individuals mentioned by full name or clearly identifiable name (e.g., President Biden, Ms. Ardern). Avoid generic titles without names.
+    Use an empty list when nothing is found for a category.
+
+    Article:
+    \"\"\"
+    {text}
+    \"\"\"
+    """
+
+
+async def analyze_text_structured(text: str) -> schemas.AnalysisResponse:
+    """Generates the summary and all entity lists in one JSON-schema-constrained OpenAI call."""
+    result = await get_openai_completion(
+        build_structured_prompt(text),
+        settings.OPENAI_MAX_TOKENS_STRUCTURED,
+        task="structured",
+        call="structured",
+        response_format={"type": "json_schema", "json_schema": ANALYSIS_JSON_SCHEMA}
+    )
+    try:
+        analysis = schemas.AnalysisResponse.model_validate_json(result)
+    except ValidationError as e:
+        print(f"Warning: Could not parse structured analysis response: {e}. Response: {result[:200]}")
+        raise HTTPException(status_code=502, detail="OpenAI returned a malformed structured analysis response.")
+
+    # Same normalization as the multi-call path: unique, sorted, no blanks
+    for field in ("nationalities", "organizations", "people"):
+        values = getattr(analysis, field)
+        setattr(analysis, field, sorted(set(item.strip() for item in values if item and item.strip())))
+    return analysis
+
+
+# --- Token Estimates ---
+
+def _article_prompt(task: str):
+    """(prompt builder taking the article text, max_tokens, router task) of a per-article call."""
+    return {
+        "summary": (build_summary_prompt, settings.OPENAI_MAX_TOKENS_SUMMARY, "summary"),
+        "nationalities": (build_nationalities_prompt, settings.OPENAI_MAX_TOKENS_EXTRACTION, "extraction"),
+        "entities": (build_entities_prompt, settings.OPENAI_MAX_TOKENS_EXTRACTION, "extraction"),
+        "structured": (build_structured_prompt, settings.OPENAI_MAX_TOKENS_STRUCTURED, "structured"),
+    }[task]
+
+
+@functools.lru_cache(maxsize=None)
+def _prompt_overhead_tokens(task: str, tokenizer: str) -> int:
+    """
+    Prompt tokens of a call apart from the article itself (instructions, system prompt, chat
+    format). Keyed by tokenizer too, so estimates made before tiktoken loaded are replaced.
+    """
+    return count_prompt_tokens(_article_prompt(task)[0](""))
+
+
+def estimate_article_call(task: str, text_tokens: int) -> schemas.TokenEstimateCall:
+    """
+    Planned call of `task` ('summary', 'nationalities', 'entities' or 'structured') on an
+    article of `text_tokens` tokens. The article is counted once by the caller rather than
+    once per prompt it appears in.
+    """
+    _, max_tokens, router_task = _article_prompt(task)
+    prompt_tokens = _prompt_overhead_tokens(task, token_counter.tokenizer_name(settings.OPENAI_MODEL)) + text_tokens
+    return schemas.TokenEstimateCall(
+        task=task,
+        model=model_router.choose(router_task, prompt_tokens).model,
+        prompt_tokens=prompt_tokens,
+        max_completion_tokens=max_tokens,
+    )
+
+
+def estimate_call(task: str, prompt_text: str, max_tokens: int, router_task: str) -> schemas.TokenEstimateCall:
+    """Planned call for a prompt that is already built."""
+    prompt_tokens = count_prompt_tokens(prompt_text)
+    return schemas.TokenEstimateCall(
+        task=task,
+        model=model_router.choose(router_task, prompt_tokens).model,
+        prompt_tokens=prompt_tokens,
+        max_completion_tokens=max_tokens,
+    )
@@ -0,0 +1,147 @@
+# backend/core/profiler.py
+import asyncio
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime
+from typing import List, Optional, Set, Tuple
+
+from backend.core.config import settings
+
+# Profile of the request the current task belongs to; tasks it starts inherit it
+_active: ContextVar[Optional["RequestProfile"]] = ContextVar("request_profile", default=None)
+
+
+class RequestProfile:
+    """
+    Wall-clock stack samples of one request. Every PROFILE_INTERVAL_MS a sampler thread
+    records the stack of each task of the request (its own task and the tasks it started,
+    e.g. the concurrent OpenAI calls): the live stack of the event loop thread for the task
+    that is running, or the chain of awaits ending in '<await ...>' for a task that is
+    waiting. A stack seen in N samples took about N * PROFILE_INTERVAL_MS of that task's time.
+
+    Saved in the "folded" format read by flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, name: str, task: asyncio.Task):
+        self.id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.started_at = datetime.now()
+        self.start = time.perf_counter()
+        self.duration = 0.0
+        self.tasks: Set[asyncio.Task] = {task}
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._loop_thread_id = threading.get_ident()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"profiler-{self.id}", daemon=True)
+
+    def _run(self) -> None:
+        interval = settings.PROFILE_INTERVAL_MS / 1000
+        while not self._stopped.wait(interval):
+            self._sample()
+        if self.duration * 1000 >= settings.PROFILE_MIN_DURATION_MS:
+            self._save()
+
+    def _sample(self) -> None:
+        loop_frame = sys._current_frames().get(self._loop_thread_id)
+        for task in list(self.tasks):
+            if task.done():
+                self.tasks.discard(task)
+                continue
+            stack = _task_stack(task, loop_frame)
+            if stack:
+                self.stacks[";".join(stack)] += 1
+        self.samples += 1
+
+    def _save(self) -> None:
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", self.name).strip("_")
+        path = os.path.join(settings.PROFILE_DIR, f"{self.started_at:%Y%m%d-%H%M%S}-{slug}-{self.id}.folded")
+        try:
+            os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                for stack, count in self.stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            print(f"Saved profile of {self.name} ({self.duration * 1000:.0f} ms, {self.samples} samples) to {path}")
+        except OSError as e:
+            print(f"Error saving profile of {self.name} to '{path}': {e}")
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    # ';' separates frames in the folded format
+    name = getattr(code, "co_qualname", code.co_name).replace(";", ":")
+    return f"{name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def _task_stack(task: asyncio.Task, loop_frame) -> List[str]:
+    """Frames of a task, outermost first."""
+    coro = task.get_coro()
+    root = getattr(coro, "cr_frame", None)
+    if root is None:
+        return []
+    if coro.cr_running and loop_frame is not None:
+        # Running: the event loop thread's stack from the task's coroutine down
+        frames = []
+        frame = loop_frame
+        while frame is not None and frame is not root:
+            frames.append(frame)
+            frame = frame.f_back
+        if frame is root:
+            frames.append(root)
+            return [_frame_label(f) for f in reversed(frames)]
+
+    # Waiting: follow the chain of awaited coroutines and generators
+    labels = []
+    awaited = coro
+    while awaited is not None:
+        frame = getattr(awaited, "cr_frame", None) or getattr(awaited, "gi_frame", None) or getattr(awaited, "ag_frame", None)
+        if frame is None:
+            break
+        labels.append(_frame_label(frame))
+        awaited = getattr(awaited, "cr_await", None) or getattr(awaited, "gi_yieldfrom", None) or getattr(awaited, "ag_await", None)
+    if awaited is not None:
+        labels.append(f"<await {type(awaited).__name__}>")
+    return labels
+
+
+def _ensure_task_factory(loop: asyncio.AbstractEventLoop) -> None:
+    """
+    Registers tasks created while a request is profiled with its profile. Installed on the
+    first profiled request, so with profiling off task creation is untouched.
+    """
+    previous = loop.get_task_factory()
+    if getattr(previous, "_request_profiler", False):
+        return
+
+    def factory(loop, coro, **kwargs):
+        task = previous(loop, coro, **kwargs) if previous else asyncio.Task(coro, loop=loop, **kwargs)
+        context = kwargs.get("context")
+        profile = context.get(_active) if context is not None else _active.get()
+        if profile is not None:
+            profile.tasks.add(task)
+        return task
+
+    factory._request_profiler = True
+    loop.set_task_factory(factory)
+
+
+def start_profile(name: str) -> Tuple[RequestProfile, object]:
+    """Starts sampling the current task and the tasks it creates. Returns (profile, token for stop_profile())."""
+    _ensure_task_factory(asyncio.get_running_loop())
+    profile = RequestProfile(name, asyncio.current_task())
+    token = _active.set(profile)
+    profile._thread.start()
+    return profile, token
+
+
+def stop_profile(profile: RequestProfile, token) -> None:
+    """Stops sampling; the sampler thread saves the profile (if the request was slow enough)."""
+    _active.reset(token)
+    profile.duration = time.perf_counter() - profile.start
+    profile._stopped.set()
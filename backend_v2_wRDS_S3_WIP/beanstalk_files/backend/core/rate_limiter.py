@@ -0,0 +1,182 @@
+# backend/core/rate_limiter.py
+import asyncio
+import os
+import random
+import struct
+import threading
+import time
+from typing import Optional
+
+from fastapi import HTTPException
+
+from backend.core.config import settings
+
+try:
+    import fcntl # POSIX only; without it the budget is tracked per process
+except ImportError:
+    fcntl = None
+
+# Shared state: request tokens, model tokens, last refill (epoch seconds), paused-until (epoch seconds)
+_STATE = struct.Struct("<dddd")
+
+
+class TokenBucketLimiter:
+    """
+    Client-side requests-per-minute and tokens-per-minute budget for the OpenAI API.
+
+    Both buckets refill continuously. Callers reserve one request and an estimate of
+    the tokens a call will use before sending it, then settle the estimate against the
+    reported usage. When the budget is exhausted, callers wait instead of failing.
+
+    The state lives in a small file guarded by flock, so every Uvicorn worker on the
+    host draws from the same budget. A 429 from OpenAI pauses the bucket, which makes
+    every worker back off, not just the one that got the error.
+    """
+
+    def __init__(self, rpm: int, tpm: int, state_path: str, max_wait_seconds: float):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.state_path = state_path
+        self.max_wait_seconds = max_wait_seconds
+        self._fd: Optional[int] = None
+        self._fd_pid: Optional[int] = None
+        self._local_lock = threading.Lock()
+        self._local_state = None
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.pauses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.rpm > 0 or self.tpm > 0
+
+    # --- Shared State ---
+
+    def _open(self) -> int:
+        # Re-open after a fork so each worker process holds its own lock
+        if self._fd is None or self._fd_pid != os.getpid():
+            self._fd = os.open(self.state_path, os.O_RDWR | os.O_CREAT, 0o600)
+            self._fd_pid = os.getpid()
+        return self._fd
+
+    def _update(self, fn):
+        """Runs fn(state, now) on the refilled state under the cross-process lock and stores the result."""
+        if fcntl is None:
+            with self._local_lock:
+                state = self._refill(self._local_state, time.time())
+                result = fn(state, time.time())
+                self._local_state = state
+                return result
+
+        fd = self._open()
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            raw = os.pread(fd, _STATE.size, 0)
+            now = time.time()
+            state = self._refill(list(_STATE.unpack(raw)) if len(raw) == _STATE.size else None, now)
+            result = fn(state, now)
+            os.pwrite(fd, _STATE.pack(*state), 0)
+            return result
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def _refill(self, state, now: float) -> list:
+        if state is None:
+            # First use on this host: start with a full minute of budget
+            return [float(self.rpm), float(self.tpm), now, 0.0]
+        requests, tokens, updated_at, paused_until = state
+        elapsed = max(0.0, now - updated_at)
+        requests = min(float(self.rpm), requests + elapsed * self.rpm / 60.0)
+        tokens = min(float(self.tpm), tokens + elapsed * self.tpm / 60.0)
+        return [requests, tokens, now, paused_until]
+
+    # --- Budget Operations ---
+
+    def _try_reserve(self, tokens: int) -> float:
+        """Takes one request and `tokens` from the buckets, or returns how long to wait before retrying."""
+        def reserve(state, now):
+            requests, available_tokens, _, paused_until = state
+            if paused_until > now:
+                return paused_until - now
+            # A single call larger than the whole per-minute budget waits for a full bucket
+            needed_tokens = min(tokens, self.tpm)
+            wait = 0.0
+            if self.rpm > 0 and requests < 1:
+                wait = max(wait, (1 - requests) * 60.0 / self.rpm)
+            if self.tpm > 0 and available_tokens < needed_tokens:
+                wait = max(wait, (needed_tokens - available_tokens) * 60.0 / self.tpm)
+            if wait > 0:
+                return wait
+            if self.rpm > 0:
+                state[0] -= 1
+            if self.tpm > 0:
+                state[1] -= tokens
+            return 0.0
+        return self._update(reserve)
+
+    async def acquire(self, estimated_tokens: int) -> None:
+        """Waits until the call fits the shared budget. Raises 429 after max_wait_seconds."""
+        if not self.enabled:
+            return
+        deadline = time.monotonic() + self.max_wait_seconds
+        started = time.monotonic()
+        while True:
+            wait = self._try_reserve(estimated_tokens)
+            if wait <= 0:
+                if time.monotonic() - started > 0.001:
+                    self.waits += 1
+                    self.wait_seconds += time.monotonic() - started
+                return
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise HTTPException(status_code=429, detail="OpenAI Rate Limit Exceeded: request budget exhausted, please try again later.")
+            # Jitter so waiting callers (and workers) don't all wake up at the same instant
+            await asyncio.sleep(min(remaining, wait * random.uniform(1.0, 1.2)))
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """Settles a reservation: refunds an overestimate or charges an underestimate."""
+        if not self.enabled or self.tpm <= 0 or estimated_tokens == actual_tokens:
+            return
+        def settle(state, now):
+            state[1] = min(float(self.tpm), state[1] + estimated_tokens - actual_tokens)
+        self._update(settle)
+
+    def pause(self, seconds: float) -> None:
+        """Stops all workers from sending requests for `seconds` (after a 429 from OpenAI)."""
+        if not self.enabled or seconds <= 0:
+            return
+        self.pauses += 1
+        def extend(state, now):
+            state[3] = max(state[3], now + seconds)
+        self._update(extend)
+
+    def stats(self) -> dict:
+        shared = {}
+        if self.enabled:
+            def snapshot(state, now):
+                return {
+                    "available_requests": round(state[0], 2),
+                    "available_tokens": round(state[1]),
+                    "paused_for_seconds": round(max(0.0, state[3] - now), 2),
+                }
+            shared = self._update(snapshot)
+        return {
+            "enabled": self.enabled,
+            "shared_across_workers": fcntl is not None,
+            "rpm_limit": self.rpm,
+            "tpm_limit": self.tpm,
+            **shared,
+            "waits": self.waits,
+            "wait_seconds": round(self.wait_seconds, 3),
+            "pauses": self.pauses,
+        }
+
+
+openai_limiter = TokenBucketLimiter(
+    rpm=settings.OPENAI_RPM_LIMIT,
+    tpm=settings.OPENAI_TPM_LIMIT,
+    state_path=settings.OPENAI_RATE_LIMIT_STATE_PATH,
+    max_wait_seconds=settings.OPENAI_RATE_LIMIT_MAX_WAIT_SECONDS,
+)
+if fcntl is None and openai_limiter.enabled:
+    print("Warning: fcntl not available; the OpenAI rate limit budget is tracked per worker process.")
@@ -0,0 +1,64 @@
+# backend/core/readiness.py
+import time
+from typing import Awaitable, Dict
+
+PENDING = "pending"
+READY = "ready"
+FAILED = "failed"
+DISABLED = "disabled" # Not configured; doesn't hold up readiness
+
+# Imported with the app, so start-up times are measured from (close to) the import
+IMPORTED_AT = time.perf_counter()
+
+# Start-up state of each dependency: {"status": ..., "seconds": ..., "error"/"detail": ...}
+_checks: Dict[str, dict] = {}
+_complete = False
+
+
+def expect(*names: str) -> None:
+    """Marks dependencies as pending, so /ready reports them before their start-up begins."""
+    for name in names:
+        _checks.setdefault(name, {"status": PENDING})
+
+
+def disable(name: str, detail: str) -> None:
+    _checks[name] = {"status": DISABLED, "detail": detail}
+
+
+async def track(name: str, startup: Awaitable) -> bool:
+    """
+    Awaits one dependency's start-up and records how long it took, or why it failed.
+    Returns whether it succeeded; failures are recorded rather than raised.
+    """
+    _checks[name] = {"status": PENDING}
+    start = time.perf_counter()
+    try:
+        await startup
+    except Exception as e:
+        print(f"Start-up of {name} failed: {e}")
+        _checks[name] = {"status": FAILED, "seconds": round(time.perf_counter() - start, 3), "error": str(e) or type(e).__name__}
+        return False
+    _checks[name] = {"status": READY, "seconds": round(time.perf_counter() - start, 3)}
+    return True
+
+
+def mark_complete() -> None:
+    """Called once every dependency's start-up has finished (successfully or not)."""
+    global _complete
+    _complete = True
+    failed = [name for name, check in _checks.items() if check["status"] == FAILED]
+    print(f"Start-up complete {time.perf_counter() - IMPORTED_AT:.2f}s after import"
+          + (f"; failed: {', '.join(failed)}." if failed else "."))
+
+
+def is_ready() -> bool:
+    return _complete and all(check["status"] in (READY, DISABLED) for check in _checks.values())
+
+
+def status() -> dict:
+    return {
+        "ready": is_ready(),
+        "startup_complete": _complete,
+        "seconds_since_import": round(time.perf_counter() - IMPORTED_AT, 3),
+        "dependencies": {name: dict(check) for name, check in _checks.items()},
+    }
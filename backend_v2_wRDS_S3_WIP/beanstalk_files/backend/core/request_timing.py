@@ -0,0 +1,54 @@
+# backend/core/request_timing.py
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+
+class RequestTimings:
+    """Durations of the stages of one HTTP request, for its Server-Timing response header."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages: Dict[str, List[float]] = {} # name -> [total seconds, count]
+
+    def add(self, name: str, seconds: float) -> None:
+        stage = self.stages.get(name)
+        if stage is None:
+            self.stages[name] = [seconds, 1]
+        else:
+            stage[0] += seconds
+            stage[1] += 1
+
+    def header_value(self) -> str:
+        """
+        e.g. 'upload_read;dur=1.2, openai_summary;dur=812.4, openai_entities;dur=903.0;desc="2 calls",
+        total;dur=934.5'. Stages can overlap (the OpenAI calls run concurrently); total is the
+        time from receiving the request until the response headers were sent.
+        """
+        entries = []
+        for name, (seconds, count) in self.stages.items():
+            desc = f';desc="{count} calls"' if count > 1 else ""
+            entries.append(f"{name};dur={seconds * 1000:.1f}{desc}")
+        entries.append(f"total;dur={(time.perf_counter() - self.start) * 1000:.1f}")
+        return ", ".join(entries)
+
+
+# Tasks started by the request (asyncio.gather, asyncio.to_thread) record into the same object
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def start():
+    """Starts collecting stage timings for the current request. Returns (timings, token for reset())."""
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def reset(token) -> None:
+    _current.reset(token)
+
+
+def record(name: str, seconds: float) -> None:
+    """Adds a stage duration to the current request's timings, if they are being collected."""
+    timings = _current.get()
+    if timings is not None:
+        timings.add(name, seconds)
@@ -0,0 +1,120 @@
+# backend/core/result_cache.py
+import hashlib
+import re
+import sys
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from backend.core.config import settings
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Normalizes article text so trivially different copies (whitespace, unicode forms) share a key."""
+    return _WHITESPACE_RE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def make_cache_key(text: str, model: str, prompt_version: str) -> str:
+    """Content-addressed key: hash of normalized text + model name + prompt version."""
+    digest = hashlib.sha256()
+    digest.update(f"{prompt_version}\x00{model}\x00".encode("utf-8"))
+    digest.update(normalize_text(text).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _estimate_size(value) -> int:
+    """Rough in-memory size (bytes) of a cached analysis result."""
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sys.getsizeof(k) + _estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(_estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+def copy_result(result: dict) -> dict:
+    """Shallow copy with copied lists, so callers can't mutate the cached entry."""
+    return {k: (list(v) if isinstance(v, list) else v) for k, v in result.items()}
+
+
+class AnalysisCache:
+    """
+    In-memory LRU cache of analysis results, bounded by entry count and approximate
+    memory, with a per-entry TTL. Not shared between worker processes.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        # key -> (expires_at, size_bytes, result)
+        self._entries: "OrderedDict[str, Tuple[float, int, dict]]" = OrderedDict()
+        self._current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, _, result = entry
+        if expires_at < time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return copy_result(result)
+
+    def contains(self, key: str) -> bool:
+        """Whether an unexpired result is cached, without counting a hit or miss."""
+        entry = self._entries.get(key)
+        return entry is not None and entry[0] >= time.monotonic()
+
+    def put(self, key: str, result: dict) -> None:
+        size = _estimate_size(result)
+        if size > self.max_bytes:
+            return  # Never cache something that would flush the whole cache
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, size, copy_result(result))
+        self._current_bytes += size
+        while len(self._entries) > self.max_entries or self._current_bytes > self.max_bytes:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._current_bytes = 0
+
+    def _remove(self, key: str) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._current_bytes -= size
+
+    def stats(self) -> dict:
+        return {
+            "enabled": settings.CACHE_ENABLED,
+            "entries": len(self._entries),
+            "bytes": self._current_bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+analysis_cache = AnalysisCache(
+    max_entries=settings.CACHE_MAX_ENTRIES,
+    max_bytes=settings.CACHE_MAX_BYTES,
+    ttl_seconds=settings.CACHE_TTL_SECONDS,
+)
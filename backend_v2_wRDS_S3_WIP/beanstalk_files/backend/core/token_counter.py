@@ -0,0 +1,132 @@
+# backend/core/token_counter.py
+import re
+import threading
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from backend.core.config import settings
+
+try:
+    import tiktoken # Optional: exact counts; without it token counts are estimated
+except ImportError:
+    tiktoken = None
+
+# Chat format overhead: tokens added per message, and to prime the assistant's reply
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+# Han, kana and hangul: roughly one token per character or more, not one per ~4 characters
+_CJK_RE = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]")
+
+_encodings: Dict[str, object] = {}
+_loading = set()
+_loading_lock = threading.Lock()
+_tiktoken_failed = False
+
+
+def _encoding_for(model: str):
+    """
+    The tiktoken encoding of a model, or None (use the estimate) if tiktoken is unavailable
+    or the encoding is still loading. tiktoken downloads encoding files on first use, without
+    a timeout, so they are loaded on a background thread instead of blocking a request.
+    """
+    if tiktoken is None or _tiktoken_failed or settings.TOKENIZER == "estimate":
+        return None
+    encoding = _encodings.get(model)
+    if encoding is None:
+        with _loading_lock:
+            if model in _loading:
+                return None
+            _loading.add(model)
+        threading.Thread(target=_load_encoding, args=(model,), name=f"tiktoken-{model}", daemon=True).start()
+    return encoding
+
+
+def _load_encoding(model: str) -> None:
+    global _tiktoken_failed
+    try:
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base") # Unknown model name
+        _encodings[model] = encoding
+        print(f"Loaded tiktoken encoding '{encoding.name}' for {model}.")
+    except Exception as e:
+        print(f"Warning: Could not load the tiktoken encoding for {model} ({e}). Token counts will be estimated.")
+        _tiktoken_failed = True
+
+
+def warm_up(*models: str) -> None:
+    """Starts loading the encodings of `models` (called on app startup)."""
+    for model in models:
+        _encoding_for(model)
+
+
+def tokenizer_name(model: str) -> str:
+    """'tiktoken' if counts for `model` are exact, 'estimate' if they come from the character heuristic."""
+    return "tiktoken" if model in _encodings and settings.TOKENIZER != "estimate" else "estimate"
+
+
+def count_tokens(text: str, model: str) -> int:
+    """Tokens in `text` for `model`: exact with tiktoken, else ~4 characters per token (1 per CJK character)."""
+    encoding = _encoding_for(model)
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def count_chat_tokens(system_prompt: str, prompt_text: str, model: str) -> int:
+    """Prompt tokens of a system + user message chat completion."""
+    return count_tokens(system_prompt, model) + count_tokens(prompt_text, model) + 2 * TOKENS_PER_MESSAGE + TOKENS_PER_REPLY
+
+
+# --- Usage Accounting ---
+
+class TokenUsage:
+    """Tokens reported by the OpenAI API for the calls made on behalf of one analysis."""
+
+    def __init__(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def add(self, prompt_tokens: int, completion_tokens: int) -> None:
+        self.calls += 1
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+
+
+_current_usage: ContextVar[Optional[TokenUsage]] = ContextVar("openai_token_usage", default=None)
+
+# Totals for this worker process, by model
+_totals: Dict[str, TokenUsage] = {}
+
+
+def start_usage() -> TokenUsage:
+    """
+    Starts counting the token usage of the current task and returns the counter. Tasks it
+    creates afterwards (asyncio.gather, the analysis single-flight) add to the same counter.
+    Results served from the cache, or shared with another request, count no tokens.
+    """
+    usage = TokenUsage()
+    _current_usage.set(usage)
+    return usage
+
+
+def record_usage(model: str, prompt_tokens: int, completion_tokens: int) -> None:
+    """Adds the usage of one completed call to the current analysis and the process totals."""
+    usage = _current_usage.get()
+    if usage is not None:
+        usage.add(prompt_tokens, completion_tokens)
+    _totals.setdefault(model, TokenUsage()).add(prompt_tokens, completion_tokens)
+
+
+def usage_stats() -> dict:
+    return {
+        "tokenizer": tokenizer_name(settings.OPENAI_MODEL),
+        "models": {
+            model: {"calls": usage.calls, "prompt_tokens": usage.prompt_tokens, "completion_tokens": usage.completion_tokens}
+            for model, usage in _totals.items()
+        },
+    }
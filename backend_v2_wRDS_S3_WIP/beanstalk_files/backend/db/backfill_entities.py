@@ -0,0 +1,81 @@
+# backend/db/backfill_entities.py
+"""
+Fills the entity index (entity / record_entity) from the JSON entity columns of analysis
+records stored before the index existed. Safe to re-run or interrupt: linking is idempotent,
+and --start-id resumes from the last id printed.
+
+    python -m backend.db.backfill_entities --batch-size 1000
+
+Run from beanstalk_files with the same DATABASE_URL / DB_* environment as the app.
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import select
+
+from backend.db import crud, database, models
+
+PROGRESS_EVERY = 10 # batches
+
+
+def _progress(processed: int, last_id: int, started: float) -> None:
+    elapsed = time.perf_counter() - started
+    print(f"Backfilled {processed} records (last id {last_id}, {processed / max(elapsed, 1e-9):.0f} records/s)")
+
+
+async def backfill(batch_size: int = 1000, start_id: int = 0) -> int:
+    """Links the entities of every completed record with id > start_id. Returns records processed."""
+    record = models.AnalysisRecord
+    async with database.engine.begin() as conn:
+        # Only creates the two entity tables if missing; existing tables are left alone
+        await conn.run_sync(database.Base.metadata.create_all, tables=[models.Entity.__table__, models.RecordEntity.__table__])
+
+    processed = batches = 0
+    last_id = start_id
+    started = time.perf_counter()
+    while True:
+        async with database.SessionLocal() as db:
+            # Keyset over the primary key: every batch is one index range scan, however far in
+            rows = (await db.execute(
+                select(record.id, record.analysis_nationalities, record.analysis_organizations, record.analysis_people)
+                .where(record.id > last_id, record.status == crud.JOB_COMPLETED)
+                .order_by(record.id)
+                .limit(batch_size)
+            )).all()
+            if not rows:
+                break
+            await crud.link_entities(db, [
+                (record_id, {"nationalities": nationalities, "organizations": organizations, "people": people})
+                for record_id, nationalities, organizations, people in rows
+            ])
+            await db.commit()
+
+        processed += len(rows)
+        last_id = rows[-1][0]
+        batches += 1
+        if batches % PROGRESS_EVERY == 0:
+            _progress(processed, last_id, started)
+
+    if batches % PROGRESS_EVERY:
+        _progress(processed, last_id, started)
+    print("Entity backfill complete.")
+    return processed
+
+
+async def _main(args: argparse.Namespace) -> None:
+    try:
+        await backfill(args.batch_size, args.start_id)
+    finally:
+        await database.dispose_engine()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=1000, help="records per transaction")
+    parser.add_argument("--start-id", type=int, default=0, help="resume after this record id")
+    args = parser.parse_args()
+    database.init_engine()
+    if not database.engine:
+        raise SystemExit("Database is not configured (set DATABASE_URL or the DB_* variables).")
+    asyncio.run(_main(args))
@@ -1,8 +1,29 @@
 # backend/db/crud.py
-from sqlalchemy.orm import Session
+import unicodedata
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import insert, literal, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import load_only
+from sqlalchemy.ext.asyncio import AsyncSession
 from . import models, schemas
 
-def create_analysis_record(db: Session, record: schemas.AnalysisRecordCreate) -> models.AnalysisRecord:
+# Job statuses stored in AnalysisRecord.status
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+# Entity kinds in the entity table, and the analysis result field each comes from
+ENTITY_KINDS = (("nationality", "nationalities"), ("organization", "organizations"), ("person", "people"))
+ENTITY_NAME_MAX_LENGTH = 255
+# Bound parameters per IN (...) list, well under every backend's limit
+IN_CLAUSE_CHUNK = 500
+# Rows per multi-row INSERT into record_entity (two parameters each, under SQLite's limit of 999)
+LINK_INSERT_CHUNK = 250
+
+async def create_analysis_record(db: AsyncSession, record: schemas.AnalysisRecordCreate) -> models.AnalysisRecord:
     """
     Creates a new analysis record in the database.
     """
@@ -12,15 +33,307 @@ def create_analysis_record(db: Session, record: schemas.AnalysisRecordCreate) ->
         analysis_summary=record.analysis_summary,
         analysis_nationalities=record.analysis_nationalities,
         analysis_organizations=record.analysis_organizations,
-        analysis_people=record.analysis_people
+        analysis_people=record.analysis_people,
+        prompt_tokens=record.prompt_tokens,
+        completion_tokens=record.completion_tokens
     )
     db.add(db_record)
     try:
-        db.commit()
-        db.refresh(db_record)
+        await db.flush() # Assigns the id; no refresh round-trip needed
+        await link_entities(db, [(db_record.id, _record_entities(record))])
+        await db.commit()
         print(f"Successfully saved analysis record with ID: {db_record.id}")
         return db_record
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         print(f"CRITICAL: Error committing analysis record to database: {e}")
         return None # Indicate failure
+
+
+async def bulk_create_analysis_records(db: AsyncSession, records: List[schemas.AnalysisRecordCreate]) -> Optional[List[int]]:
+    """
+    Inserts many analysis records in one transaction and returns their IDs in input order.
+    Uses a multi-row INSERT ... RETURNING where the database supports it (PostgreSQL, SQLite).
+    """
+    rows = [record.model_dump() for record in records]
+    try:
+        if db.bind.dialect.insert_executemany_returning_sort_by_parameter_order:
+            result = await db.execute(
+                insert(models.AnalysisRecord).returning(models.AnalysisRecord.id, sort_by_parameter_order=True),
+                rows
+            )
+            record_ids = list(result.scalars())
+        else:
+            # e.g. MySQL: one INSERT per row, but still a single transaction
+            db_records = [models.AnalysisRecord(**row) for row in rows]
+            db.add_all(db_records)
+            await db.flush()
+            record_ids = [db_record.id for db_record in db_records]
+        await link_entities(db, [(record_id, _record_entities(record)) for record_id, record in zip(record_ids, records)])
+        await db.commit()
+        print(f"Successfully saved {len(record_ids)} analysis records in one batch.")
+        return record_ids
+    except Exception as e:
+        await db.rollback()
+        print(f"CRITICAL: Error committing batch of {len(rows)} analysis records to database: {e}")
+        return None
+
+
+async def get_analysis_record(db: AsyncSession, record_id: int) -> Optional[models.AnalysisRecord]:
+    """
+    Fetches a single analysis record by ID.
+    """
+    return await db.get(models.AnalysisRecord, record_id)
+
+
+# --- Entity Index ---
+
+def normalize_entity_name(name: str) -> str:
+    """Lookup key for an entity name: Unicode-normalized, whitespace collapsed, casefolded."""
+    return " ".join(unicodedata.normalize("NFKC", name).split()).casefold()[:ENTITY_NAME_MAX_LENGTH]
+
+
+def _record_entities(record: schemas.AnalysisRecordCreate) -> dict:
+    return {
+        "nationalities": record.analysis_nationalities,
+        "organizations": record.analysis_organizations,
+        "people": record.analysis_people,
+    }
+
+
+def _insert_ignore(db: AsyncSession, model):
+    """INSERT that skips rows violating a unique key (so concurrent writers don't fail)."""
+    table = model.__table__
+    dialect = db.bind.dialect.name
+    if dialect == "postgresql":
+        return pg_insert(table).on_conflict_do_nothing()
+    if dialect == "sqlite":
+        return sqlite_insert(table).on_conflict_do_nothing()
+    return insert(table).prefix_with("IGNORE") # MySQL
+
+
+def _chunks(items: list, size: int) -> Iterable[list]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+async def link_entities(db: AsyncSession, mentions: List[Tuple[int, dict]]) -> int:
+    """
+    Adds the entities of analysis results (record_id, {'nationalities', 'organizations',
+    'people'}) to the entity / record_entity index, in the caller's transaction. Idempotent.
+    Returns the number of (record, entity) links inserted; links already indexed aren't counted.
+    """
+    display_names: Dict[Tuple[str, str], str] = {}
+    links = set()
+    for record_id, analysis_data in mentions:
+        for kind, field in ENTITY_KINDS:
+            for name in analysis_data.get(field) or []:
+                if not isinstance(name, str) or not name.strip():
+                    continue
+                key = (kind, normalize_entity_name(name))
+                display_names.setdefault(key, " ".join(name.split())[:ENTITY_NAME_MAX_LENGTH])
+                links.add((record_id, key))
+    if not links:
+        return 0
+
+    # Sorted, so concurrent transactions take row locks in the same order (no deadlocks)
+    keys = sorted(display_names)
+    await db.execute(
+        _insert_ignore(db, models.Entity),
+        [{"kind": kind, "normalized_name": normalized, "name": display_names[(kind, normalized)]} for kind, normalized in keys]
+    )
+    entity_ids: Dict[Tuple[str, str], int] = {}
+    for names in _chunks(sorted({normalized for _, normalized in keys}), IN_CLAUSE_CHUNK):
+        rows = await db.execute(
+            select(models.Entity.id, models.Entity.kind, models.Entity.normalized_name)
+            .where(models.Entity.normalized_name.in_(names))
+        )
+        for entity_id, kind, normalized in rows:
+            entity_ids[(kind, normalized)] = entity_id
+
+    link_rows = []
+    missing = set()
+    for record_id, key in links:
+        if key in entity_ids:
+            link_rows.append({"entity_id": entity_ids[key], "record_id": record_id})
+        else:
+            missing.add((record_id, key))
+    if missing:
+        # e.g. an entity row inserted by a concurrent transaction that this one can't see yet
+        print(f"Warning: {len(missing)} entity mentions not indexed, entity row not found: {sorted(missing)[:10]}")
+    if not link_rows:
+        return 0
+
+    inserted = 0
+    link_rows.sort(key=lambda row: (row["entity_id"], row["record_id"]))
+    for chunk in _chunks(link_rows, LINK_INSERT_CHUNK):
+        # One multi-row statement per chunk, so rowcount (rows actually inserted) is reported by every driver
+        result = await db.execute(_insert_ignore(db, models.RecordEntity).values(chunk))
+        inserted += max(result.rowcount, 0)
+    return inserted
+
+
+async def search_records_by_entity(
+    db: AsyncSession,
+    name: str,
+    kind: Optional[str] = None,
+    limit: int = 50,
+    before_id: Optional[int] = None,
+) -> List[models.AnalysisRecord]:
+    """
+    Analysis records mentioning an entity (matched on its normalized name), newest first.
+    Answered from the entity and record_entity keys, never by reading the JSON columns;
+    `before_id` is the keyset cursor (the last record id of the previous page).
+    """
+    entity_query = select(models.Entity.id).where(models.Entity.normalized_name == normalize_entity_name(name))
+    if kind is not None:
+        entity_query = entity_query.where(models.Entity.kind == kind)
+    entity_ids = list((await db.execute(entity_query)).scalars())
+    if not entity_ids:
+        return []
+
+    record_ids = select(models.RecordEntity.record_id).where(models.RecordEntity.entity_id.in_(entity_ids))
+    if before_id is not None:
+        record_ids = record_ids.where(models.RecordEntity.record_id < before_id)
+    if len(entity_ids) > 1:
+        # The same name as several kinds; a single entity is already one ordered index range
+        record_ids = record_ids.distinct()
+    # Joined as a derived table: MySQL doesn't support LIMIT in an IN (...) subquery
+    page = record_ids.order_by(models.RecordEntity.record_id.desc()).limit(limit).subquery()
+
+    result = await db.execute(
+        select(models.AnalysisRecord)
+        .join(page, models.AnalysisRecord.id == page.c.record_id)
+        .options(load_only(*HISTORY_COLUMNS))
+        .order_by(models.AnalysisRecord.id.desc())
+    )
+    return list(result.scalars())
+
+
+# Columns returned by the history API (schemas.AnalysisRecord); job status/error aren't loaded
+HISTORY_COLUMNS = (
+    models.AnalysisRecord.id,
+    models.AnalysisRecord.original_filename,
+    models.AnalysisRecord.s3_object_key,
+    models.AnalysisRecord.analysis_summary,
+    models.AnalysisRecord.analysis_nationalities,
+    models.AnalysisRecord.analysis_organizations,
+    models.AnalysisRecord.analysis_people,
+    models.AnalysisRecord.prompt_tokens,
+    models.AnalysisRecord.completion_tokens,
+    models.AnalysisRecord.created_at,
+    models.AnalysisRecord.updated_at,
+)
+
+
+async def list_analysis_records(
+    db: AsyncSession,
+    limit: int,
+    after: Optional[Tuple[datetime, int]] = None,
+    original_filename: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+) -> List[models.AnalysisRecord]:
+    """
+    Completed analysis records, newest first, using keyset pagination: `after` is the
+    (created_at, id) of the last record of the previous page. Each page is one range scan of
+    the (status, created_at, id) index, or (original_filename, status, created_at, id) when
+    filtering by filename, so its cost doesn't grow with how deep into the history it is.
+    """
+    record = models.AnalysisRecord
+    query = (
+        select(record)
+        .options(load_only(*HISTORY_COLUMNS))
+        .where(record.status == JOB_COMPLETED)
+        .order_by(record.created_at.desc(), record.id.desc())
+        .limit(limit)
+    )
+    if original_filename is not None:
+        query = query.where(record.original_filename == original_filename)
+    if created_from is not None:
+        query = query.where(record.created_at >= created_from)
+    if created_to is not None:
+        query = query.where(record.created_at < created_to)
+    if after is not None:
+        # Typed like the columns, so the cursor is compared in the same storage format
+        query = query.where(tuple_(record.created_at, record.id) < tuple_(
+            literal(after[0], record.created_at.type), literal(after[1], record.id.type)
+        ))
+    result = await db.execute(query)
+    return list(result.scalars())
+
+
+async def create_job_record(db: AsyncSession, original_filename: Optional[str], s3_object_key: Optional[str]) -> models.AnalysisRecord:
+    """
+    Creates a placeholder record for a queued analysis job. Its ID is the job ID.
+    """
+    db_record = models.AnalysisRecord(
+        original_filename=original_filename,
+        s3_object_key=s3_object_key,
+        status=JOB_QUEUED
+    )
+    db.add(db_record)
+    try:
+        await db.commit()
+        await db.refresh(db_record)
+        return db_record
+    except Exception as e:
+        await db.rollback()
+        print(f"CRITICAL: Error creating job record: {e}")
+        return None
+
+
+async def update_job_status(db: AsyncSession, record_id: int, status: str, error_message: Optional[str] = None) -> bool:
+    """
+    Updates the status (and optional error message) of a job record.
+    """
+    try:
+        await db.execute(update(models.AnalysisRecord).where(models.AnalysisRecord.id == record_id).values(
+            {"status": status, "error_message": error_message}
+        ))
+        await db.commit()
+        return True
+    except Exception as e:
+        await db.rollback()
+        print(f"CRITICAL: Error updating job {record_id} to status '{status}': {e}")
+        return False
+
+
+async def complete_job(db: AsyncSession, record_id: int, analysis_data: dict, prompt_tokens: Optional[int] = None, completion_tokens: Optional[int] = None) -> bool:
+    """
+    Stores analysis results (and the tokens they used) on a job record and marks it completed.
+    """
+    try:
+        await db.execute(update(models.AnalysisRecord).where(models.AnalysisRecord.id == record_id).values({
+            "analysis_summary": analysis_data.get('summary'),
+            "analysis_nationalities": analysis_data.get('nationalities'),
+            "analysis_organizations": analysis_data.get('organizations'),
+            "analysis_people": analysis_data.get('people'),
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "status": JOB_COMPLETED,
+            "error_message": None
+        }))
+        await link_entities(db, [(record_id, analysis_data)])
+        await db.commit()
+        return True
+    except Exception as e:
+        await db.rollback()
+        print(f"CRITICAL: Error saving results for job {record_id}: {e}")
+        return False
+
+
+async def set_s3_object_key(db: AsyncSession, record_id: int, s3_object_key: str) -> bool:
+    """
+    Stores the S3 key of an upload that finished after its record was created.
+    """
+    try:
+        await db.execute(update(models.AnalysisRecord).where(models.AnalysisRecord.id == record_id).values(
+            {"s3_object_key": s3_object_key}
+        ))
+        await db.commit()
+        return True
+    except Exception as e:
+        await db.rollback()
+        print(f"CRITICAL: Error saving S3 key for record {record_id}: {e}")
+        return False
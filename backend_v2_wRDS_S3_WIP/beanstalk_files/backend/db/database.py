@@ -1,19 +1,77 @@
-from sqlalchemy import create_engine
+import asyncio
+import time
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from backend.core.config import settings
 
+# Sync DBAPI drivers -> asyncio drivers
+ASYNC_DRIVERS = {
+    "postgresql": "asyncpg",
+    "sqlite": "aiosqlite",
+    "mysql": "aiomysql",
+}
+
 engine = None
 SessionLocal = None
 IS_DB_CONNECTED = False
 
-if settings.SQLALCHEMY_DATABASE_URL:
+
+def async_database_url(url: str) -> URL:
+    """The URL with its driver replaced by the asyncio driver for the same database."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if parsed.get_driver_name() != ASYNC_DRIVERS.get(backend, parsed.get_driver_name()):
+        parsed = parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+    return parsed
+
+
+def _engine_options(url: URL) -> dict:
+    """Pool sizing, health checks and a server-side statement timeout from settings."""
+    options = {
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+    backend = url.get_backend_name()
+    if backend == "sqlite" and url.database in (None, "", ":memory:"):
+        return options # In-memory SQLite can't share a pool of connections
+
+    options.update(
+        # aiosqlite would default to NullPool; pool it too so local runs behave like RDS
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+    )
+    if settings.DB_STATEMENT_TIMEOUT_MS > 0:
+        if backend == "postgresql":
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}}
+        elif backend == "mysql":
+            options["connect_args"] = {"init_command": f"SET SESSION MAX_EXECUTION_TIME={settings.DB_STATEMENT_TIMEOUT_MS}"}
+    return options
+
+
+def init_engine() -> None:
+    """
+    Creates the engine and session factory (once). Called on app startup rather than at
+    import, so importing the app doesn't load the database driver or build the pool.
+    """
+    global engine, SessionLocal, IS_DB_CONNECTED
+    if engine is not None:
+        return
+    if not settings.SQLALCHEMY_DATABASE_URL:
+        print("Database URL not configured, skipping engine creation.")
+        return
     try:
-        engine = create_engine(
-            settings.SQLALCHEMY_DATABASE_URL,
-        )
-        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-        print("Database engine and session created successfully.")
+        url = async_database_url(settings.SQLALCHEMY_DATABASE_URL)
+        engine = create_async_engine(url, **_engine_options(url))
+        # expire_on_commit=False: records are read after commit without another round-trip
+        SessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+        print(f"Database engine and session created successfully (driver: {url.drivername}).")
         IS_DB_CONNECTED = True # Assume connection is possible if URL is valid
 
     except Exception as e:
@@ -21,23 +79,57 @@ if settings.SQLALCHEMY_DATABASE_URL:
         print("Database operations will fail.")
         engine = None
         SessionLocal = None
-else:
-    print("Database URL not configured, skipping engine creation.")
+
 
 Base = declarative_base()
 
 # --- Dependency for FastAPI ---
-def get_db():
+async def get_db():
     """FastAPI dependency to get a DB session."""
     if not SessionLocal:
         yield None # Indicate DB is not available
         return
 
-    db = SessionLocal()
-    try:
-        yield db
-    except Exception:
-        db.rollback()
-        raise
-    finally:
-        db.close()
\ No newline at end of file
+    async with SessionLocal() as db:
+        try:
+            yield db
+        except Exception:
+            await db.rollback()
+            raise
+
+
+def pool_status() -> Optional[dict]:
+    """Connection pool gauge for this worker process (None without a database)."""
+    if engine is None:
+        return None
+    pool = engine.pool
+    if not isinstance(pool, AsyncAdaptedQueuePool):
+        return {"pool": type(pool).__name__}
+    capacity = pool.size() + settings.DB_MAX_OVERFLOW
+    checked_out = pool.checkedout()
+    return {
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "checked_out": checked_out,
+        "checked_in": pool.checkedin(),
+        "overflow": max(0, pool.overflow()),
+        "utilization": round(checked_out / capacity, 3) if capacity else 0.0,
+    }
+
+
+async def ping(timeout: float) -> float:
+    """Seconds taken by a SELECT 1. Raises if the database can't be reached within `timeout`."""
+    async def select_one():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    start = time.perf_counter()
+    await asyncio.wait_for(select_one(), timeout)
+    return time.perf_counter() - start
+
+
+async def dispose_engine() -> None:
+    """Closes pooled connections (called on app shutdown)."""
+    if engine is not None:
+        await engine.dispose()
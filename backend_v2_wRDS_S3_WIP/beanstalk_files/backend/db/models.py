@@ -1,16 +1,60 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, JSON
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, Index, ForeignKey, UniqueConstraint
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.sql import func
 from .database import Base # Use relative import
 
+# SQLite's CURRENT_TIMESTAMP has no fractional seconds. Binding timestamps the same way keeps
+# keyset comparisons against server-default values exact (used by local/test databases only).
+Timestamp = DateTime(timezone=True).with_variant(
+    sqlite.DATETIME(storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"),
+    "sqlite"
+)
+
 class AnalysisRecord(Base):
     __tablename__ = "analysis_records"
 
     id = Column(Integer, primary_key=True, index=True)
     original_filename = Column(String(255), nullable=True, index=True)
-    s3_object_key = Column(String(1024), nullable=True, unique=True, index=True) # Added index
+    # Content-addressed: records of identical uploads share one object, so not unique
+    s3_object_key = Column(String(1024), nullable=True, index=True)
     analysis_summary = Column(Text, nullable=True)
     analysis_nationalities = Column(JSON, nullable=True)
     analysis_organizations = Column(JSON, nullable=True)
     analysis_people = Column(JSON, nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now())
\ No newline at end of file
+    # Job lifecycle for asynchronous submissions (/jobs); synchronous /analyze rows are "completed"
+    status = Column(String(20), nullable=False, server_default="completed", index=True)
+    error_message = Column(Text, nullable=True)
+    # Tokens reported by the OpenAI API for this analysis (0 when served from the cache)
+    prompt_tokens = Column(Integer, nullable=True)
+    completion_tokens = Column(Integer, nullable=True)
+    created_at = Column(Timestamp, server_default=func.now())
+    updated_at = Column(Timestamp, onupdate=func.now(), server_default=func.now())
+
+    __table_args__ = (
+        # Keyset pagination of the history API (completed records, newest first), optionally by filename
+        Index("ix_analysis_records_history", "status", "created_at", "id"),
+        Index("ix_analysis_records_history_filename", "original_filename", "status", "created_at", "id"),
+    )
+
+
+class Entity(Base):
+    """One distinct nationality, organization or person across all analyses."""
+    __tablename__ = "entity"
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(20), nullable=False) # nationality | organization | person
+    name = Column(String(255), nullable=False) # As first seen
+    normalized_name = Column(String(255), nullable=False) # Lookup key (casefolded, whitespace collapsed)
+
+    __table_args__ = (
+        UniqueConstraint("normalized_name", "kind", name="uq_entity_normalized_name_kind"),
+    )
+
+
+class RecordEntity(Base):
+    """Inverted index: which analysis records mention which entity."""
+    __tablename__ = "record_entity"
+
+    # (entity_id, record_id) order: "records mentioning X" is one range scan of the primary key
+    entity_id = Column(Integer, ForeignKey("entity.id", ondelete="CASCADE"), primary_key=True)
+    record_id = Column(Integer, ForeignKey("analysis_records.id", ondelete="CASCADE"), primary_key=True, index=True)
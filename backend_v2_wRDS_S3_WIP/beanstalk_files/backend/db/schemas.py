@@ -10,6 +10,9 @@ class AnalysisRecordBase(BaseModel):
     analysis_nationalities: Optional[List[str]] = []
     analysis_organizations: Optional[List[str]] = []
     analysis_people: Optional[List[str]] = []
+    # Tokens reported by the OpenAI API for this analysis (0 when served from the cache)
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
 
 # Schema for creating records in DB
 class AnalysisRecordCreate(AnalysisRecordBase):
@@ -24,6 +27,11 @@ class AnalysisRecord(AnalysisRecordBase):
     class Config:
         from_attributes = True # Pydantic V2 way to allow ORM mode
 
+# --Schema for the history API (GET /analyses) ---
+class AnalysisRecordPage(BaseModel):
+    items: List[AnalysisRecord] = []
+    next_cursor: Optional[str] = None # Pass as `cursor` to get the next page; null on the last page
+
 # --Schema for the API response from /analyze endpoint ---
 # This might differ slightly if you don't return everything from the DB record
 class AnalysisResponse(BaseModel):
@@ -33,3 +41,50 @@ class AnalysisResponse(BaseModel):
     nationalities: List[str] = []
     organizations: List[str] = []
     people: List[str] = []
+
+# --Schemas for the /analyze/batch endpoint ---
+class BatchItemResult(BaseModel):
+    filename: str
+    status_code: int = 200
+    result: Optional[AnalysisResponse] = None
+    error: Optional[str] = None
+
+class BatchAnalysisResponse(BaseModel):
+    total: int
+    succeeded: int
+    failed: int
+    items: List[BatchItemResult] = []
+
+# --Schemas for the asynchronous job API (/jobs) ---
+class JobSubmitResponse(BaseModel):
+    job_id: int
+    status: str
+
+class JobStatusResponse(BaseModel):
+    job_id: int
+    status: str  # queued | running | completed | failed
+    error: Optional[str] = None
+    result: Optional[AnalysisResponse] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+# --Schemas for the dry-run token estimate (/analyze/estimate) ---
+class TokenEstimateCall(BaseModel):
+    task: str # summary | nationalities | nationality_confirmation | entities | structured | summary_combine
+    model: str
+    prompt_tokens: int
+    max_completion_tokens: int # The call's max_tokens: an upper bound on its completion
+
+class TokenEstimate(BaseModel):
+    filename: Optional[str] = None
+    characters: int
+    article_tokens: int
+    tokenizer: str # tiktoken (exact) | estimate (character heuristic)
+    chunks: int = 1 # > 1: analyzed in sections, plus a call combining their summaries
+    cached: bool = False # A cached result exists: analyzing now would make no calls
+    calls: List[TokenEstimateCall] = []
+    prompt_tokens: int = 0
+    max_completion_tokens: int = 0
+    max_total_tokens: int = 0
+    token_budget: Optional[int] = None # REQUEST_TOKEN_BUDGET, if set
+    within_limits: bool = True # False: /analyze would reject the article (413) before calling the model
@@ -0,0 +1,141 @@
+# backend/db/write_behind.py
+import asyncio
+import time
+from typing import List, Optional, Tuple
+
+from backend.core.config import settings
+from backend.db import crud, database, schemas
+
+# (record, future resolved with its row id or None)
+_PendingRecord = Tuple[schemas.AnalysisRecordCreate, "asyncio.Future[Optional[int]]"]
+
+record_writer: Optional["WriteBehindBuffer"] = None
+
+
+class WriteBehindBuffer:
+    """
+    Collects analysis records and inserts them in bulk: one transaction per `batch_size`
+    records, or per `flush_interval_ms` after the first pending record, whichever comes first.
+
+    The queue is bounded, so when the database falls behind, callers wait in enqueue()
+    instead of buffering without limit. Each record gets a future for its row id.
+    """
+
+    def __init__(self, batch_size: int, flush_interval_ms: int, max_queue: int):
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval_ms / 1000
+        self._queue: "asyncio.Queue[_PendingRecord]" = asyncio.Queue(maxsize=max(1, max_queue))
+        self._task: Optional[asyncio.Task] = None
+        self._collecting: List[_PendingRecord] = [] # Taken off the queue, not yet flushing
+        self._flushing: Optional[asyncio.Future] = None
+        self.flushes = 0
+        self.records_written = 0
+        self.records_failed = 0
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run(), name="db-write-behind")
+        print(f"DB write-behind enabled (batch size {self.batch_size}, flush every {self.flush_interval * 1000:.0f} ms).")
+
+    async def stop(self) -> None:
+        """Flushes everything still queued, then stops the flusher."""
+        if self._task:
+            # Cancelled until it actually stops: before Python 3.12, wait_for() swallows a
+            # cancellation that arrives just as its queue get completes, and the loop carries on
+            while not self._task.done():
+                self._task.cancel()
+                await asyncio.wait({self._task}, timeout=0.1)
+            self._task = None
+        if self._flushing:
+            await asyncio.gather(self._flushing, return_exceptions=True)
+        batch, self._collecting = self._collecting, []
+        await self._flush(batch)
+        while not self._queue.empty():
+            await self._flush(self._drain(self.batch_size))
+
+    async def enqueue(self, record: schemas.AnalysisRecordCreate) -> "asyncio.Future[Optional[int]]":
+        """Queues a record (waiting while the queue is full) and returns a future for its row id."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((record, future))
+        return future
+
+    async def insert(self, record: schemas.AnalysisRecordCreate) -> Optional[int]:
+        """Queues a record and waits until its batch is written. Returns the row id or None."""
+        return await (await self.enqueue(record))
+
+    def stats(self) -> dict:
+        return {
+            "pending": self._queue.qsize(),
+            "flushes": self.flushes,
+            "records_written": self.records_written,
+            "records_failed": self.records_failed,
+        }
+
+    def _drain(self, limit: int) -> List[_PendingRecord]:
+        batch = []
+        while len(batch) < limit and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            self._collecting = [await self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(self._collecting) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    self._collecting.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            batch, self._collecting = self._collecting, []
+            # Shielded so a shutdown mid-flush still completes (and resolves) this batch
+            self._flushing = asyncio.ensure_future(self._flush(batch))
+            await asyncio.shield(self._flushing)
+
+    async def _flush(self, batch: List[_PendingRecord]) -> None:
+        if not batch:
+            return
+        records = [record for record, _ in batch]
+        record_ids: List[Optional[int]] = [None] * len(batch)
+        try:
+            async with database.SessionLocal() as db:
+                bulk_ids = await crud.bulk_create_analysis_records(db, records)
+                if bulk_ids is not None:
+                    record_ids = bulk_ids
+                else:
+                    # One bad row shouldn't lose the whole batch: retry the rows individually
+                    for i, record in enumerate(records):
+                        db_record = await crud.create_analysis_record(db, record)
+                        record_ids[i] = db_record.id if db_record else None
+        except Exception as e:
+            print(f"CRITICAL: Write-behind flush of {len(batch)} analysis records failed: {e}")
+
+        self.flushes += 1
+        for (_, future), record_id in zip(batch, record_ids):
+            if record_id is None:
+                self.records_failed += 1
+            else:
+                self.records_written += 1
+            if not future.done():
+                future.set_result(record_id)
+
+
+def start_write_behind() -> None:
+    """Starts the buffer if DB_WRITE_BEHIND_ENABLED and a database is configured."""
+    global record_writer
+    if settings.DB_WRITE_BEHIND_ENABLED and database.IS_DB_CONNECTED and database.SessionLocal:
+        record_writer = WriteBehindBuffer(
+            settings.DB_WRITE_BEHIND_BATCH_SIZE,
+            settings.DB_WRITE_BEHIND_FLUSH_MS,
+            settings.DB_WRITE_BEHIND_MAX_QUEUE,
+        )
+        record_writer.start()
+
+
+async def stop_write_behind() -> None:
+    """Writes out pending records (called on app shutdown)."""
+    global record_writer
+    if record_writer:
+        await record_writer.stop()
+        record_writer = None
@@ -0,0 +1,242 @@
+# backend/jobs/queue.py
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, List, Optional
+
+from backend.core.config import settings
+
+try:
+    import aio_pika # Optional: only needed for JOB_QUEUE_BACKEND=rabbitmq
+except ImportError:
+    aio_pika = None
+
+
+@dataclass
+class QueuedJob:
+    """A message taken from the queue. `handle` is backend-specific (row id, AMQP message...)."""
+    message: dict
+    attempts: int = 0
+    handle: Any = None
+
+
+class JobQueue(ABC):
+    """Minimal queue interface used by the job API and the worker pool."""
+
+    async def connect(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    @abstractmethod
+    async def publish(self, message: dict) -> None:
+        """Enqueues a JSON-serializable message."""
+
+    @abstractmethod
+    async def get(self) -> QueuedJob:
+        """Waits for the next message. It stays reserved until ack() or retry()."""
+
+    @abstractmethod
+    async def ack(self, job: QueuedJob) -> None:
+        """Removes a processed message from the queue."""
+
+    @abstractmethod
+    async def retry(self, job: QueuedJob) -> None:
+        """Returns a message to the queue with its attempt count incremented."""
+
+
+class InMemoryJobQueue(JobQueue):
+    """
+    Process-local queue. Needs no external services, but messages are lost on restart
+    and only workers in the same process can consume them.
+    """
+
+    def __init__(self):
+        self._queue: "asyncio.Queue[QueuedJob]" = asyncio.Queue()
+
+    async def publish(self, message: dict) -> None:
+        await self._queue.put(QueuedJob(message=message))
+
+    async def get(self) -> QueuedJob:
+        return await self._queue.get()
+
+    async def ack(self, job: QueuedJob) -> None:
+        pass
+
+    async def retry(self, job: QueuedJob) -> None:
+        await self._queue.put(QueuedJob(message=job.message, attempts=job.attempts + 1))
+
+
+class SQLiteJobQueue(JobQueue):
+    """
+    Durable queue in a local SQLite file, shared by all worker processes on the host.
+    Consumers claim up to `prefetch` messages per round-trip; claims older than
+    `visibility_timeout` seconds (e.g. from a crashed worker) become available again.
+    """
+
+    def __init__(self, path: str, prefetch: int, visibility_timeout: float, poll_interval: float = 0.5):
+        self.path = path
+        self.prefetch = max(1, prefetch)
+        self.visibility_timeout = visibility_timeout
+        self.poll_interval = poll_interval
+        self._conn: Optional[sqlite3.Connection] = None
+        # One connection is shared by the executor threads; serialize its use
+        self._conn_lock = threading.Lock()
+        self._buffer: List[QueuedJob] = []
+        self._claim_lock = asyncio.Lock()
+        self._published = asyncio.Event()
+
+    async def connect(self) -> None:
+        await asyncio.to_thread(self._connect)
+
+    def _execute(self, sql: str, params=()) -> None:
+        with self._conn_lock:
+            self._conn.execute(sql, params)
+
+    def _connect(self) -> None:
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS job_queue ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " payload TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " claimed_at REAL)"
+        )
+
+    async def close(self) -> None:
+        if self._conn:
+            # Hand back messages claimed but never started
+            unstarted = [job.handle for job in self._buffer]
+            self._buffer.clear()
+            if unstarted:
+                await asyncio.to_thread(self._release, unstarted)
+            self._conn.close()
+            self._conn = None
+
+    async def publish(self, message: dict) -> None:
+        await asyncio.to_thread(self._execute, "INSERT INTO job_queue (payload) VALUES (?)", (json.dumps(message),))
+        self._published.set()
+
+    async def get(self) -> QueuedJob:
+        while True:
+            async with self._claim_lock:
+                if not self._buffer:
+                    self._buffer = await asyncio.to_thread(self._claim_batch)
+                if self._buffer:
+                    return self._buffer.pop(0)
+            # Nothing available: wait for a local publish or poll for other processes' messages
+            self._published.clear()
+            try:
+                await asyncio.wait_for(self._published.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def _claim_batch(self) -> List[QueuedJob]:
+        now = time.time()
+        with self._conn_lock:
+            cur = self._conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                rows = cur.execute(
+                    "SELECT id, payload, attempts FROM job_queue"
+                    " WHERE claimed_at IS NULL OR claimed_at < ? ORDER BY id LIMIT ?",
+                    (now - self.visibility_timeout, self.prefetch),
+                ).fetchall()
+                cur.executemany("UPDATE job_queue SET claimed_at = ? WHERE id = ?", [(now, row[0]) for row in rows])
+                cur.execute("COMMIT")
+            except Exception:
+                cur.execute("ROLLBACK")
+                raise
+        return [QueuedJob(message=json.loads(payload), attempts=attempts, handle=row_id) for row_id, payload, attempts in rows]
+
+    def _release(self, row_ids: List[int]) -> None:
+        with self._conn_lock:
+            self._conn.executemany("UPDATE job_queue SET claimed_at = NULL WHERE id = ?", [(row_id,) for row_id in row_ids])
+
+    async def ack(self, job: QueuedJob) -> None:
+        await asyncio.to_thread(self._execute, "DELETE FROM job_queue WHERE id = ?", (job.handle,))
+
+    async def retry(self, job: QueuedJob) -> None:
+        await asyncio.to_thread(
+            self._execute,
+            "UPDATE job_queue SET claimed_at = NULL, attempts = attempts + 1 WHERE id = ?",
+            (job.handle,),
+        )
+        self._published.set()
+
+
+class RabbitMQJobQueue(JobQueue):
+    """RabbitMQ adapter (requires the optional `aio-pika` package). Prefetch maps to basic.qos."""
+
+    def __init__(self, url: str, queue_name: str, prefetch: int):
+        if aio_pika is None:
+            raise RuntimeError("JOB_QUEUE_BACKEND=rabbitmq requires the 'aio-pika' package to be installed.")
+        self.url = url
+        self.queue_name = queue_name
+        self.prefetch = max(1, prefetch)
+        self._connection = None
+        self._channel = None
+        self._incoming: "asyncio.Queue[Any]" = asyncio.Queue()
+        self._consumer_tag = None
+
+    async def connect(self) -> None:
+        self._connection = await aio_pika.connect_robust(self.url)
+        self._channel = await self._connection.channel()
+        await self._channel.set_qos(prefetch_count=self.prefetch)
+        self._queue = await self._channel.declare_queue(self.queue_name, durable=True)
+
+    async def close(self) -> None:
+        if self._connection:
+            await self._connection.close()
+            self._connection = None
+
+    async def publish(self, message: dict, attempts: int = 0) -> None:
+        await self._channel.default_exchange.publish(
+            aio_pika.Message(
+                body=json.dumps(message).encode("utf-8"),
+                content_type="application/json",
+                delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+                headers={"x-attempts": attempts},
+            ),
+            routing_key=self.queue_name,
+        )
+
+    async def get(self) -> QueuedJob:
+        if self._consumer_tag is None:
+            # Start consuming lazily, so API-only processes never take messages
+            self._consumer_tag = await self._queue.consume(self._incoming.put)
+        incoming = await self._incoming.get()
+        attempts = int((incoming.headers or {}).get("x-attempts", 0))
+        return QueuedJob(message=json.loads(incoming.body), attempts=attempts, handle=incoming)
+
+    async def ack(self, job: QueuedJob) -> None:
+        await job.handle.ack()
+
+    async def retry(self, job: QueuedJob) -> None:
+        # Re-publish with the attempt count in a header, then drop the original delivery
+        await self.publish(job.message, attempts=job.attempts + 1)
+        await job.handle.ack()
+
+
+def create_job_queue() -> JobQueue:
+    """Builds the queue selected by JOB_QUEUE_BACKEND (memory | sqlite | rabbitmq)."""
+    backend = settings.JOB_QUEUE_BACKEND
+    if backend == "sqlite":
+        return SQLiteJobQueue(
+            path=settings.JOB_QUEUE_SQLITE_PATH,
+            prefetch=settings.JOB_PREFETCH,
+            visibility_timeout=settings.JOB_VISIBILITY_TIMEOUT_SECONDS,
+        )
+    if backend == "rabbitmq":
+        if not settings.RABBITMQ_URL:
+            raise RuntimeError("JOB_QUEUE_BACKEND=rabbitmq but RABBITMQ_URL is not set.")
+        return RabbitMQJobQueue(settings.RABBITMQ_URL, settings.JOB_QUEUE_NAME, settings.JOB_PREFETCH)
+    if backend != "memory":
+        print(f"Warning: Unknown JOB_QUEUE_BACKEND '{backend}', falling back to in-memory queue.")
+    return InMemoryJobQueue()
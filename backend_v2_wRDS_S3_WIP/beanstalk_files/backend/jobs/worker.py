@@ -0,0 +1,124 @@
+# backend/jobs/worker.py
+import asyncio
+import random
+from typing import List, Optional
+
+from fastapi import HTTPException
+
+from backend.core import analysis_service, token_counter
+from backend.core.config import settings
+from backend.db import crud
+from backend.db import database
+from backend.jobs.queue import JobQueue, QueuedJob, create_job_queue
+
+# Upstream errors worth retrying later instead of failing the job outright
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+job_queue: Optional[JobQueue] = None
+worker_pool: Optional["JobWorkerPool"] = None
+
+
+class JobWorkerPool:
+    """Runs `worker_count` consumers that drain the job queue and write results to analysis_records."""
+
+    def __init__(self, queue: JobQueue, worker_count: int):
+        self.queue = queue
+        self.worker_count = worker_count
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        for i in range(self.worker_count):
+            self._tasks.append(asyncio.create_task(self._run(i), name=f"job-worker-{i}"))
+        print(f"Started {self.worker_count} analysis job workers.")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    async def _run(self, worker_id: int) -> None:
+        while True:
+            job = await self.queue.get()
+            try:
+                await self._process(job)
+            except asyncio.CancelledError:
+                # Shutting down mid-job: hand the message back for another worker
+                await asyncio.shield(self.queue.retry(job))
+                raise
+            except Exception as e:
+                print(f"Job worker {worker_id}: unexpected error processing job {job.message.get('record_id')}: {e}")
+
+    async def _process(self, job: QueuedJob) -> None:
+        record_id = job.message["record_id"]
+        await _update_record(crud.update_job_status, record_id, crud.JOB_RUNNING)
+
+        usage = token_counter.start_usage()
+        try:
+            analysis_data = await analysis_service.perform_analysis(job.message["text"])
+        except HTTPException as e:
+            if e.status_code in RETRYABLE_STATUS_CODES and job.attempts + 1 < settings.JOB_MAX_ATTEMPTS:
+                # Jittered exponential backoff before handing the job back
+                delay = min(60.0, 2 ** job.attempts) * random.uniform(0.5, 1.0)
+                print(f"Job {record_id}: retryable error ({e.status_code}), retrying in {delay:.1f}s.")
+                await _update_record(crud.update_job_status, record_id, crud.JOB_QUEUED)
+                await asyncio.sleep(delay)
+                await self.queue.retry(job)
+                return
+            await _update_record(crud.update_job_status, record_id, crud.JOB_FAILED, str(e.detail))
+            await self.queue.ack(job)
+            return
+        except Exception as e:
+            print(f"Job {record_id}: analysis failed: {e}")
+            await _update_record(crud.update_job_status, record_id, crud.JOB_FAILED, "An unexpected error occurred during analysis.")
+            await self.queue.ack(job)
+            return
+
+        await _update_record(crud.complete_job, record_id, analysis_data, usage.prompt_tokens, usage.completion_tokens)
+        await self.queue.ack(job)
+
+
+async def _update_record(crud_fn, *args) -> None:
+    """Runs a job-record CRUD call on its own short-lived session."""
+    async with database.SessionLocal() as db:
+        await crud_fn(db, *args)
+
+
+def get_job_queue() -> Optional[JobQueue]:
+    return job_queue
+
+
+async def start_job_system() -> None:
+    """
+    Connects the configured queue and, if enabled, starts the worker pool. Needs the database.
+    Raises ValueError for a memory queue without workers; the job API then stays disabled.
+    """
+    global job_queue, worker_pool
+    if not database.IS_DB_CONNECTED:
+        print("Database not configured. Asynchronous job API disabled.")
+        return
+    if settings.JOB_QUEUE_BACKEND == "memory" and settings.JOB_WORKERS < 1:
+        # Only this process can consume an in-memory queue, so jobs would stay queued forever
+        raise ValueError("JOB_WORKERS must be at least 1 with the memory job queue.")
+    try:
+        queue = create_job_queue()
+        await queue.connect()
+    except Exception as e:
+        print(f"Error connecting job queue ({settings.JOB_QUEUE_BACKEND}): {e}. Asynchronous job API disabled.")
+        return
+    job_queue = queue
+    print(f"Job queue ready (backend: {settings.JOB_QUEUE_BACKEND}).")
+
+    if settings.JOB_WORKERS > 0:
+        worker_pool = JobWorkerPool(job_queue, settings.JOB_WORKERS)
+        worker_pool.start()
+
+
+async def stop_job_system() -> None:
+    global job_queue, worker_pool
+    if worker_pool:
+        await worker_pool.stop()
+        worker_pool = None
+    if job_queue:
+        await job_queue.close()
+        job_queue = None
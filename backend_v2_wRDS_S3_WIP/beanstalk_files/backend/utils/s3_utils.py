@@ -1,38 +1,85 @@
 # backend/utils/s3_utils.py
+import asyncio
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from botocore.exceptions import NoCredentialsError, PartialCredentialsError, ClientError
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import io
+import shutil
+import threading
 import uuid
 import os
 from fastapi import HTTPException
 from backend.core.config import settings
-from typing import Optional
+from backend.core import metrics
+from typing import BinaryIO, Optional, Union
 
 
-# Initialize S3 client based on settings
+# S3 client, created on first use (get_s3_client): building it loads the S3 service
+# model, which takes ~100 ms, so it isn't done at import
 s3_client = None
-s3_available = False
+s3_available = bool(settings.S3_LOCAL_DIR or (settings.AWS_REGION and settings.S3_BUCKET_NAME))
+_s3_client_lock = threading.Lock()
 
-if settings.AWS_REGION and settings.S3_BUCKET_NAME:
+# One client per process: it is thread-safe, and its connection pool must cover every
+# upload thread times the multipart concurrency of each upload
+S3_CLIENT_CONFIG = Config(
+    max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS,
+    retries={"mode": "standard"},
+)
+
+# Files above the threshold are sent as parallel multipart uploads
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=settings.S3_MULTIPART_THRESHOLD_BYTES,
+    multipart_chunksize=settings.S3_MULTIPART_CHUNK_BYTES,
+    max_concurrency=settings.S3_MULTIPART_CONCURRENCY,
+)
+
+# Bounded pool for upload_file_to_s3_async, so archival never blocks the event loop
+# and a burst of uploads can't start unbounded threads
+upload_executor = ThreadPoolExecutor(max_workers=settings.S3_UPLOAD_WORKERS, thread_name_prefix="s3-upload")
+
+
+def get_s3_client():
+    """
+    The shared S3 client, created on first use (thread-safe). None when uploads are stored
+    locally (S3_LOCAL_DIR) or S3 is unavailable; a failed creation sets s3_available = False.
+    """
+    global s3_client, s3_available
+    if s3_client is not None or settings.S3_LOCAL_DIR or not s3_available:
+        return s3_client
+    with _s3_client_lock:
+        if s3_client is None and s3_available:
+            s3_client = _create_s3_client()
+            s3_available = s3_client is not None
+    return s3_client
+
+
+def _create_s3_client():
     try:
         if settings.AWS_ACCESS_KEY_ID and settings.AWS_SECRET_ACCESS_KEY:
             print(f"Initializing S3 client for region {settings.AWS_REGION} using credentials from settings.")
-            s3_client = boto3.client(
+            new_client = boto3.client(
                 's3',
                 aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
                 aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-                region_name=settings.AWS_REGION
+                region_name=settings.AWS_REGION,
+                endpoint_url=settings.S3_ENDPOINT_URL,
+                config=S3_CLIENT_CONFIG
             )
         else:
             print(f"Initializing S3 client for region {settings.AWS_REGION} using default credential chain (IAM Role recommended).")
-            s3_client = boto3.client('s3', region_name=settings.AWS_REGION)
+            new_client = boto3.client('s3', region_name=settings.AWS_REGION, endpoint_url=settings.S3_ENDPOINT_URL, config=S3_CLIENT_CONFIG)
 
         # Light check: Verify client object was created
-        if s3_client:
+        if new_client:
              print("S3 client initialized.")
-             s3_available = True # Assume available if client created
         else:
              print("S3 client initialization failed silently.")
-
+        return new_client
 
     except (NoCredentialsError, PartialCredentialsError):
         print("Error: AWS credentials not found or incomplete in settings or default chain. S3 uploads unavailable.")
@@ -40,33 +87,102 @@ if settings.AWS_REGION and settings.S3_BUCKET_NAME:
         print(f"AWS ClientError during S3 client initialization: {e}. S3 uploads unavailable.")
     except Exception as e:
         print(f"An unexpected error occurred during S3 client initialization: {e}. S3 uploads unavailable.")
+    return None
+
+
+def content_object_key(sha256: str, original_filename: str) -> str:
+    """Content-addressed key: identical files map to the same object (uploads/<sha256><ext>)."""
+    file_extension = os.path.splitext(original_filename)[1].lower() # Ensure consistent extension case
+    return f"uploads/{sha256}{file_extension}"
+
+
+def sha256_of(file_content: Union[bytes, BinaryIO]) -> str:
+    """SHA-256 hex digest of bytes, or of a file object read in chunks (then rewound)."""
+    if isinstance(file_content, (bytes, bytearray)):
+        return hashlib.sha256(file_content).hexdigest()
+    digest = hashlib.sha256()
+    file_content.seek(0)
+    for chunk in iter(lambda: file_content.read(1024 * 1024), b""):
+        digest.update(chunk)
+    file_content.seek(0)
+    return digest.hexdigest()
+
+
+# --- Stored-Object Index ---
+# Keys known to exist in the bucket (LRU), so repeated content skips even the HEAD request
+_known_keys: "OrderedDict[str, None]" = OrderedDict()
+_known_keys_lock = threading.Lock()
+
+
+def _remember_key(key: str) -> None:
+    with _known_keys_lock:
+        _known_keys[key] = None
+        _known_keys.move_to_end(key)
+        while len(_known_keys) > settings.S3_KNOWN_KEYS_MAX:
+            _known_keys.popitem(last=False)
+
 
-else:
-    print("S3 Region and/or Bucket Name not configured in settings. S3 uploads unavailable.")
+def object_exists(key: str) -> bool:
+    """Whether the object is already stored: local index first, then a HEAD request."""
+    with _known_keys_lock:
+        if key in _known_keys:
+            _known_keys.move_to_end(key)
+            return True
 
+    if settings.S3_LOCAL_DIR:
+        exists = os.path.exists(_local_path(key))
+    else:
+        try:
+            get_s3_client().head_object(Bucket=settings.S3_BUCKET_NAME, Key=key)
+            exists = True
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') not in ("404", "NoSuchKey", "NotFound"):
+                # e.g. 403 without s3:GetObject; uploading again is harmless
+                print(f"S3 HEAD check failed for '{key}': {e}. Uploading anyway.")
+            exists = False
 
-def upload_file_to_s3(file_content: bytes, original_filename: str, content_type: str) -> Optional[str]:
+    if exists:
+        _remember_key(key)
+    return exists
+
+
+def upload_file_to_s3(file_content: Union[bytes, BinaryIO], original_filename: str, content_type: str, sha256: Optional[str] = None) -> Optional[str]:
     """
-    Uploads file content bytes to S3 and returns the S3 object key if successful, else None.
+    Uploads file content (bytes, or a file object positioned at its start) to S3 and returns
+    the S3 object key if successful, else None. File objects are streamed, not read into memory;
+    large ones are sent as multipart uploads. Blocking: use upload_file_to_s3_async from handlers.
+
+    Objects are keyed by content hash (`sha256`, computed if not given), so content that is
+    already stored is not uploaded again and its existing key is returned.
     """
-    if not s3_available or not s3_client:
+    if not s3_available or not (settings.S3_LOCAL_DIR or get_s3_client()):
         print("Skipping S3 upload: S3 client not available or not configured.")
         return None
 
-    # Generate a unique filename using UUID and retain original extension
-    file_extension = os.path.splitext(original_filename)[1].lower() # Ensure consistent extension case
-    unique_key = f"uploads/{uuid.uuid4()}{file_extension}" # Simple prefix
+    unique_key = content_object_key(sha256 or sha256_of(file_content), original_filename)
+    if object_exists(unique_key):
+        print(f"'{original_filename}' is already stored with key '{unique_key}', skipping upload.")
+        return unique_key
+
+    fileobj = io.BytesIO(file_content) if isinstance(file_content, (bytes, bytearray)) else file_content
+
+    if settings.S3_LOCAL_DIR:
+        with metrics.stage_seconds.time("s3_put"):
+            return _store_locally(fileobj, unique_key)
 
     print(f"Attempting to upload '{original_filename}' to S3 bucket '{settings.S3_BUCKET_NAME}' with key '{unique_key}'")
 
     try:
-        s3_client.put_object(
-            Bucket=settings.S3_BUCKET_NAME,
-            Key=unique_key,
-            Body=file_content,
-            ContentType=content_type or 'application/octet-stream'
-        )
+        with metrics.stage_seconds.time("s3_put"):
+            get_s3_client().upload_fileobj(
+                fileobj,
+                settings.S3_BUCKET_NAME,
+                unique_key,
+                ExtraArgs={'ContentType': content_type or 'application/octet-stream'},
+                Config=TRANSFER_CONFIG
+            )
         print(f"Successfully uploaded to S3 with key: {unique_key}")
+        _remember_key(unique_key)
         return unique_key
 
     except ClientError as e:
@@ -79,4 +195,37 @@ def upload_file_to_s3(file_content: bytes, original_filename: str, content_type:
         print(f"An unexpected error occurred during S3 upload: {e}")
         import traceback
         traceback.print_exc()
-        return None
\ No newline at end of file
+        return None
+
+
+async def upload_file_to_s3_async(file_content: Union[bytes, BinaryIO], original_filename: str, content_type: str, sha256: Optional[str] = None) -> Optional[str]:
+    """upload_file_to_s3 on the bounded upload executor."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(upload_executor, upload_file_to_s3, file_content, original_filename, content_type, sha256)
+
+
+def _local_path(key: str) -> str:
+    return os.path.join(settings.S3_LOCAL_DIR, *key.split("/"))
+
+
+def _store_locally(fileobj: BinaryIO, key: str) -> Optional[str]:
+    """Filesystem stand-in for S3: writes the object to S3_LOCAL_DIR/<key>."""
+    path = _local_path(key)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename, so a concurrent existence check never sees a partial object
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as out:
+            shutil.copyfileobj(fileobj, out, length=1024 * 1024)
+        os.replace(tmp_path, path)
+        print(f"Stored upload locally with key: {key}")
+        _remember_key(key)
+        return key
+    except OSError as e:
+        print(f"Error storing upload locally at '{path}': {e}")
+        return None
+
+
+def shutdown_upload_executor() -> None:
+    """Waits for in-flight uploads to finish (called on app shutdown)."""
+    upload_executor.shutdown(wait=True)
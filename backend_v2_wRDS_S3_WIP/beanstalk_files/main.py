@@ -1,29 +1,111 @@
 # backend/main.py
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from backend.api.v1.api import api_router # Keep this import
-from backend.core.config import settings
-from backend.db.database import engine, Base
+from backend.core.config import settings, log_settings
+from backend.db import database, write_behind
+from backend.db.database import Base
+from backend.core import openai_utils, docx_extractor, archiver, readiness, token_counter
+from backend.core.middleware import BodySizeLimitMiddleware, ProfilingMiddleware, ServerTimingMiddleware
+from backend.jobs import worker
+from backend.utils import s3_utils
 
 # --- Optional: Create DB Tables ---
-def create_db_tables():
-    if engine:
-        try:
-            print("Attempting to create database tables if they don't exist...")
-            Base.metadata.create_all(bind=engine)
-            print("Database tables check/creation complete.")
-        except Exception as e:
-            print(f"Error during initial table creation (DB connection issue? Permissions?): {e}")
+async def create_db_tables():
+    if database.engine is None:
+        raise RuntimeError("The database engine could not be created.")
+    print("Attempting to create database tables if they don't exist...")
+    async with database.engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    print("Database tables check/creation complete.")
+
+# --- Dependency Start-up ---
+async def start_openai_client():
+    if not settings.OPENAI_API_KEY:
+        raise RuntimeError("OPENAI_API_KEY is not set.")
+    if await asyncio.to_thread(openai_utils.get_client) is None:
+        raise RuntimeError("The OpenAI client could not be created.")
+
+async def start_s3_client():
+    if await asyncio.to_thread(s3_utils.get_s3_client) is None:
+        raise RuntimeError("The S3 client could not be created.")
+
+async def start_job_system():
+    await worker.start_job_system()
+    if worker.get_job_queue() is None:
+        raise RuntimeError(f"The job queue ({settings.JOB_QUEUE_BACKEND}) could not be connected.")
+
+async def start_dependencies():
+    """
+    Creates the schema (a database round-trip) and the OpenAI and S3 clients concurrently,
+    then starts the job system, recording each one's state for GET /ready.
+    """
+    readiness.expect("database", "openai", "s3", "jobs")
+    steps = [readiness.track("openai", start_openai_client())]
+    if settings.SQLALCHEMY_DATABASE_URL:
+        steps.append(readiness.track("database", create_db_tables()))
+    else:
+        readiness.disable("database", "Database not configured: results are not saved.")
+    if settings.S3_LOCAL_DIR:
+        readiness.disable("s3", f"Uploads are stored under '{settings.S3_LOCAL_DIR}'.")
+    elif s3_utils.s3_available:
+        steps.append(readiness.track("s3", start_s3_client()))
     else:
-        print("Database engine not available. Skipping table creation.")
+        readiness.disable("s3", "S3 not configured: uploads are not archived.")
+    await asyncio.gather(*steps)
 
-create_db_tables()
+    if database.IS_DB_CONNECTED:
+        await readiness.track("jobs", start_job_system())
+    else:
+        readiness.disable("jobs", "Needs the database: asynchronous job API disabled.")
+    readiness.mark_complete()
+
+# --- App Lifespan (startup/shutdown) ---
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    log_settings()
+    # The async engine needs the running event loop, so it is created here rather than at import.
+    # Creating it doesn't connect; the first connection is made by the schema check.
+    database.init_engine()
+    token_counter.warm_up(settings.OPENAI_MODEL)
+    write_behind.start_write_behind()
+    startup = asyncio.create_task(start_dependencies())
+    if settings.STARTUP_WAIT_FOR_DEPENDENCIES:
+        await startup
+    # Otherwise requests are served while the rest starts up; OpenAI and S3 clients are
+    # also created on first use. Load balancers should wait for GET /ready.
+    yield
+    if not startup.done():
+        startup.cancel()
+        await asyncio.gather(startup, return_exceptions=True)
+    await worker.stop_job_system()
+    # Write out buffered analysis records
+    await write_behind.stop_write_behind()
+    # Finish archiving uploads that were still in flight
+    await archiver.drain()
+    s3_utils.shutdown_upload_executor()
+    # Release pooled upstream connections on shutdown
+    await openai_utils.close_client()
+    docx_extractor.shutdown_executor()
+    await database.dispose_engine()
 
 # --- FastAPI App Initialization ---
 app = FastAPI(
     title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan
+)
+
+# --- Request Body Size Limit ---
+# Added before CORS so 413 responses still carry CORS headers.
+# Batch uploads may be larger than single-article uploads
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    max_bytes=settings.MAX_UPLOAD_BYTES,
+    path_limits={"/analyze/batch": settings.BATCH_MAX_BYTES},
 )
 
 # ---CORS Middleware ---
@@ -33,8 +115,19 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Readable by the frontend; devtools show them either way
+    expose_headers=["Server-Timing", "X-Profile-Id"],
 )
 
+# --- Request Timing and Profiling ---
+# Added last, so they wrap everything else and time the whole request
+if settings.PROFILING_ENABLED:
+    profile_paths = [path.strip() for path in settings.PROFILE_PATHS.split(",") if path.strip()]
+    print(f"Profiling {settings.PROFILE_SAMPLE_RATE:.1%} of requests to {', '.join(profile_paths)} into {settings.PROFILE_DIR}.")
+    app.add_middleware(ProfilingMiddleware, sample_rate=settings.PROFILE_SAMPLE_RATE, path_prefixes=profile_paths)
+if settings.SERVER_TIMING_ENABLED:
+    app.add_middleware(ServerTimingMiddleware)
+
 # --- Include API Router ---
 app.include_router(api_router)
 